@@ -0,0 +1,308 @@
+"""Aggregations behind the dashboard tabs.
+
+Each function takes the filtered rows (plus any parameters) and returns a
+new frame without touching its inputs, so DASHBOARD_GRAPH can run the
+independent ones side by side. Derived measures (Gross Margin, Margin %,
+Division) are computed once at ingest by data_loader and only read here.
+Plain sums go through group_sum and pivot_sum, which sum on integer codes
+instead of pandas' general groupby.
+"""
+import numpy as np
+import pandas as pd
+
+from group_sums import group_sum, pivot_sum
+from rollups import period_labels, with_period
+from sparse_pivot import SparsePivot
+from task_graph import TaskGraph
+
+
+def group_sales(grain_data, grain):
+    """Sales per Group and period (Tab 1)."""
+    result = group_sum(grain_data, ['Group', 'Date'], 'Penjualan')
+    result.sort_values('Date', inplace=True)
+    return with_period(result, grain)
+
+
+def group_sales_tables(group_sales, grain):
+    """Tab 1 pivots: sales per Group by period, the same with a Grand Total row,
+    and the period-over-period differences with their Grand Total row."""
+    group_sales_table = pivot_sum(group_sales, "Group", "Date", "Penjualan")
+
+    # Columns are in date order; label them by period
+    group_sales_table.columns = period_labels(group_sales_table.columns, grain)
+
+    # Calculate differences
+    group_sales_diff = group_sales_table.diff(axis=1)
+
+    # Compute total row
+    total_sales_row = group_sales_table.sum(axis=0)
+    total_sales_row.name = 'Grand Total'
+    group_sales_table_with_total = pd.concat([group_sales_table, total_sales_row.to_frame().T])
+
+    total_diff_row = group_sales_diff.sum(axis=0)
+    total_diff_row.name = 'Grand Total'
+    group_sales_diff_with_total = pd.concat([group_sales_diff, total_diff_row.to_frame().T])
+    return group_sales_table, group_sales_table_with_total, group_sales_diff_with_total
+
+
+def group_sales_overview(group_sales_table_with_total, group_sales_diff_with_total):
+    """Sales_ and Difference_ columns per period side by side, as numbers (Tab 1 default view)."""
+    group_sales_combined = pd.concat(
+        [group_sales_table_with_total, group_sales_diff_with_total],
+        keys=["Sales", "Difference"],
+        axis=1
+    )
+
+    group_sales_combined.columns.names = ['Type', 'Month']
+    group_sales_combined.reset_index(inplace=True)
+
+    group_sales_combined.columns = [
+        f"{col[0]}_{col[1]}" if col[0] != 'Group' else 'Group' for col in
+        group_sales_combined.columns
+    ]
+    return group_sales_combined.fillna(0)
+
+
+def store_comparison(grain_data, grain):
+    """Sales per store and period (Tab 2)."""
+    result = group_sum(grain_data, ['Date', 'Store Name'], 'Penjualan')
+    result.sort_values('Date', inplace=True)
+    return with_period(result, grain)
+
+
+def store_sales_table(store_comparison, grain):
+    """Sales and period-over-period difference per store, with a Grand Total row (Tab 2 table)."""
+    # Pivot table for sales by store and month
+    pivot_store = pivot_sum(store_comparison, "Store Name", "Date", "Penjualan")
+
+    # Columns are in date order; label them by period
+    pivot_store.columns = period_labels(pivot_store.columns, grain)
+
+    # Calculate month-to-month differences
+    if len(pivot_store.columns) > 1:
+        store_diff = pivot_store.diff(axis=1)
+        include_difference = True
+    else:
+        store_diff = pd.DataFrame(index=pivot_store.index)
+        include_difference = False
+
+    # Add Grand Total row
+    sales_total = pivot_store.sum(axis=0)
+    pivot_store_with_total = pd.concat(
+        [pivot_store, pd.DataFrame([sales_total], index=["Grand Total"])]
+    )
+
+    if include_difference:
+        diff_total = store_diff.sum(axis=0)
+        store_diff_with_total = pd.concat(
+            [store_diff, pd.DataFrame([diff_total], index=["Grand Total"])]
+        )
+
+        # Combine sales and differences
+        combined_store = pd.concat(
+            [pivot_store_with_total, store_diff_with_total],
+            keys=["Sales", "Difference"],
+            axis=1
+        )
+    else:
+        # If no differences, just display sales
+        combined_store = pivot_store_with_total.copy()
+        combined_store.columns = pd.MultiIndex.from_arrays(
+            [["Sales"] * len(combined_store.columns), combined_store.columns],
+            names=["Type", "Month"]
+        )
+
+    combined_store.columns.names = ['Type', 'Month']
+    combined_store.reset_index(inplace=True)
+
+    # Flatten MultiIndex columns
+    combined_store.columns = [
+        f"{col[0]}_{col[1]}" if col[0] != 'Store Name' else 'Store Name'
+        for col in combined_store.columns
+    ]
+    return combined_store
+
+
+def detail_pivot(grain_data):
+    """Sales per Grouping, Store and Group by period, in display order (Tab 3).
+
+    Returned as a SparsePivot: most Grouping x Store combinations only sell
+    in a few months, so only observed cells are stored. ``rows`` carries
+    Total Sales and the Rank within each Group, and rows are ordered by
+    Group and Rank.
+    """
+    pivot = SparsePivot.from_frame(grain_data, ["Grouping", "Store Name", "Group"], "Date", "Penjualan")
+
+    # Calculate total sales for ranking, then rank by group
+    rows = pivot.rows
+    rows['Total Sales'] = pivot.row_totals()
+    rows['Rank'] = rows.groupby('Group', observed=True)['Total Sales'].rank(ascending=False, method='min')
+
+    # Sort by Group and Rank
+    pivot = pivot.take_rows(rows.sort_values(['Group', 'Rank']).index.to_numpy())
+    pivot.changes()
+    return pivot
+
+
+def detail_page(pivot, positions, grain='Month'):
+    """Densify the Tab 3 rows at ``positions`` into the displayed layout:
+    keys, Sales_/Change_/Percent Change_ per period, Total Sales and Rank."""
+    month_display_cols = period_labels(pivot.columns, grain)
+    rows = pivot.rows.iloc[positions].reset_index(drop=True)
+
+    blocks = [("Sales", pivot.dense_sales(positions))]
+    if pivot.has_changes():
+        blocks.append(("Change", pivot.dense_changes(positions)))
+    if pivot.has_pct_changes():
+        blocks.append(("Percent Change", pivot.dense_pct_changes(positions)))
+
+    return pd.concat(
+        [rows[["Grouping", "Store Name", "Group"]]]
+        + [pd.DataFrame(block, columns=[f"{name}_{month}" for month in month_display_cols]) for name, block in blocks]
+        + [rows[['Total Sales', 'Rank']]],
+        axis=1
+    )
+
+
+def detail_chunks(pivot, grain='Month', chunk_rows=50_000):
+    """All Tab 3 rows, densified ``chunk_rows`` at a time."""
+    n_rows = len(pivot.rows)
+    for start in range(0, max(n_rows, 1), chunk_rows):
+        yield detail_page(pivot, np.arange(start, min(start + chunk_rows, n_rows)), grain)
+
+
+def grouping_trend(kelompok_data, grain):
+    """Sales of the selected Grouping per store and period (Tab 6)."""
+    trend_data = group_sum(kelompok_data, ['Date', 'Store Name', 'Grouping'], 'Penjualan')
+    trend_data.sort_values('Date', inplace=True)
+    if not trend_data.empty:
+        trend_data = with_period(trend_data, grain)
+    return trend_data
+
+
+def _gross_margin_by(data, column):
+    result = group_sum(data, column, ['Gross Margin', 'Penjualan'])
+    result['Gross Margin %'] = (result['Gross Margin'] / result['Penjualan']) * 100
+    result['Gross Margin %'] = result['Gross Margin %'].fillna(0)  # Handle division by zero
+    return result.sort_values('Gross Margin %', ascending=False)
+
+
+def gm_by_division(filtered_data):
+    """Gross margin and margin % per division, best first (Tab 8)."""
+    return _gross_margin_by(filtered_data, 'Division')
+
+
+def gm_by_store(filtered_data):
+    """Gross margin and margin % per store, best first (Tab 8)."""
+    return _gross_margin_by(filtered_data, 'Store Name')
+
+
+def detailed_gm_store(filtered_data):
+    """Gross margin per store and Grouping, largest first (Tab 8 detail)."""
+    result = group_sum(filtered_data, ['Store Name', 'Grouping'], ['Gross Margin', 'Penjualan'])
+
+    result['Gross Margin %'] = (result['Gross Margin'] / result['Penjualan']) * 100
+    result['Gross Margin %'] = result['Gross Margin %'].fillna(0)
+
+    result.rename(columns={
+        'Gross Margin': 'Gross Margin Value',
+        'Gross Margin %': 'Gross Margin Percentage (%)'
+    }, inplace=True)
+    return result.sort_values(by=['Gross Margin Value'], ascending=False)
+
+
+def detailed_gm_division(filtered_data):
+    """Gross margin per division, store, year and month (Tab 8 detail)."""
+    result = group_sum(filtered_data, ['Division', 'Store Name', 'year', 'Month'], ['Gross Margin', 'Penjualan'])
+
+    result['Gross Margin %'] = (result['Gross Margin'] / result['Penjualan']) * 100
+    result['Gross Margin %'] = result['Gross Margin %'].fillna(0)
+
+    result.rename(columns={
+        'year': 'Year',
+        'Gross Margin': 'Gross Margin Value',
+        'Gross Margin %': 'Gross Margin Percentage (%)'
+    }, inplace=True)
+    return result.sort_values(
+        by=['Division', 'Store Name', 'Year', 'Month'],
+        ascending=[True, True, True, True]
+    )
+
+
+def stock_data(grain_data, grain):
+    """Stock value per division and period, periods ordered (Tab 9)."""
+    result = group_sum(grain_data, ['Division', 'Date'], 'Stock Value')
+    return with_period(result, grain)
+
+
+def store_stock_table(grain_data, grain):
+    """Stock value and its period-over-period difference per store (Tab 9)."""
+    store_stock_pivot = pivot_sum(grain_data, "Store Name", "Date", "Stock Value")
+    store_stock_pivot.columns = period_labels(store_stock_pivot.columns, grain)
+    store_stock_diff = store_stock_pivot.diff(axis=1).fillna(0)
+
+    combined_store_stock = pd.concat(
+        [store_stock_pivot, store_stock_diff],
+        keys=["Stock Value", "Difference"],
+        axis=1
+    )
+    combined_store_stock.columns.names = ['Type', 'Month']
+    combined_store_stock.reset_index(inplace=True)
+    combined_store_stock.columns = [
+        f"{col[0]}_{col[1]}" if col[0] != 'Store Name' else 'Store Name' for col in
+        combined_store_stock.columns
+    ]
+    return combined_store_stock
+
+
+def period_pivot(grain_data, grouping_col, value_col):
+    """Sums of ``value_col`` per ``grouping_col`` and period start Date (Tab 9 comparison)."""
+    return pivot_sum(grain_data, grouping_col, "Date", value_col)
+
+
+def sales_stock_comparison(sales_pivot_compare, stock_pivot_compare, grouping_col, grain):
+    """Sales and stock side by side with stock as a % of sales (Tab 9)."""
+    all_dates = sales_pivot_compare.columns.union(stock_pivot_compare.columns)
+    all_months_compare = period_labels(all_dates, grain)
+
+    sales_pivot_compare = sales_pivot_compare.reindex(columns=all_dates, fill_value=0)
+    stock_pivot_compare = stock_pivot_compare.reindex(columns=all_dates, fill_value=0)
+    sales_pivot_compare.columns = all_months_compare
+    stock_pivot_compare.columns = all_months_compare
+    sales_pivot_compare = sales_pivot_compare.reset_index()
+    stock_pivot_compare = stock_pivot_compare.reset_index()
+
+    combined_sales_stock = pd.merge(
+        sales_pivot_compare,
+        stock_pivot_compare,
+        on=grouping_col,
+        how='outer',
+        suffixes=('_Sales', '_Stock')
+    ).fillna(0)
+
+    for month in all_months_compare:
+        sales = combined_sales_stock[f"{month}_Sales"]
+        stock = combined_sales_stock[f"{month}_Stock"]
+        combined_sales_stock[f"Stock%_{month}"] = stock / sales.where(sales != 0) * 100
+    return combined_sales_stock
+
+
+# The aggregations that run on every rerun, with their inputs. 'filtered_data'
+# (monthly), 'grain_data' (the same rows at the selected time grain), 'grain'
+# and 'comparison_col' are supplied by the script.
+DASHBOARD_GRAPH = (
+    TaskGraph()
+    .add('group_sales', group_sales, 'grain_data', 'grain')
+    .add('store_comparison', store_comparison, 'grain_data', 'grain')
+    .add('detail_pivot', detail_pivot, 'grain_data')
+    .add('gm_by_division', gm_by_division, 'filtered_data')
+    .add('gm_by_store', gm_by_store, 'filtered_data')
+    .add('stock_data', stock_data, 'grain_data', 'grain')
+    .add('store_stock_table', store_stock_table, 'grain_data', 'grain')
+    .add('sales_pivot_compare', lambda data, col: period_pivot(data, col, 'Penjualan'), 'grain_data',
+         'comparison_col')
+    .add('stock_pivot_compare', lambda data, col: period_pivot(data, col, 'Stock Value'), 'grain_data',
+         'comparison_col')
+    .add('sales_stock_comparison', sales_stock_comparison, 'sales_pivot_compare', 'stock_pivot_compare',
+         'comparison_col', 'grain')
+)
@@ -0,0 +1,129 @@
+"""Outlying periods of every Grouping x Store series, for the Anomalies tab.
+
+The sales and stock of the filtered rows are laid out as dense series x
+period arrays (the Tab 3 rows, one column per period at the time grain).
+Two checks score every cell in one pass with robust z-scores, which
+measure the distance from the row's median in units of its median
+absolute deviation (MAD), so a few extreme periods do not hide
+themselves by inflating the spread:
+
+- Sales change: the period-over-period change in sales (Tab 3's Change_
+  columns), in both directions, for series with sales in at least
+  MIN_ACTIVE_SHARE of the periods.
+- Stock/sales ratio: the log of stock value over sales in periods with
+  both (the Tab 9 stock against the sales), upwards only: stock piling
+  up against slowing sales. Series need a ratio in MIN_ACTIVE_SHARE of
+  the periods.
+
+Cells scoring above Z_THRESHOLD are listed, most severe first.
+"""
+import warnings
+
+import numpy as np
+import pandas as pd
+
+from group_sums import key_codes
+from rollups import period_labels
+
+SERIES_KEYS = ['Grouping', 'Store Name', 'Group']
+Z_THRESHOLD = 3.5
+MIN_ACTIVE_SHARE = 0.5
+# MAD and mean absolute deviation scaled to the standard deviation of a normal distribution
+MAD_SCALE = 1.4826
+MEAN_AD_SCALE = 1.2533
+CHECKS = ['Sales change', 'Stock/sales ratio']
+
+
+def row_medians(values):
+    """Median of each row of ``values`` ignoring NaN (NaN for rows without values), as a column.
+
+    The rows are sorted once (NaN sorts last) and the middle valid cells
+    picked, which is much faster than np.nanmedian on many short rows.
+    """
+    ordered = np.sort(values, axis=1)
+    counts = np.count_nonzero(~np.isnan(values), axis=1)[:, None]
+    low = np.take_along_axis(ordered, np.maximum(counts - 1, 0) // 2, axis=1)
+    high = np.take_along_axis(ordered, counts // 2 - (counts == 0), axis=1)
+    return np.where(counts > 0, (low + high) / 2, np.nan)
+
+
+def robust_z(values):
+    """Robust z-score of every cell of ``values`` (series x periods) within its row, and the row
+    medians (series x 1). NaN cells are ignored and stay NaN.
+
+    Where more than half of a row's cells equal its median (a series that
+    is mostly 0, for example) the MAD is 0, and the mean absolute deviation
+    is used as the spread instead; rows with no spread at all score 0.
+    """
+    median = row_medians(values)
+    deviation = np.abs(values - median)
+    scale = row_medians(deviation) * MAD_SCALE
+    with warnings.catch_warnings():
+        # Rows without any value have a NaN mean
+        warnings.simplefilter('ignore', RuntimeWarning)
+        scale = np.where(scale > 0, scale, np.nanmean(deviation, axis=1, keepdims=True) * MEAN_AD_SCALE)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        z = np.where(scale > 0, (values - median) / scale, np.where(np.isnan(values), np.nan, 0.0))
+    return z, median
+
+
+def series_matrices(grain_data):
+    """Row keys, period start Dates and the dense sales and stock arrays (series x period) of
+    the rows ``grain_data``, with the series in key order."""
+    codes, labels = zip(*(key_codes(grain_data[col]) for col in SERIES_KEYS + ['Date']))
+    # Rows with a missing key belong to no series
+    valid = np.logical_and.reduce([c >= 0 for c in codes])
+    codes = [c[valid] for c in codes]
+    shape = tuple(len(labels) for labels in labels[:-1])
+    series, series_ids = np.unique(np.ravel_multi_index(codes[:-1], shape), return_inverse=True)
+    keys = pd.DataFrame({col: labels[level].take(level_codes).array
+                         for level, (col, level_codes) in enumerate(zip(SERIES_KEYS, np.unravel_index(series, shape)))})
+    dates = pd.DatetimeIndex(labels[-1])
+
+    cells = series_ids * len(dates) + codes[-1]
+    sales, stock = (
+        np.bincount(cells, weights=np.nan_to_num(grain_data[measure].to_numpy(dtype=np.float64)[valid]),
+                    minlength=len(series) * len(dates)).reshape(len(series), len(dates))
+        for measure in ('Penjualan', 'Stock Value')
+    )
+    return keys, dates, sales, stock
+
+
+def _flagged(keys, labels, check, values, typical, z, selected):
+    series, periods = np.nonzero(selected)
+    flagged = keys.iloc[series].reset_index(drop=True)
+    flagged['Period'] = np.asarray(labels, dtype=object)[periods]
+    flagged['Check'] = check
+    flagged['Value'] = values[series, periods]
+    flagged['Typical'] = typical[series, 0]
+    flagged['Robust Z'] = z[series, periods]
+    return flagged
+
+
+def find_anomalies(grain_data, grain, threshold=Z_THRESHOLD):
+    """The anomalous (series, period) cells of ``grain_data`` at ``grain``, most severe first.
+
+    ``Value`` is the sales change or the stock/sales ratio of the period and
+    ``Typical`` the row's median of it.
+    """
+    keys, dates, sales, stock = series_matrices(grain_data)
+    labels = period_labels(dates, grain)
+    found = []
+
+    if len(dates) >= 3:
+        # In a series that sells only now and then every sale is a jump from 0: those are left out
+        active = ((sales > 0).mean(axis=1) >= MIN_ACTIVE_SHARE)[:, None]
+        changes = np.diff(sales, axis=1)
+        z, median = robust_z(changes)
+        found.append(_flagged(keys, labels[1:], CHECKS[0], changes, median, z, active & (np.abs(z) > threshold)))
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        ratios = np.where((sales > 0) & (stock > 0), stock / sales, np.nan)
+    log_ratios = np.log(ratios)
+    rated = ((~np.isnan(ratios)).mean(axis=1) >= MIN_ACTIVE_SHARE)[:, None]
+    z, median = robust_z(log_ratios)
+    found.append(_flagged(keys, labels, CHECKS[1], ratios, np.exp(median), z, rated & (z > threshold)))
+
+    anomalies = pd.concat(found, ignore_index=True)
+    anomalies['Severity'] = anomalies['Robust Z'].abs()
+    return anomalies.sort_values('Severity', ascending=False, kind='stable', ignore_index=True)
@@ -0,0 +1,67 @@
+"""Anomaly detection over the full Grouping x Store matrix.
+
+    python benchmarks/bench_anomalies.py [n_groupings] [n_stores] [n_months] [density]
+
+find_anomalies is timed on the monthly rows of every Grouping and store,
+and split into building the series x period arrays and scoring them. The
+robust z-scores of the sales changes are checked against the same scores
+worked out per series with pandas (diff, median, MAD) on a sample.
+"""
+import sys
+import time
+
+import numpy as np
+from synthetic import make_sales_data
+
+from anomalies import SERIES_KEYS, find_anomalies, robust_z, series_matrices
+from filters import general_rows
+from rollups import Rollups
+
+SAMPLE_SERIES = 300
+
+
+def best_of(func, repeat=5):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        times.append(time.perf_counter() - start)
+    return min(times), result
+
+
+def main():
+    args = [float(a) for a in sys.argv[1:]]
+    n_groupings, n_stores, n_months = (int(a) for a in (args + [2_000, 50, 24][len(args):])[:3])
+    density = args[3] if len(args) > 3 else 1.0
+    rollups = Rollups.from_rows(make_sales_data(n_groupings, n_stores, n_months, density).drop(columns='Rows'))
+    monthly = rollups.monthly
+    _, grain_data = general_rows(rollups, sorted(monthly['Group'].unique()), sorted(monthly['year'].unique()),
+                                 list(monthly['Month'].unique()), sorted(monthly['Store Name'].unique()), 'Month')
+
+    matrices_s, (keys, dates, sales, stock) = best_of(lambda: series_matrices(grain_data))
+    changes = np.diff(sales, axis=1)
+    scores_s, (z, _) = best_of(lambda: robust_z(changes))
+    total_s, anomalies = best_of(lambda: find_anomalies(grain_data, 'Month'))
+    print(f"{len(grain_data):,} rows -> {len(keys):,} series x {len(dates)} months")
+
+    # Per-series pandas reference on a sample of series
+    sample = keys.iloc[np.linspace(0, len(keys) - 1, min(SAMPLE_SERIES, len(keys))).astype(int)]
+    rows = grain_data.set_index(SERIES_KEYS).sort_index()
+    for position, key in zip(sample.index, sample.itertuples(index=False)):
+        series = rows.loc[tuple(key)].set_index('Date')['Penjualan'].reindex(dates, fill_value=0)
+        change = series.diff().iloc[1:]
+        deviation = (change - change.median()).abs()
+        mad = deviation.median() * 1.4826
+        scale = mad if mad > 0 else deviation.mean() * 1.2533
+        if scale > 0:
+            assert np.allclose(((change - change.median()) / scale).to_numpy(), z[position])
+
+    print(f"\n{'series x period arrays':<30}{matrices_s * 1000:>8.0f} ms")
+    print(f"{'robust z of the changes':<30}{scores_s * 1000:>8.0f} ms")
+    print(f"{'find_anomalies, both checks':<30}{total_s * 1000:>8.0f} ms")
+    print(f"\n{len(anomalies):,} anomalies: "
+          + ", ".join(f"{check} {count:,}" for check, count in anomalies['Check'].value_counts().items()))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,74 @@
+"""One month out of five years: the month-partitioned dataset vs a single Parquet file.
+
+    python benchmarks/bench_dataset.py [n_groupings] [n_stores] [n_months]
+
+The single file is read whole and filtered in pandas, which is what loading
+a full history upload amounts to. The dataset reads only the partition of
+the month, and with a store filter only the row groups whose statistics
+include the stores. Bytes are the compressed column chunks each read
+takes from disk.
+"""
+import os
+import sys
+import tempfile
+import time
+
+import pandas as pd
+import pyarrow.parquet as pq
+from synthetic import make_sales_data
+
+from rollups import Rollups, widen
+from sales_dataset import open_dataset, read_monthly, row_filter, scan_plan, write_months
+
+
+def best_of(func, repeat=5):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main():
+    args = [int(a) for a in sys.argv[1:]]
+    n_groupings, n_stores, n_months = (args + [2_000, 50, 60][len(args):])[:3]
+    monthly = Rollups.from_rows(make_sales_data(n_groupings, n_stores, n_months).drop(columns='Rows')).monthly
+    month = monthly['Date'].iloc[-1]
+    stores = sorted(monthly['Store Name'].unique())[:2]
+
+    with tempfile.TemporaryDirectory() as root:
+        single = os.path.join(root, 'history.parquet')
+        widen(monthly).astype({col: str for col in ['Grouping', 'Store Name', 'Group', 'Division', 'Month']}) \
+            .to_parquet(single, index=False)
+        dataset = os.path.join(root, 'dataset')
+        write_months(monthly, dataset)
+        n_partitions = len(open_dataset(dataset).files)
+        print(f"{len(monthly):,} monthly rows over {n_partitions} month partitions; querying {month:%B %Y}")
+
+        def single_file(stores=None):
+            frame = pd.read_parquet(single)
+            selected = frame['Date'] == month
+            if stores is not None:
+                selected &= frame['Store Name'].isin(stores)
+            return frame[selected]
+
+        metadata = pq.ParquetFile(single).metadata
+        single_bytes = sum(metadata.row_group(i).column(j).total_compressed_size
+                           for i in range(metadata.num_row_groups) for j in range(metadata.num_columns))
+
+        print(f"\n{'':<34}{'rows':>9}{'row groups':>12}{'MB read':>9}{'ms':>9}")
+        for label, selected in (('one month', None), ('one month, 2 stores', stores)):
+            expected = single_file(selected)
+            assert len(read_monthly(dataset, month, month, stores=selected)) == len(expected)
+            seconds = best_of(lambda: single_file(selected))
+            print(f"{'single file, ' + label:<34}{len(expected):>9,}{metadata.num_row_groups:>12}"
+                  f"{single_bytes / 2 ** 20:>9.2f}{seconds * 1000:>9.1f}")
+            plan = scan_plan(dataset, row_filter(month, month, stores=selected))
+            seconds = best_of(lambda: read_monthly(dataset, month, month, stores=selected))
+            print(f"{'dataset, ' + label:<34}{len(expected):>9,}{plan['row_groups']:>12}"
+                  f"{plan['bytes'] / 2 ** 20:>9.2f}{seconds * 1000:>9.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,59 @@
+"""Selecting a range of months: year/Month isin masks vs a searchsorted slice.
+
+    python benchmarks/bench_date_range.py [n_groupings] [n_stores] [n_months]
+
+The masks are how a time selection was applied before the date range
+slider; the slice is Rollups.between on the Date-clustered rollup. Both
+select the last quarter, alone and followed by the store filter.
+"""
+import sys
+import time
+
+from synthetic import make_sales_data
+
+from filters import general_rows
+from rollups import Rollups
+
+
+def best_of(func, repeat=7):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main():
+    args = [int(a) for a in sys.argv[1:]]
+    n_groupings, n_stores, n_months = (args + [2_000, 50, 60][len(args):])[:3]
+    rollups = Rollups.from_rows(make_sales_data(n_groupings, n_stores, n_months).drop(columns='Rows'))
+    monthly = rollups.monthly
+    months = rollups.periods['Month']
+    start, end = months[-3], months[-1]
+    last_quarter = months[-3:]
+    print(f"{len(monthly):,} monthly rows over {len(months)} months; selecting {len(last_quarter)}")
+
+    def masks():
+        return monthly[monthly['year'].isin(set(last_quarter.year))
+                       & monthly['Month'].isin(set(last_quarter.month_name())) & (monthly['Date'] >= start)]
+
+    def sliced():
+        return rollups.between('Month', start, end)
+
+    assert masks()['Date'].equals(sliced()['Date'])
+    groups = sorted(monthly['Group'].unique())
+    stores = sorted(monthly['Store Name'].unique())[:10]
+    years = sorted(monthly['year'].unique())
+    all_months = list(monthly['Month'].unique())
+
+    print(f"\n{'':<34}{'ms':>8}")
+    print(f"{'year/Month masks':<34}{best_of(masks) * 1000:>8.2f}")
+    print(f"{'searchsorted slice':<34}{best_of(sliced) * 1000:>8.3f}")
+    for label, date_range in (('all months', (None, None)), ('last quarter', (start, end))):
+        seconds = best_of(lambda: general_rows(rollups, groups, years, all_months, stores, 'Month', date_range))
+        print(f"{'general_rows, ' + label:<34}{seconds * 1000:>8.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,63 @@
+"""Figure build time and JSON payload of the Grouping charts (Tabs 4 and 6),
+drawn whole vs a page of facets with the top stores.
+
+    python benchmarks/bench_facet_charts.py [n_groupings] [n_stores] [n_months]
+
+"whole" is every selected Grouping in one figure with a trace per store,
+as the tabs drew them before paging; "page" is the first page of
+FACETS_PER_PAGE Grouping with LEGEND_STORES stores and "Other". The build
+time includes fig.to_json(), which is what streamlit sends to the browser.
+"""
+import sys
+import time
+
+from synthetic import make_sales_data
+
+from aggregations import grouping_trend
+from charts import (FACETS_PER_PAGE, LEGEND_STORES, facet_page, grouping_comparison_chart, sales_trend_chart,
+                    top_stores)
+from filters import grouping_rows
+from rollups import Rollups
+
+
+def best_of(func, repeat=3):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        times.append(time.perf_counter() - start)
+    return min(times), result
+
+
+def main():
+    args = [int(a) for a in sys.argv[1:]]
+    n_groupings, n_stores, n_months = (args + [30, 100, 24][len(args):])[:3]
+    rollups = Rollups.from_rows(make_sales_data(n_groupings, n_stores, n_months, density=1.0).drop(columns='Rows'))
+    monthly = rollups.monthly
+    categories = sorted(monthly['Grouping'].unique())
+    kelompok_data = grouping_rows(rollups, categories, sorted(monthly['year'].unique()),
+                                  list(monthly['Month'].unique()), sorted(monthly['Store Name'].unique()), 'Month')
+    trend_data = grouping_trend(kelompok_data, 'Month')
+    print(f"{len(categories)} Grouping x {n_stores} stores x {n_months} months; "
+          f"pages of {FACETS_PER_PAGE} Grouping, {LEGEND_STORES} stores + Other")
+
+    charts = [
+        ("Tab 4 bars, whole", lambda: grouping_comparison_chart(kelompok_data, categories, 'Month')),
+        ("Tab 4 bars, page", lambda: grouping_comparison_chart(top_stores(facet_page(kelompok_data, 0)), categories,
+                                                               'Month')),
+        ("Tab 6 lines, whole, svg", lambda: sales_trend_chart(trend_data, 'Month', webgl_points=len(trend_data))),
+        ("Tab 6 lines, whole, webgl", lambda: sales_trend_chart(trend_data, 'Month', webgl_points=0)),
+        ("Tab 6 lines, page, svg", lambda: sales_trend_chart(top_stores(facet_page(trend_data, 0)), 'Month',
+                                                             webgl_points=len(trend_data))),
+        ("Tab 6 lines, page, webgl", lambda: sales_trend_chart(top_stores(facet_page(trend_data, 0)), 'Month',
+                                                               webgl_points=0)),
+    ]
+    print(f"\n{'':<30}{'traces':>8}{'build ms':>10}{'to_json ms':>12}{'payload KB':>12}")
+    for label, build in charts:
+        build_s, fig = best_of(build)
+        json_s, payload = best_of(fig.to_json)
+        print(f"{label:<30}{len(fig.data):>8,}{build_s * 1000:>10.0f}{json_s * 1000:>12.0f}{len(payload) / 1024:>12,.0f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,75 @@
+"""Forecasting every Grouping x Store series at once vs one series at a time.
+
+    python benchmarks/bench_forecasting.py [n_groupings] [n_stores] [n_months] [density]
+
+BatchForecast is timed end to end (pivot, backtest of every model, final
+forecasts). The per-series loop fits the same three models to one row at a
+time with np.polyfit and a Python smoothing loop; it runs on a sample of
+rows, is checked against the batch forecasts and is scaled up to all rows.
+"""
+import sys
+import time
+
+import numpy as np
+from synthetic import make_sales_data
+
+from forecasting import HORIZON, MODELS, SEASON, SMOOTHING_ALPHA, BatchForecast
+from group_sums import pivot_sum
+from rollups import Rollups
+
+SAMPLE_SERIES = 500
+
+
+def forecast_one(values, horizon=HORIZON):
+    """The three models on one series, written the usual per-series way."""
+    seasonal = ([values[len(values) - SEASON + k % SEASON] for k in range(horizon)] if len(values) >= SEASON
+                else [values[-1]] * horizon)
+    slope, intercept = np.polyfit(np.arange(len(values)), values, 1)
+    trend = [intercept + slope * (len(values) + k) for k in range(horizon)]
+    level = values[0]
+    for value in values[1:]:
+        level = level + SMOOTHING_ALPHA * (value - level)
+    return [seasonal, trend, [level] * horizon]
+
+
+def loop_forecast(history, horizon=HORIZON):
+    forecasts, model = [], []
+    for values in history:
+        backtest = forecast_one(values[:-horizon], horizon)
+        actual = values[-horizon:]
+        errors = [np.abs(np.subtract(f, actual)).sum() for f in backtest]
+        best = int(np.argmin(errors)) if np.abs(actual).sum() > 0 else 0
+        model.append(best)
+        forecasts.append(np.maximum(forecast_one(values, horizon)[best], 0))
+    return np.array(forecasts), np.array(model)
+
+
+def main():
+    args = [float(a) for a in sys.argv[1:]]
+    n_groupings, n_stores, n_months = (int(a) for a in (args + [1_000, 50, 36][len(args):])[:3])
+    density = args[3] if len(args) > 3 else 0.5
+    monthly = Rollups.from_rows(make_sales_data(n_groupings, n_stores, n_months, density).drop(columns='Rows')).monthly
+
+    start = time.perf_counter()
+    forecast = BatchForecast(monthly)
+    batch_s = time.perf_counter() - start
+    print(f"{len(forecast):,} series x {len(forecast.months)} months, {HORIZON} months ahead")
+
+    pivot = pivot_sum(monthly, ['Grouping', 'Store Name'], 'Date', 'Penjualan')
+    history = pivot.reindex(columns=forecast.months, fill_value=0).to_numpy()
+    sample = np.linspace(0, len(history) - 1, min(SAMPLE_SERIES, len(history))).astype(int)
+    start = time.perf_counter()
+    loop_forecasts, loop_model = loop_forecast(history[sample])
+    loop_s = (time.perf_counter() - start) * len(history) / len(sample)
+
+    assert np.allclose(loop_forecasts, forecast.forecasts[sample], rtol=1e-6, atol=1e-3)
+    assert (loop_model == forecast.model[sample]).mean() > 0.99
+    print(f"\n{'BatchForecast':<34}{batch_s:>9.2f} s")
+    print(f"{'per-series loop (scaled from ' + str(len(sample)) + ')':<34}{loop_s:>9.2f} s"
+          f"{loop_s / batch_s:>8.0f}x")
+    print("\nmodel chosen: " + ", ".join(f"{name} {np.mean(forecast.model == i):.0%}" for i, name in enumerate(MODELS)))
+    print(f"median backtest error: {np.nanmedian(forecast.error):.1f}%")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,69 @@
+"""The tab aggregations on pandas groupby/pivot_table vs group_sum/pivot_sum.
+
+    python benchmarks/bench_group_sums.py [n_groupings] [n_stores] [n_months] [density]
+
+Each call is timed on the key columns as loaded (object strings) and as
+categoricals, where the codes come for free and only the bincount is left.
+"""
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+from synthetic import make_sales_data
+
+from group_sums import group_sum, pivot_sum
+
+# (label, pandas call, group_sums call)
+CALLS = [
+    ("group sales: Group x Date",
+     lambda d: d.groupby(['Group', 'Date'], observed=True)['Penjualan'].sum().reset_index(),
+     lambda d: group_sum(d, ['Group', 'Date'], 'Penjualan')),
+    ("gross margin: Store x Grouping",
+     lambda d: d.groupby(['Store Name', 'Grouping'], observed=True)[['Gross Margin', 'Penjualan']].sum().reset_index(),
+     lambda d: group_sum(d, ['Store Name', 'Grouping'], ['Gross Margin', 'Penjualan'])),
+    ("gross margin: Div x Store x yr x Mon",
+     lambda d: d.groupby(['Division', 'Store Name', 'year', 'Month'], observed=True)[['Gross Margin', 'Penjualan']].sum()
+     .reset_index(),
+     lambda d: group_sum(d, ['Division', 'Store Name', 'year', 'Month'], ['Gross Margin', 'Penjualan'])),
+    ("pivot: Store x Date",
+     lambda d: d.pivot_table(values='Stock Value', index='Store Name', columns='Date', aggfunc='sum', fill_value=0,
+                               observed=True),
+     lambda d: pivot_sum(d, 'Store Name', 'Date', 'Stock Value')),
+    ("pivot: Grouping x Date",
+     lambda d: d.pivot_table(values='Penjualan', index='Grouping', columns='Date', aggfunc='sum', fill_value=0,
+                               observed=True),
+     lambda d: pivot_sum(d, 'Grouping', 'Date', 'Penjualan')),
+]
+
+
+def best_of(func, data, repeat=5):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(data)
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main():
+    args = [float(a) for a in sys.argv[1:]]
+    n_groupings, n_stores, n_months = (int(a) for a in (args + [2_000, 50, 24][len(args):])[:3])
+    density = args[3] if len(args) > 3 else 0.3
+    data = make_sales_data(n_groupings, n_stores, n_months, density)
+    categorical = data.astype({col: 'category' for col in ['Grouping', 'Store Name', 'Group', 'Division', 'Month']})
+    print(f"{len(data):,} rows")
+
+    print(f"\n{'':<38}{'keys':<13}{'pandas ms':>10}{'codes ms':>10}{'speedup':>9}")
+    for label, pandas_call, codes_call in CALLS:
+        for keys, frame in (('object', data), ('categorical', categorical)):
+            expected, result = pandas_call(frame), codes_call(frame)
+            assert np.allclose(np.asarray(expected.select_dtypes('number'), dtype=float),
+                               np.asarray(result.select_dtypes('number'), dtype=float), rtol=1e-12)
+            pandas_s = best_of(pandas_call, frame)
+            codes_s = best_of(codes_call, frame)
+            print(f"{label:<38}{keys:<13}{pandas_s * 1000:>10.1f}{codes_s * 1000:>10.1f}{pandas_s / codes_s:>8.1f}x")
+
+
+if __name__ == '__main__':
+    main()
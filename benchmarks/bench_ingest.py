@@ -0,0 +1,61 @@
+"""Ingest time of the same sales rows uploaded as Excel, CSV and Parquet.
+
+    python benchmarks/bench_ingest.py [n_rows] [--no-xlsx]
+
+Each file goes through load_sales_upload as an upload would, so files over
+LARGE_FILE_BYTES take the chunked path. Writing and reading the workbook
+dominates the run time; --no-xlsx leaves it out.
+"""
+import io
+import sys
+import time
+
+from synthetic import make_sales_data
+
+from data_loader import LARGE_FILE_BYTES, load_sales_upload
+
+COLUMNS = ['Grouping', 'Penjualan', 'HPP', 'Gross Margin', 'Store Name', 'Month', 'year', 'Stock Value']
+
+
+def indonesian(values):
+    # '.' as the thousands separator and ',' as the decimal mark
+    return values.map(lambda v: f"{v:,.2f}".replace(',', ' ').replace('.', ',').replace(' ', '.'))
+
+
+def main():
+    args = [arg for arg in sys.argv[1:] if not arg.startswith('--')]
+    n_rows = int(args[0]) if args else 1_000_000
+    n_groupings, n_stores, n_months = 2_000, 50, 24
+    rows = make_sales_data(n_groupings=n_groupings, n_stores=n_stores, n_months=n_months,
+                           density=min(n_rows / (n_groupings * n_stores * n_months), 1.0))[COLUMNS]
+    rows = rows.rename(columns={'year': 'Year'})
+    print(f"{len(rows):,} rows")
+
+    formatted = rows.copy()
+    for col in ['Penjualan', 'HPP', 'Gross Margin', 'Stock Value']:
+        formatted[col] = indonesian(formatted[col])
+
+    writers = {
+        'CSV': lambda buf: rows.to_csv(buf, index=False),
+        'CSV (Indonesian, ;)': lambda buf: formatted.to_csv(buf, index=False, sep=';'),
+        'Parquet': lambda buf: rows.to_parquet(buf, index=False),
+    }
+    if '--no-xlsx' not in sys.argv:
+        writers['Excel'] = lambda buf: rows.to_excel(buf, index=False)
+
+    print(f"\n{'format':<22}{'MB':>8}{'path':>9}{'seconds':>10}{'rows/s':>12}")
+    for fmt, write in writers.items():
+        buf = io.BytesIO()
+        write(buf)
+        data = buf.getvalue()
+        extension = {'Parquet': 'parquet', 'Excel': 'xlsx'}.get(fmt, 'csv')
+
+        start = time.perf_counter()
+        loaded = load_sales_upload(io.BytesIO(data), len(data), name=f"sales.{extension}")
+        seconds = time.perf_counter() - start
+        path = 'chunked' if len(data) > LARGE_FILE_BYTES else 'one go'
+        print(f"{fmt:<22}{len(data) / 1024 ** 2:>8.1f}{path:>9}{seconds:>10.2f}{len(loaded) / seconds:>12,.0f}")
+
+
+if __name__ == '__main__':
+    main()
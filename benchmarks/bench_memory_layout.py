@@ -0,0 +1,89 @@
+"""Bytes per row of the rollups at full width vs in the compact layout,
+and a check that every tab's results are unchanged by the layout.
+
+    python benchmarks/bench_memory_layout.py [n_groupings] [n_stores] [n_months] [density]
+
+The check runs DASHBOARD_GRAPH, the Tab 8 details, the Grouping rankings
+and the growth KPIs on the filters of both layouts, at every grain, with
+all months and with one left out, and requires exactly equal values.
+"""
+import sys
+
+import numpy as np
+import pandas as pd
+from synthetic import make_sales_data
+
+from aggregations import DASHBOARD_GRAPH, detailed_gm_division, detailed_gm_store
+from filters import filter_rollups
+from growth_kpis import GrowthKPIs
+from ranking import RANK_MEASURES, GroupingRanker
+from rollups import GRAINS, Rollups
+
+
+def bytes_per_row(frame):
+    usage = frame.memory_usage(deep=True, index=False)
+    return usage / len(frame)
+
+
+def tab_results(rollups, grain, all_months=True):
+    monthly = rollups.monthly
+    months = list(monthly['Month'].unique())
+    view = filter_rollups(rollups, sorted(monthly['Group'].unique()), sorted(monthly['year'].unique()),
+                          months if all_months else months[1:], sorted(monthly['Store Name'].unique()),
+                          sorted(monthly['Grouping'].unique())[:3], grain)
+    results = dict(DASHBOARD_GRAPH.run({'filtered_data': view.filtered_data, 'grain_data': view.grain_data,
+                                        'grain': grain, 'comparison_col': 'Grouping'}).results)
+    results['detail_pivot'] = results['detail_pivot'].dense_sales(np.arange(results['detail_pivot'].shape[0]))
+    results['detailed_gm_store'] = detailed_gm_store(view.filtered_data)
+    results['detailed_gm_division'] = detailed_gm_division(view.filtered_data)
+    results['kelompok_data'] = view.kelompok_data
+    ranker = GroupingRanker(view.filtered_data)
+    for measure in RANK_MEASURES:
+        results[f"rank {measure}"] = ranker.rank(measure, 10)
+    growth = GrowthKPIs(view.filtered_data)
+    results['growth'] = growth.at('Penjualan', growth.months[-1], 'Store Name')
+    return results
+
+
+def same(left, right):
+    if isinstance(left, pd.DataFrame):
+        pd.testing.assert_frame_equal(left, right, check_exact=True, check_dtype=False, check_categorical=False,
+                                      check_index_type=False, check_column_type=False)
+    elif isinstance(left, np.ndarray):
+        np.testing.assert_array_equal(left, right)
+    else:
+        assert left == right, (left, right)
+
+
+def main():
+    args = [float(a) for a in sys.argv[1:]]
+    n_groupings, n_stores, n_months = (int(a) for a in (args + [2_000, 50, 24][len(args):])[:3])
+    density = args[3] if len(args) > 3 else 0.3
+    rows = make_sales_data(n_groupings, n_stores, n_months, density).drop(columns='Rows')
+    wide = Rollups.from_rows(rows, compact_layout=False)
+    narrow = Rollups.from_rows(rows)
+
+    before, after = bytes_per_row(wide.monthly), bytes_per_row(narrow.monthly)
+    print(f"monthly rollup: {len(wide.monthly):,} rows\n")
+    print(f"{'column':<14}{'dtype before':>14}{'dtype after':>14}{'B/row before':>14}{'B/row after':>13}")
+    for col in before.index:
+        print(f"{col:<14}{str(wide.monthly[col].dtype):>14}{str(narrow.monthly[col].dtype):>14}"
+              f"{before[col]:>14.1f}{after[col]:>13.1f}")
+    print(f"{'total':<14}{'':>28}{before.sum():>14.1f}{after.sum():>13.1f}")
+    for grain in GRAINS:
+        wide_mb = wide.at(grain).memory_usage(deep=True).sum() / 2 ** 20
+        narrow_mb = narrow.at(grain).memory_usage(deep=True).sum() / 2 ** 20
+        print(f"{grain:<8} rollup: {wide_mb:8.1f} MB -> {narrow_mb:6.1f} MB")
+
+    # With a month left out, the coarser grains are re-derived from the filtered months
+    for grain in GRAINS:
+        for all_months in (True, False):
+            expected, results = tab_results(wide, grain, all_months), tab_results(narrow, grain, all_months)
+            for name in expected:
+                same(expected[name], results[name])
+            print(f"{grain}, {'all months' if all_months else 'one month left out'}: "
+                  f"{len(expected)} results identical")
+
+
+if __name__ == '__main__':
+    main()
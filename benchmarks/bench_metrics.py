@@ -0,0 +1,47 @@
+"""Cost of recording metrics with exporting off and on, and of one scrape.
+
+    python benchmarks/bench_metrics.py [n_calls]
+"""
+import sys
+import time
+
+import synthetic  # noqa: F401  (puts the repository root on sys.path)
+
+from metrics import MetricsRegistry, SECONDS_BUCKETS
+
+
+def us_per_call(func, n_calls):
+    start = time.perf_counter()
+    for _ in range(n_calls):
+        func()
+    return (time.perf_counter() - start) / n_calls * 1e6
+
+
+def main():
+    n_calls = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+
+    print(f"{'':<10}{'inc us':>10}{'observe us':>12}{'timed us':>10}")
+    for enabled in (False, True):
+        registry = MetricsRegistry(enabled=enabled)
+        registry.describe('rows', 'counter', "Rows.")
+        registry.describe('seconds', 'histogram', "Seconds.", SECONDS_BUCKETS)
+
+        def timed():
+            with registry.timed('seconds', tab='Tab'):
+                pass
+
+        print(f"{'on' if enabled else 'off':<10}"
+              f"{us_per_call(lambda: registry.inc('rows', 10, reason='numeric'), n_calls):>10.3f}"
+              f"{us_per_call(lambda: registry.observe('seconds', 0.2, tab='Tab'), n_calls):>12.3f}"
+              f"{us_per_call(timed, n_calls):>10.3f}")
+
+    # A scrape of a registry with every tab and chart recorded
+    for i in range(20):
+        registry.observe('seconds', 0.01 * i, tab=f"Tab {i}")
+    start = time.perf_counter()
+    text = registry.prometheus_text()
+    print(f"\nscrape: {(time.perf_counter() - start) * 1000:.2f} ms for {len(text.splitlines())} lines")
+
+
+if __name__ == '__main__':
+    main()
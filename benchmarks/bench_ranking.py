@@ -0,0 +1,69 @@
+"""GroupingRanker against groupby + nlargest/nsmallest on every rerun.
+
+    python benchmarks/bench_ranking.py [n_groupings] [n_stores] [n_months]
+"""
+import sys
+import time
+
+from synthetic import make_sales_data
+
+from ranking import GroupingRanker
+
+
+def timed(func, runs=5):
+    best = None
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best * 1000, result
+
+
+def pandas_rerun(data, k):
+    # What Tab 7 and Tab 9 did on every rerun
+    all_performers = data.groupby('Grouping')['Penjualan'].sum().reset_index()
+    top = all_performers.nlargest(k, 'Penjualan')
+    bottom = all_performers[all_performers['Penjualan'] > 0].nsmallest(k, 'Penjualan')
+    stock_avg = data.groupby('Grouping')['Stock Value'].mean().reset_index()
+    return top, bottom, stock_avg.nlargest(k, 'Stock Value')
+
+
+def ranker_queries(ranker, k):
+    return (
+        ranker.rank('Sales', k),
+        ranker.rank('Sales', k, largest=False, positive_only=True),
+        ranker.rank('Average Stock Value', k),
+    )
+
+
+def main():
+    n_groupings = int(sys.argv[1]) if len(sys.argv) > 1 else 50_000
+    n_stores = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    n_months = int(sys.argv[3]) if len(sys.argv) > 3 else 12
+    data = make_sales_data(n_groupings=n_groupings, n_stores=n_stores, n_months=n_months, density=0.1)
+    print(f"{len(data):,} rows, {data['Grouping'].nunique():,} Grouping")
+
+    build_ms, ranker = timed(lambda: GroupingRanker(data), runs=3)
+    print(f"{'build ranker (once per filter change)':<44}{build_ms:>10.1f} ms")
+
+    for k in (10, 100, 1_000):
+        pandas_ms, expected = timed(lambda: pandas_rerun(data, k))
+        # A fresh ranker each time so the per-ranking cache does not hide the selection cost
+        fresh = GroupingRanker(data)
+        first_ms, _ = timed(lambda: ranker_queries(fresh, k), runs=1)
+        ranked = ranker_queries(ranker, k)
+        assert ranked[0].index.tolist() == expected[0].index.tolist()
+        assert ranked[1].index.tolist() == expected[1].index.tolist()
+        print(f"k={k:<6}groupby + nlargest per rerun{pandas_ms:>14.1f} ms   "
+              f"ranker first query {first_ms:>7.2f} ms")
+
+    store = ranker.scope_values('Store')[0]
+    scope_ms, _ = timed(lambda: GroupingRanker.rank(ranker, 'Margin %', 10, scope='Store', value=store), runs=1)
+    print(f"{'first Margin % ranking within one store':<44}{scope_ms:>10.2f} ms")
+    cached_ms, _ = timed(lambda: ranker_queries(ranker, 10))
+    print(f"{'repeat query (cached)':<44}{cached_ms:>10.3f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,59 @@
+"""Time and memory of writing the full report workbook.
+
+    python benchmarks/bench_report.py [n_groupings] [n_stores] [n_months]
+
+The defaults give about 500k Tab 3 detail rows. Peak RSS is read from the
+OS, so run the script on its own rather than with other benchmarks.
+"""
+import os
+import resource
+import sys
+import tempfile
+import time
+
+from synthetic import make_sales_data
+
+from aggregations import DASHBOARD_GRAPH, detail_page
+from exports import write_workbook
+from ranking import GroupingRanker
+from report import report_sheets
+
+
+def peak_rss_mb():
+    # ru_maxrss is in kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def main():
+    n_groupings = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000
+    n_stores = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+    n_months = int(sys.argv[3]) if len(sys.argv) > 3 else 12
+    rows = make_sales_data(n_groupings=n_groupings, n_stores=n_stores, n_months=n_months, density=0.3)
+    aggregates = DASHBOARD_GRAPH.run({'filtered_data': rows, 'grain_data': rows, 'grain': 'Month',
+                                      'comparison_col': 'Division'})
+    ranker = GroupingRanker(rows)
+    performers = [("Top 10 Grouping", ranker.rank('Sales', 10)),
+                  ("Bottom 10 Grouping", ranker.rank('Sales', 10, largest=False, positive_only=True))]
+
+    detail = aggregates['detail_pivot']
+    n_detail = len(detail.rows)
+    sample = detail_page(detail, list(range(min(n_detail, 10_000))), 'Month')
+    dense_mb = sample.memory_usage(deep=True).sum() / len(sample) * n_detail / 1024 ** 2
+    print(f"{len(rows):,} monthly rows; detail sheet {n_detail:,} rows x {sample.shape[1]} columns "
+          f"({n_detail * sample.shape[1]:,} cells, {dense_mb:,.0f} MB if densified at once)")
+
+    handle, path = tempfile.mkstemp(suffix=".xlsx")
+    os.close(handle)
+    try:
+        rss_before = peak_rss_mb()
+        start = time.perf_counter()
+        write_workbook(report_sheets(aggregates, rows, 'Month', performers), path)
+        elapsed = time.perf_counter() - start
+        print(f"{'full report':<24}{elapsed:>10.1f} s{os.path.getsize(path) / 1024 ** 2:>10.1f} MB file")
+        print(f"{'peak RSS growth':<24}{peak_rss_mb() - rss_before:>10.0f} MB")
+    finally:
+        os.remove(path)
+
+
+if __name__ == '__main__':
+    main()
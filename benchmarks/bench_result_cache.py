@@ -0,0 +1,62 @@
+"""Cost of the filter and aggregation results kept in the shared result cache:
+computing them (a miss), measuring their size, and looking them up (a hit).
+
+    python benchmarks/bench_result_cache.py [n_groupings] [n_stores] [n_months]
+"""
+import sys
+import time
+
+from synthetic import make_sales_data
+
+from aggregations import DASHBOARD_GRAPH
+from filters import general_rows
+from growth_kpis import GrowthKPIs
+from ranking import GroupingRanker
+from result_cache import ResultCache, nbytes, result_key
+from rollups import Rollups
+
+
+def ms(func):
+    start = time.perf_counter()
+    result = func()
+    return result, (time.perf_counter() - start) * 1000
+
+
+def main():
+    n_groupings = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000
+    n_stores = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+    n_months = int(sys.argv[3]) if len(sys.argv) > 3 else 24
+    rollups = Rollups(make_sales_data(n_groupings=n_groupings, n_stores=n_stores, n_months=n_months, density=0.1))
+    monthly = rollups.monthly
+    groups = sorted(monthly['Group'].unique())
+    years = sorted(monthly['year'].unique())
+    months = sorted(monthly['Month'].unique())
+    stores = sorted(monthly['Store Name'].unique())[::2]
+    print(f"{len(monthly):,} monthly rows, half of the stores selected")
+
+    cache = ResultCache()
+    key = result_key('dataset', groups=groups, years=years, months=months, stores=stores)
+    view = key + (('grain', 'Month'),)
+    filtered_data, grain_data = general_rows(rollups, groups, years, months, stores, 'Month')
+    results = {
+        'general_rows': lambda: general_rows(rollups, groups, years, months, stores, 'Month'),
+        'aggregates': lambda: DASHBOARD_GRAPH.run({'filtered_data': filtered_data, 'grain_data': grain_data,
+                                                   'grain': 'Month', 'comparison_col': 'Division'}),
+        'grouping_ranker': lambda: GroupingRanker(filtered_data),
+        'growth_kpis': lambda: GrowthKPIs(filtered_data),
+    }
+
+    print(f"\n{'result':<18}{'miss ms':>10}{'size ms':>10}{'hit ms':>10}{'MB':>10}")
+    for name, compute in results.items():
+        value, miss = ms(lambda: cache.get_or_compute((name, view), compute))
+        size, size_ms = ms(lambda: nbytes(value))
+        _, hit = ms(lambda: cache.get_or_compute((name, view), compute))
+        print(f"{name:<18}{miss - size_ms:>10.1f}{size_ms:>10.1f}{hit:>10.3f}{size / 1024 ** 2:>10.1f}")
+
+    # The same selection picked in another order is the same key
+    reordered = result_key('dataset', groups=groups[::-1], years=years, months=months[::-1], stores=stores[::-1])
+    print(f"\nreordered selection hits: {reordered == key}; {cache.stats()}")
+
+
+if __name__ == '__main__':
+    main()
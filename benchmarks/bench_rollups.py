@@ -0,0 +1,47 @@
+"""Cost of the materialized rollups and of the dashboard graph at each grain.
+
+    python benchmarks/bench_rollups.py [n_groupings] [n_stores] [n_months]
+"""
+import sys
+import time
+
+from synthetic import make_sales_data
+
+from aggregations import DASHBOARD_GRAPH
+from rollups import GRAINS, Rollups, coarsen
+
+
+def best_ms(func, runs=3):
+    best = None
+    for _ in range(runs):
+        start = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best * 1000
+
+
+def main():
+    n_groupings = int(sys.argv[1]) if len(sys.argv) > 1 else 2_000
+    n_stores = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+    n_months = int(sys.argv[3]) if len(sys.argv) > 3 else 60
+    rows = make_sales_data(n_groupings=n_groupings, n_stores=n_stores, n_months=n_months, density=0.1)
+    print(f"{len(rows):,} monthly rows over {n_months} months")
+
+    rollups = Rollups(rows)
+    print(f"{'materialize quarter + year (once, at ingest)':<48}"
+          f"{best_ms(lambda: Rollups(rows)):>10.1f} ms")
+    for grain in GRAINS[1:]:
+        print(f"{'re-derive ' + grain.lower() + ' from monthly (month subset)':<48}"
+              f"{best_ms(lambda: coarsen(rows, grain)):>10.1f} ms")
+
+    print(f"\n{'grain':<10}{'rows':>12}{'periods':>10}{'graph wall ms':>16}")
+    for grain in GRAINS:
+        grain_data = rollups.at(grain)
+        values = {'filtered_data': rows, 'grain_data': grain_data, 'grain': grain, 'comparison_col': 'Division'}
+        wall = best_ms(lambda: DASHBOARD_GRAPH.run(values))
+        print(f"{grain:<10}{len(grain_data):>12,}{grain_data['Date'].nunique():>10}{wall:>16.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,67 @@
+"""Memory and time of the Tab 3 detail pivot: dense pivot_table vs SparsePivot.
+
+    python benchmarks/bench_sparse_pivot.py [n_groupings] [n_stores] [n_months] [density]
+"""
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+from synthetic import make_sales_data
+
+from aggregations import detail_page, detail_pivot
+
+
+def dense_detail_table(filtered_data):
+    # The Tab 3 table as it was built before the sparse pivot
+    detail = filtered_data.pivot_table(values="Penjualan", index=["Grouping", "Store Name", "Group"],
+                                       columns="Date", aggfunc="sum", fill_value=0)
+    detail = detail.reindex(sorted(detail.columns), axis=1)
+    detail.columns = [d.strftime('%b %Y') for d in detail.columns]
+    combined = pd.concat([detail, detail.diff(axis=1), detail.pct_change(axis=1) * 100],
+                         keys=["Sales", "Change", "Percent Change"], axis=1)
+    combined.reset_index(inplace=True)
+    combined.columns = ['_'.join(str(i) for i in col if str(i) != '') for col in combined.columns]
+    sales_cols = [c for c in combined.columns if c.startswith("Sales_")]
+    combined['Total Sales'] = combined[sales_cols].sum(axis=1)
+    combined['Rank'] = combined.groupby('Group')['Total Sales'].rank(ascending=False, method='min')
+    return combined.sort_values(['Group', 'Rank'])
+
+
+def measure(func):
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = func()
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return result, elapsed, peak
+
+
+def main():
+    args = [float(a) for a in sys.argv[1:]]
+    n_groupings, n_stores, n_months = (int(a) for a in (args + [3_000, 150, 24][len(args):])[:3])
+    density = args[3] if len(args) > 3 else 0.05
+    data = make_sales_data(n_groupings, n_stores, n_months, density)
+    print(f"{len(data):,} rows, {n_groupings:,} groupings x {n_stores} stores x {n_months} months")
+
+    dense, dense_time, dense_peak = measure(lambda: dense_detail_table(data))
+    dense_bytes = int(dense.memory_usage(deep=True).sum())
+    del dense
+
+    pivot, sparse_time, sparse_peak = measure(lambda: detail_pivot(data))
+    page, page_time, page_peak = measure(lambda: detail_page(pivot, np.arange(min(100, pivot.shape[0]))))
+    sparse_bytes = pivot.nbytes + pivot.changes().nbytes + pivot.pct_changes().data.nbytes
+
+    print(f"pivot rows x months: {pivot.shape[0]:,} x {pivot.shape[1]}, "
+          f"{pivot.cells.data.size / max(pivot.shape[0] * pivot.shape[1], 1):.1%} of cells observed")
+    print(f"{'':<22}{'build s':>10}{'peak MB':>10}{'result MB':>11}")
+    print(f"{'dense pivot_table':<22}{dense_time:>10.2f}{dense_peak / 2**20:>10.1f}{dense_bytes / 2**20:>11.1f}")
+    print(f"{'sparse pivot':<22}{sparse_time:>10.2f}{sparse_peak / 2**20:>10.1f}{sparse_bytes / 2**20:>11.1f}")
+    print(f"{'densify 100-row page':<22}{page_time:>10.3f}{page_peak / 2**20:>10.1f}"
+          f"{page.memory_usage(deep=True).sum() / 2**20:>11.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,45 @@
+"""Serial vs concurrent run of the dashboard aggregation graph.
+
+    python benchmarks/bench_task_graph.py [n_groupings] [n_stores]
+"""
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from synthetic import make_sales_data
+
+from aggregations import DASHBOARD_GRAPH
+from task_graph import MAX_WORKERS
+
+
+def best_of(runs, func):
+    best = None
+    for _ in range(runs):
+        result = func()
+        if best is None or result.wall_time < best.wall_time:
+            best = result
+    return best
+
+
+def main():
+    n_groupings = int(sys.argv[1]) if len(sys.argv) > 1 else 2_000
+    n_stores = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+    data = make_sales_data(n_groupings=n_groupings, n_stores=n_stores)
+    values = {'filtered_data': data, 'grain_data': data, 'grain': 'Month', 'comparison_col': 'Division'}
+    print(f"{len(data):,} rows, {MAX_WORKERS} worker threads")
+
+    with ThreadPoolExecutor(max_workers=1) as serial:
+        serial_run = best_of(3, lambda: DASHBOARD_GRAPH.run(values, executor=serial))
+    parallel_run = best_of(3, lambda: DASHBOARD_GRAPH.run(values))
+
+    print(f"{'task':<26}{'serial ms':>12}{'parallel ms':>14}{'thread':>20}")
+    serial_times = {t.name: (t.end - t.start) * 1000 for t in serial_run.timeline}
+    for t in parallel_run.timeline:
+        print(f"{t.name:<26}{serial_times[t.name]:>12.1f}{(t.end - t.start) * 1000:>14.1f}{t.thread:>20}")
+    print(f"serial wall   {serial_run.wall_time * 1000:,.1f} ms")
+    print(f"parallel wall {parallel_run.wall_time * 1000:,.1f} ms")
+    print(f"speedup       {serial_run.wall_time / parallel_run.wall_time:.2f}x")
+
+
+if __name__ == '__main__':
+    main()
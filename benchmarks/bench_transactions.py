@@ -0,0 +1,79 @@
+"""Streaming rollup of transaction-level files: time and peak memory by file size.
+
+    python benchmarks/bench_transactions.py [millions of rows ...]
+
+For each size a Parquet file of line items over the same Grouping x Store x
+day space is written a million rows at a time, then rolled up to monthly
+grain by load_transactions. The files are written by a child process, and
+the sizes are loaded in increasing order in this one, so the peak RSS is
+that of loading and stops growing once the cells stop growing.
+"""
+import multiprocessing
+import os
+import resource
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from synthetic import GROUPS
+
+from data_loader import load_transactions
+
+WRITE_ROWS = 1_000_000
+
+
+def write_transactions(path, n_rows, n_groupings=2_000, n_stores=50, n_days=730, seed=0):
+    rng = np.random.default_rng(seed)
+    groupings = np.array([f"{GROUPS[i % 3]} ITEM {i:05d}" for i in range(n_groupings)])
+    stores = np.array([f"Store {i:03d}" for i in range(n_stores)])
+    days = pd.date_range("2023-01-01", periods=n_days, freq="D").to_numpy()
+
+    with pq.ParquetWriter(path, pa.schema([
+        ('Grouping', pa.string()), ('Penjualan', pa.float64()), ('HPP', pa.float64()),
+        ('Store Name', pa.string()), ('Date', pa.timestamp('ns')), ('Stock Value', pa.float64()),
+    ])) as writer:
+        for start in range(0, n_rows, WRITE_ROWS):
+            n = min(WRITE_ROWS, n_rows - start)
+            penjualan = rng.integers(1_000, 500_000, size=n).astype(float)
+            writer.write_table(pa.table({
+                'Grouping': groupings[rng.integers(0, n_groupings, size=n)],
+                'Penjualan': penjualan,
+                'HPP': np.round(penjualan * rng.uniform(0.6, 0.95, size=n)),
+                'Store Name': stores[rng.integers(0, n_stores, size=n)],
+                'Date': np.sort(days[rng.integers(0, n_days, size=n)]),
+                'Stock Value': rng.integers(0, 10_000_000, size=n).astype(float),
+            }))
+
+
+def peak_rss_mb():
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return (peak if sys.platform == 'darwin' else peak * 1024) / 1024 ** 2
+
+
+def main():
+    sizes = [float(arg) for arg in sys.argv[1:]] or [1, 4, 16]
+    print(f"{'rows':>12}{'file MB':>10}{'cells':>12}{'seconds':>10}{'rows/s':>12}{'peak MB':>10}")
+    with tempfile.TemporaryDirectory() as directory:
+        for millions in sorted(sizes):
+            n_rows = int(millions * 1_000_000)
+            path = os.path.join(directory, f"transactions_{n_rows}.parquet")
+            writer = multiprocessing.get_context('spawn').Process(target=write_transactions, args=(path, n_rows))
+            writer.start()
+            writer.join()
+
+            start = time.perf_counter()
+            with open(path, 'rb') as f:
+                monthly = load_transactions(f, name=path)
+            seconds = time.perf_counter() - start
+            print(f"{n_rows:>12,}{os.path.getsize(path) / 1024 ** 2:>10.0f}{len(monthly):>12,}{seconds:>10.1f}"
+                  f"{n_rows / seconds:>12,.0f}{peak_rss_mb():>10.0f}")
+            os.remove(path)
+
+
+if __name__ == '__main__':
+    main()
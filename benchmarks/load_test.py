@@ -0,0 +1,208 @@
+"""Load test of the dashboard: N simulated sessions at once.
+
+Every session drives sales_dashboard.py through Streamlit's AppTest with the
+same scripted interactions: upload a synthetic workbook, change the store
+selection, toggle the Tab 1 checkboxes and switch the Tab 9 comparison
+basis. Each level of concurrency uploads freshly generated workbooks.
+
+AppTest keeps its runtime in process globals, so concurrent sessions cannot
+share a process: each session runs in a process of its own. Unlike in one
+Streamlit server, sessions therefore do not share the result cache or the
+ingest jobs; the latencies show N sessions competing for the CPU, and the
+total memory is an upper bound, since every process holds its own copy of
+the libraries.
+
+For each number of sessions the script reports the p50/p95/p99 latency of
+the interaction reruns, reruns per second and the peak resident memory per
+session and in total; ``--json`` also writes the table for regression
+tracking.
+
+    python benchmarks/load_test.py [--sessions 1,2,4,8] [--files 1] [--groupings 200]
+                                   [--stores 20] [--months 24] [--json results.json]
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import tempfile
+import time
+
+import numpy as np
+from streamlit.testing.v1 import AppTest
+from synthetic import ROOT, make_sales_data
+
+from metrics import peak_resident_memory_bytes
+
+# Longest wait for one upload to be loaded
+INGEST_TIMEOUT = 600.0
+
+
+def session_script():
+    # Run by AppTest as the app of one session: the file uploader returns the
+    # workbook named in session state, then the dashboard itself runs
+    import io
+    import os
+    import runpy
+
+    import streamlit as st
+
+    class Upload(io.BytesIO):
+        def __init__(self, path):
+            with open(path, 'rb') as f:
+                super().__init__(f.read())
+            self.name = os.path.basename(path)
+            self.size = len(self.getvalue())
+            self.file_id = self.name
+
+    path = st.session_state['load_test_file']
+    st.file_uploader = lambda *args, **kwargs: Upload(path)
+    runpy.run_path(os.path.join(st.session_state['load_test_root'], 'sales_dashboard.py'), run_name='__main__')
+
+
+def write_workbook(path, n_groupings, n_stores, n_months, seed):
+    """A synthetic upload with the columns of the ERP export."""
+    rows = make_sales_data(n_groupings=n_groupings, n_stores=n_stores, n_months=n_months, seed=seed)
+    rows = rows[['Grouping', 'Penjualan', 'HPP', 'Gross Margin', 'Store Name', 'Month', 'year', 'Stock Value']]
+    rows.rename(columns={'year': 'Year'}).to_excel(path, index=False)
+    return len(rows)
+
+
+def check(at):
+    if at.exception:
+        raise RuntimeError(at.exception[0].value)
+    if at.error:
+        raise RuntimeError(at.error[0].value)
+
+
+def run_session(path, session, timeout):
+    """Run the scripted interactions of one session; returns (ingest seconds, rerun latencies)."""
+    at = AppTest.from_function(session_script, default_timeout=timeout)
+    at.session_state['load_test_file'] = path
+    at.session_state['load_test_root'] = ROOT
+
+    # Upload: rerun, as the progress fragment does, until the ingest job is done
+    start = time.perf_counter()
+    at.run()
+    while not at.success:
+        check(at)
+        if time.perf_counter() - start > timeout:
+            raise TimeoutError(f"Session {session} was not loaded after {timeout:.0f} s")
+        time.sleep(0.2)
+        at.run()
+    ingest = time.perf_counter() - start
+
+    def interact(action):
+        action()
+        started = time.perf_counter()
+        at.run()
+        latencies.append(time.perf_counter() - started)
+        check(at)
+
+    latencies = []
+    # Sessions drop a different store each, so they do not only ask for the same results
+    stores = next(m for m in at.multiselect if m.label == "Select Stores:")
+    dropped = stores.options[session % len(stores.options)]
+    interact(lambda: stores.unselect(dropped))
+    interact(lambda: at.checkbox(key='group_pct').check())
+    interact(lambda: at.checkbox(key='group_contribution').check())
+    interact(lambda: at.checkbox(key='group_pct').uncheck())
+    for basis in ("Store", "Grouping", "Division"):
+        interact(lambda: at.selectbox(key='comparison_basis').select(basis))
+    return ingest, latencies
+
+
+def session_process(path, session, timeout, barrier, results):
+    # One session per process: all sessions start together once every process has imported streamlit
+    barrier.wait()
+    started = time.time()
+    try:
+        ingest, latencies = run_session(path, session, timeout)
+    except Exception as e:
+        results.put((session, f"{type(e).__name__}: {e}"))
+        return
+    results.put((session, {
+        'ingest': ingest,
+        'latencies': latencies,
+        'started': started,
+        'finished': time.time(),
+        'peak_rss': peak_resident_memory_bytes(),
+    }))
+
+
+def run_level(paths, n_sessions, timeout):
+    """Run ``n_sessions`` sessions at once; returns the row of the results table."""
+    # Fresh processes, so that each one's peak resident memory is its session's
+    context = multiprocessing.get_context('spawn')
+    barrier = context.Barrier(n_sessions)
+    queue = context.Queue()
+    processes = [
+        context.Process(target=session_process, args=(paths[i % len(paths)], i, timeout, barrier, queue))
+        for i in range(n_sessions)
+    ]
+    for process in processes:
+        process.start()
+    sessions = dict(queue.get() for _ in processes)
+    for process in processes:
+        process.join()
+
+    failed = {session: result for session, result in sessions.items() if isinstance(result, str)}
+    if failed:
+        raise RuntimeError(f"{len(failed)} of {n_sessions} sessions failed, e.g. session "
+                           f"{min(failed)}: {failed[min(failed)]}")
+    results = list(sessions.values())
+    latencies = np.array([latency for result in results for latency in result['latencies']])
+    p50, p95, p99 = np.percentile(latencies, [50, 95, 99]) * 1000
+    wall = max(r['finished'] for r in results) - min(r['started'] for r in results)
+    peaks = [r['peak_rss'] / 1024 ** 2 for r in results]
+    return {
+        'sessions': n_sessions,
+        'reruns': len(latencies),
+        'ingest_s': max(r['ingest'] for r in results),
+        'p50_ms': p50,
+        'p95_ms': p95,
+        'p99_ms': p99,
+        'reruns_per_s': len(latencies) / wall,
+        'wall_s': wall,
+        'peak_rss_mb_per_session': max(peaks),
+        'peak_rss_mb_total': sum(peaks),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the dashboard with concurrent AppTest sessions.")
+    parser.add_argument('--sessions', default='1,2,4,8',
+                        help="comma separated numbers of concurrent sessions (default: 1,2,4,8)")
+    parser.add_argument('--files', type=int, default=1,
+                        help="distinct workbooks the sessions of a level upload (default: 1)")
+    parser.add_argument('--groupings', type=int, default=200)
+    parser.add_argument('--stores', type=int, default=20)
+    parser.add_argument('--months', type=int, default=24)
+    parser.add_argument('--timeout', type=float, default=INGEST_TIMEOUT, help="seconds allowed per upload or rerun")
+    parser.add_argument('--json', help="also write the results table to this JSON file")
+    args = parser.parse_args()
+    levels = [int(n) for n in args.sessions.split(',')]
+
+    rows = []
+    print(f"{'sessions':>8}{'reruns':>8}{'ingest s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}"
+          f"{'reruns/s':>10}{'MB/session':>12}{'MB total':>10}")
+    with tempfile.TemporaryDirectory() as directory:
+        for level, n_sessions in enumerate(levels):
+            paths = []
+            for k in range(args.files):
+                path = os.path.join(directory, f"sales_{level}_{k}.xlsx")
+                write_workbook(path, args.groupings, args.stores, args.months, seed=level * args.files + k)
+                paths.append(path)
+
+            row = run_level(paths, n_sessions, args.timeout)
+            rows.append(row)
+            print(f"{row['sessions']:>8}{row['reruns']:>8}{row['ingest_s']:>10.1f}{row['p50_ms']:>10.0f}"
+                  f"{row['p95_ms']:>10.0f}{row['p99_ms']:>10.0f}{row['reruns_per_s']:>10.2f}"
+                  f"{row['peak_rss_mb_per_session']:>12.0f}{row['peak_rss_mb_total']:>10.0f}")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'parameters': vars(args), 'results': rows}, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
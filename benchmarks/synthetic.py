@@ -0,0 +1,57 @@
+"""Synthetic sales data shaped like the monthly rollup the dashboard filters.
+
+Used by the benchmark scripts in this directory. Run from the repository
+root, for example ``python benchmarks/bench_task_graph.py``.
+"""
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+# Make the dashboard modules importable when a benchmark is run as a script
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from data_loader import DIVISIONS  # noqa: E402
+
+GROUPS = ['GRC', 'FRS', 'BZR']
+
+
+def make_sales_data(n_groupings=2_000, n_stores=50, n_months=24, density=0.3, seed=0):
+    """Cleaned rows for ``n_groupings`` x ``n_stores`` over ``n_months``.
+
+    Each (Grouping, Store, month) cell is present with probability
+    ``density``, mirroring how most groupings sell in only some stores
+    and months.
+    """
+    rng = np.random.default_rng(seed)
+    groupings = np.array([f"{GROUPS[i % 3]} ITEM {i:05d}" for i in range(n_groupings)])
+    stores = np.array([f"Store {i:03d}" for i in range(n_stores)])
+    months = pd.date_range("2020-01-01", periods=n_months, freq="MS")
+
+    cells = n_groupings * n_stores * n_months
+    present = np.flatnonzero(rng.random(cells) < density)
+    g, rest = np.divmod(present, n_stores * n_months)
+    s, m = np.divmod(rest, n_months)
+
+    penjualan = rng.integers(1_000, 5_000_000, size=len(present)).astype(float)
+    hpp = np.round(penjualan * rng.uniform(0.6, 0.95, size=len(present)))
+    dates = months[m]
+    frame = pd.DataFrame({
+        'Grouping': groupings[g],
+        'Penjualan': penjualan,
+        'HPP': hpp,
+        'Gross Margin': penjualan - hpp,
+        'Store Name': stores[s],
+        'Month': dates.strftime('%B'),
+        'year': dates.year.astype(int),
+        'Stock Value': rng.integers(0, 10_000_000, size=len(present)).astype(float),
+        'Date': dates,
+    })
+    frame['Rows'] = 1
+    frame['Group'] = frame['Grouping'].str[:3]
+    frame['Division'] = frame['Group'].map(DIVISIONS)
+    frame.sort_values('Date', inplace=True, kind='stable')
+    return frame.reset_index(drop=True)
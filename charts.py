@@ -0,0 +1,292 @@
+"""Plotly figures of the dashboard tabs.
+
+Each function builds one figure from an aggregation result, so the live
+app and the static snapshots (snapshot_report.py) draw the same charts.
+
+The Grouping charts (Tabs 4 and 6) draw one facet per Grouping and one
+trace per store in each facet, so their size grows with both selections.
+They are drawn a page of FACETS_PER_PAGE Grouping at a time (facet_page),
+with the stores outside the LEGEND_STORES largest summed into one "Other"
+store (top_stores); line traces switch to WebGL above WEBGL_POINTS points.
+"""
+import pandas as pd
+import plotly.express as px
+
+from group_sums import group_sum
+from rollups import with_period
+
+# Define a colorblind-friendly palette
+COLOR_PALETTE = px.colors.qualitative.Safe
+
+FACETS_PER_PAGE = 6
+LEGEND_STORES = 10
+OTHER_STORES = "Other"
+# Line charts with more points than this are drawn with scattergl
+WEBGL_POINTS = 1_000
+
+
+def facet_pages(data, per_page=FACETS_PER_PAGE):
+    """Number of pages of ``per_page`` Grouping facets in ``data``."""
+    return max(1, -(-data['Grouping'].nunique() // per_page))
+
+
+def facet_page(data, page, per_page=FACETS_PER_PAGE):
+    """Rows of ``data`` for the Grouping on page ``page`` (from 0), in name order."""
+    groupings = sorted(data['Grouping'].unique())
+    return data[data['Grouping'].isin(groupings[page * per_page:(page + 1) * per_page])]
+
+
+def top_stores(data, n=LEGEND_STORES):
+    """``data`` with the stores outside the ``n`` largest by sales summed into OTHER_STORES,
+    per Grouping and period."""
+    totals = group_sum(data, 'Store Name', 'Penjualan')
+    if len(totals) <= n:
+        return data
+    kept = data['Store Name'].isin(totals.nlargest(n, 'Penjualan')['Store Name'])
+    other = group_sum(data[~kept], ['Date', 'Grouping'], 'Penjualan').assign(**{'Store Name': OTHER_STORES})
+    other['Period'] = other['Date'].map(data.drop_duplicates('Date').set_index('Date')['Period'])
+    columns = ['Date', 'Period', 'Grouping', 'Store Name', 'Penjualan']
+    result = pd.concat([data.loc[kept, columns], other[columns]], ignore_index=True)
+    result['Period'] = pd.Categorical(result['Period'], categories=data['Period'].cat.categories, ordered=True)
+    return result
+
+
+def group_sales_chart(group_sales, grain):
+    """Total sales by Group over time (Tab 1)."""
+    # Period is ordered by date, so the x axis is chronological
+    fig = px.line(
+        group_sales,
+        x="Period",
+        y="Penjualan",
+        color="Group",
+        title="Total Sales by Group Over Time",
+        labels={"Penjualan": "Total Sales", "Period": grain},
+        color_discrete_sequence=COLOR_PALETTE
+    )
+
+    fig.update_traces(mode='lines+markers')
+    fig.update_layout(
+        xaxis_title=grain,
+        yaxis_title='Total Sales',
+        legend_title='Group',
+        hovermode='x unified'
+    )
+    fig.update_traces(
+        hovertemplate=f"Group: %{{legendgroup}}<br>{grain}: %{{x}}<br>Total Sales: %{{y:,.0f}}"
+    )
+    return fig
+
+
+def store_comparison_chart(store_comparison, grain):
+    """Sales per store and period (Tab 2)."""
+    fig_store = px.bar(
+        store_comparison,
+        x="Period",
+        y="Penjualan",
+        color="Store Name",
+        barmode="group",
+        title="Store Sales Comparison",
+        labels={"Penjualan": "Total Sales", "Period": grain},
+        color_discrete_sequence=COLOR_PALETTE
+    )
+    fig_store.update_traces(hovertemplate=f"{grain}: %{{x}}<br>Total Sales: %{{y:,.0f}}")
+    fig_store.update_layout(
+        xaxis_title=grain,
+        yaxis_title='Total Sales',
+        legend_title='Store Name',
+        hovermode='x unified'
+    )
+    return fig_store
+
+
+def grouping_comparison_chart(kelompok_data, categories, grain):
+    """Sales of the selected Grouping per store and period, one facet per Grouping (Tab 4)."""
+    if len(categories) == 1:
+        single_cat = categories[0]
+        comparison_chart = px.bar(
+            kelompok_data,
+            x="Period",
+            y="Penjualan",
+            color="Store Name",
+            barmode="group",
+            title=f"Sales Comparison for {single_cat}",
+            labels={"Penjualan": "Total Sales", "Period": grain, "Store Name": "Store"},
+            color_discrete_sequence=COLOR_PALETTE
+        )
+        comparison_chart.update_traces(hovertemplate=f"{grain}: %{{x}}<br>Total Sales: %{{y:,.0f}}")
+        comparison_chart.update_layout(
+            xaxis_title=grain,
+            yaxis_title='Total Sales',
+            legend_title='Store',
+            hovermode='x unified'
+        )
+        return comparison_chart
+
+    comparison_chart = px.bar(
+        kelompok_data,
+        x="Period",
+        y="Penjualan",
+        color="Store Name",
+        barmode="group",
+        facet_col="Grouping",
+        facet_col_wrap=2,
+        title="Sales Comparison for Selected Grouping",
+        labels={"Penjualan": "Total Sales", "Period": grain, "Store Name": "Store",
+                "Grouping": "Grouping"},
+        color_discrete_sequence=COLOR_PALETTE
+    )
+    comparison_chart.update_traces(hovertemplate=f"{grain}: %{{x}}<br>Total Sales: %{{y:,.0f}}")
+    comparison_chart.update_layout(
+        xaxis_title=grain,
+        yaxis_title='Total Sales',
+        legend_title='Store',
+        hovermode='x unified',
+        title_font_size=20,
+        height=600
+    )
+    return comparison_chart
+
+
+def grouping_share_chart(kelompok_data):
+    """Share of each store in the selected Grouping's sales (Tab 5)."""
+    pie_chart = px.pie(
+        kelompok_data,
+        names="Store Name",
+        values="Penjualan",
+        title="Sales Distribution for Selected Grouping",
+        color_discrete_sequence=COLOR_PALETTE
+    )
+    pie_chart.update_traces(hovertemplate="Store: %{label}<br>Sales: %{value:,.0f} (%{percent})")
+    return pie_chart
+
+
+def sales_trend_chart(trend_data, grain, webgl_points=WEBGL_POINTS, forecast=None):
+    """Sales trend per store, one facet per Grouping (Tab 6).
+
+    ``forecast`` (monthly rows from BatchForecast.rows) is drawn as a dashed
+    continuation of each store's line, with the model and its backtest error.
+    """
+    line_options = {}
+    if forecast is not None:
+        trend_data = with_period(pd.concat([trend_data.drop(columns='Period').assign(Series='Actual'),
+                                            forecast.assign(Series='Forecast')], ignore_index=True), grain)
+        line_options = dict(line_dash='Series', line_dash_map={'Actual': 'solid', 'Forecast': 'dash'},
+                            custom_data=['Model', 'Backtest Error %'])
+    trend_chart = px.line(
+        trend_data,
+        x='Period',
+        y='Penjualan',
+        color='Store Name',
+        facet_col='Grouping',
+        facet_col_wrap=2,
+        title='Sales Trend for Selected Grouping by Store',
+        labels={'Penjualan': 'Total Sales', 'Period': grain, 'Store Name': 'Store', 'Grouping': 'Grouping'},
+        color_discrete_sequence=COLOR_PALETTE,
+        render_mode='webgl' if len(trend_data) > webgl_points else 'svg',
+        **line_options
+    )
+
+    # Add markers to the trend chart
+    trend_chart.update_traces(mode='lines+markers')
+
+    trend_chart.update_layout(
+        xaxis_title=grain,
+        yaxis_title='Total Sales',
+        legend_title='Store',
+        title_font_size=20,
+        hovermode='x unified',
+        height=600
+    )
+
+    trend_chart.update_traces(
+        hovertemplate=f"{grain}: %{{x}}<br>Total Sales: %{{y:,.0f}}<br>Grouping: %{{legendgroup}}"
+    )
+    if forecast is not None:
+        # One legend entry per store toggles its actuals and forecast together
+        trend_chart.for_each_trace(lambda trace: trace.update(name=trace.name.rsplit(', ', 1)[0],
+                                                              legendgroup=trace.name.rsplit(', ', 1)[0]))
+        trend_chart.update_traces(
+            selector={'line.dash': 'dash'},
+            showlegend=False,
+            hovertemplate=f"{grain}: %{{x}}<br>Forecast: %{{y:,.0f}}<br>%{{customdata[0]}}, "
+                          f"backtest error %{{customdata[1]:.1f}}%"
+        )
+    return trend_chart
+
+
+def gm_growth_sparkline(gm_history, month):
+    """Monthly Gross Margin with ``month`` marked (Tab 8)."""
+    gm_sparkline = px.line(gm_history, x='Date', y='Gross Margin', height=180,
+                           color_discrete_sequence=COLOR_PALETTE)
+    gm_sparkline.add_vline(x=month, line_dash='dot', line_color='gray')
+    gm_sparkline.update_traces(hovertemplate="Month: %{x|%b %Y}<br>Gross Margin: %{y:,.0f}")
+    gm_sparkline.update_layout(xaxis_title='', yaxis_title='', margin=dict(t=10, b=10, l=10, r=10))
+    return gm_sparkline
+
+
+def gm_by_division_chart(gm_by_division):
+    """Gross margin percentage per division (Tab 8)."""
+    fig_gm_division = px.bar(
+        gm_by_division,
+        x='Division',
+        y='Gross Margin %',
+        title="Gross Margin Percentage by Division",
+        labels={'Gross Margin %': 'Gross Margin Percentage (%)'},
+        color='Division',
+        color_discrete_sequence=COLOR_PALETTE
+    )
+    fig_gm_division.update_traces(hovertemplate="Division: %{x}<br>Gross Margin %: %{y:.2f}%")
+    fig_gm_division.update_layout(
+        xaxis_title='Division',
+        yaxis_title='Gross Margin Percentage (%)',
+        legend_title='Division',
+        hovermode='x unified'
+    )
+    return fig_gm_division
+
+
+def gm_by_store_chart(gm_by_store):
+    """Gross margin percentage per store (Tab 8)."""
+    fig_gm_store = px.bar(
+        gm_by_store,
+        x='Store Name',
+        y='Gross Margin %',
+        title="Gross Margin Percentage by Store",
+        labels={'Store Name': 'Store', 'Gross Margin %': 'Gross Margin Percentage (%)'},
+        color='Store Name',
+        color_discrete_sequence=COLOR_PALETTE
+    )
+    fig_gm_store.update_traces(hovertemplate="Store: %{x}<br>Gross Margin %: %{y:.2f}%")
+    fig_gm_store.update_layout(
+        xaxis_title='Store',
+        yaxis_title='Gross Margin Percentage (%)',
+        legend_title='Store',
+        hovermode='x unified'
+    )
+    return fig_gm_store
+
+
+def stock_chart(stock_data, grain):
+    """Total stock value per division over time (Tab 9)."""
+    fig_stock = px.line(
+        stock_data,
+        x="Period",
+        y="Stock Value",
+        color="Division",
+        title="Total Stock Value by Group Over Time",
+        labels={"Stock Value": "Total Stock Value", "Period": grain},
+        color_discrete_sequence=COLOR_PALETTE
+    )
+
+    fig_stock.update_traces(mode='lines+markers')
+    fig_stock.update_layout(
+        xaxis_title=grain,
+        yaxis_title='Stock Value',
+        legend_title='Group',
+        hovermode='x unified'
+    )
+
+    fig_stock.update_traces(
+        hovertemplate=f"Group: %{{legendgroup}}<br>{grain}: %{{x}}<br>Stock Value: %{{y:,.0f}}"
+    )
+    return fig_stock
@@ -0,0 +1,5 @@
+"""Shared pytest setup: the synthetic data of the benchmarks is used by the tests too."""
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'benchmarks'))
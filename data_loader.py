@@ -0,0 +1,704 @@
+"""Schema-driven loading of the sales workbook.
+
+Only the columns the dashboard uses are read. They are resolved
+case-insensitively from the header row before the sheet body is parsed, so
+the dozens of extra ERP columns never get materialized.
+
+Large uploads are spooled to disk and streamed through openpyxl in bounded
+row chunks; each chunk is cleaned before the next one is read.
+
+CSV and Parquet exports are read with pyarrow instead: CSV with its
+multithreaded block reader and the required columns declared as text,
+Parquet with only the required columns projected. Both end in the same
+cleaned, typed frame as a workbook.
+
+Numbers written as text may use ',' (Indonesian) or '.' as the decimal
+mark. Which one a file uses is decided once for the whole file, from its
+first numbers that only read one way (see DecimalMark).
+
+Files of line items, with a daily Date instead of Month and year, are
+always read in chunks and rolled up to the monthly grain as they are read
+(load_rollups), so only the monthly cells are kept in memory.
+"""
+import csv
+import os
+import shutil
+import tempfile
+from operator import itemgetter
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pacsv
+import pyarrow.parquet as pq
+from openpyxl import load_workbook
+
+import metrics
+from rollups import MonthlyAccumulator, Rollups
+
+# Canonical column name -> target dtype after loading
+SALES_SCHEMA = {
+    "Grouping": "string",
+    "Penjualan": "float64",
+    "HPP": "float64",
+    "Gross Margin": "float64",
+    "Store Name": "string",
+    "Month": "string",
+    "year": "float64",
+    "Stock Value": "float64",
+}
+
+# Columns that are used when present but may be derived otherwise
+OPTIONAL_SCHEMA = {
+    "Group": "string",
+}
+
+# Columns of a transaction-level export: one row per line item, with its daily date
+TRANSACTION_SCHEMA = {
+    "Grouping": "string",
+    "Penjualan": "float64",
+    "HPP": "float64",
+    "Store Name": "string",
+    "Date": "datetime64[ns]",
+    "Stock Value": "float64",
+}
+
+REQUIRED_COLUMNS = list(SALES_SCHEMA)
+NUMERIC_COLUMNS = ["Penjualan", "HPP", "Gross Margin", "Stock Value"]
+
+# Divisions kept by the dashboard
+VALID_GROUPS = ['GRC', 'FRS', 'BZR']
+
+# Group -> Division rollup used by the margin and stock analysis
+DIVISIONS = {'GRC': 'GRC+FRS', 'FRS': 'GRC+FRS', 'BZR': 'BZR'}
+
+# Uploads above this size go through the chunked ingest path
+LARGE_FILE_BYTES = 20 * 1024 * 1024
+CHUNK_ROWS = 10_000
+# Line items are many and narrow, so they are read in larger chunks
+TRANSACTION_CHUNK_ROWS = 250_000
+# Formats tried, in order, for dates written as text
+DATE_FORMATS = ["%Y-%m-%d", "%Y-%m-%d %H:%M:%S", "%d/%m/%Y", "%d-%m-%Y"]
+
+# File types accepted by the uploader, by extension
+UPLOAD_TYPES = ["xlsx", "csv", "parquet"]
+# Bytes of a large CSV parsed at a time
+CSV_BLOCK_BYTES = 16 * 1024 * 1024
+# Field separators a CSV export may use; ';' is common where ',' is the decimal mark
+CSV_DELIMITERS = ",;\t|"
+# Numeric text pyarrow can cast to float64 once the thousands separators are removed
+# and the decimal mark is '.'
+PLAIN_NUMBER = r"^[+-]?(\d+\.?\d*|\.\d+)([eE][+-]?\d+)?$"
+# Numbers written with ',' as the decimal mark and '.' between thousands, and the other way round
+INDONESIAN_NUMBER = r"^[+-]?(\d{1,3}(\.\d{3})+|\d+)(,\d+)?$"
+STANDARD_NUMBER = r"^[+-]?((\d{1,3}(,\d{3})+|\d+)(\.\d*)?|\.\d+)([eE][+-]?\d+)?$"
+
+
+class MissingColumnsError(ValueError):
+    """Raised when the sheet lacks one or more required columns."""
+
+    def __init__(self, missing, found, required=REQUIRED_COLUMNS):
+        self.missing = list(missing)
+        self.found = list(found)
+        super().__init__(
+            f"The uploaded sheet is missing required column(s): {', '.join(self.missing)}. "
+            f"Required columns are: {', '.join(required)} (matched case-insensitively)."
+        )
+
+
+class AmbiguousNumbersError(ValueError):
+    """Raised when the numbers written as text in a file do not tell which decimal mark it uses."""
+
+
+class DecimalMark:
+    """The decimal mark of the numbers written as text in one file.
+
+    Indonesian exports write ',' as the decimal mark and '.' between
+    thousands ('1.234.567,5'), others the other way round ('1,234,567.5').
+    Numbers like '7,25' or '1.234.567' only read one way and '12.50' or
+    '1,234,567' only the other, so the first of them settle ``mark`` for the
+    whole file. Plain integers read the same either way. A single group like
+    '12.500' does not, and cannot be read until another number has settled
+    the mark.
+    """
+
+    def __init__(self):
+        self.mark = None
+        self._examples = {}
+        self._ambiguous = None
+
+    @property
+    def settled(self):
+        """Whether every number seen so far can be read."""
+        return self.mark is not None or self._ambiguous is None
+
+    def observe(self, columns):
+        """Take in the numeric text ``columns`` (pyarrow string arrays) of the next part of the file.
+
+        Raises AmbiguousNumbersError if they contradict the mark settled so far.
+        """
+        for column in columns:
+            text = pc.utf8_trim_whitespace(column)
+            indonesian = pc.match_substring_regex(text, INDONESIAN_NUMBER)
+            standard = pc.match_substring_regex(text, STANDARD_NUMBER)
+            for mark, only in ((',', pc.and_(indonesian, pc.invert(standard))),
+                               ('.', pc.and_(standard, pc.invert(indonesian)))):
+                if mark not in self._examples and pc.any(only).as_py():
+                    self._examples[mark] = pc.filter(text, only)[0].as_py()
+            if self._ambiguous is None:
+                either = pc.and_(pc.and_(indonesian, standard), pc.match_substring_regex(text, "[.,]"))
+                if pc.any(either).as_py():
+                    self._ambiguous = pc.filter(text, either)[0].as_py()
+
+        if len(self._examples) > 1:
+            raise AmbiguousNumbersError(
+                f"The uploaded file writes numbers both with ',' as the decimal mark (e.g. "
+                f"'{self._examples[',']}') and with '.' (e.g. '{self._examples['.']}'), so they cannot be "
+                f"read reliably. Export it again with one number format."
+            )
+        if self._examples:
+            self.mark = next(iter(self._examples))
+
+    def require(self):
+        """Raise AmbiguousNumbersError unless the numbers seen so far can be read."""
+        if not self.settled:
+            raise AmbiguousNumbersError(
+                f"Numbers such as '{self._ambiguous}' in the uploaded file read differently with ',' or "
+                f"'.' as the decimal mark, and no other number in the file tells which one it uses. "
+                f"Export it again with decimals or without thousands separators."
+            )
+
+    def parse(self, column):
+        """The float64 values of the numeric text ``column``; anything that is not a number becomes null."""
+        text = pc.utf8_trim_whitespace(column)
+        if self.mark == ',':
+            text = pc.replace_substring(pc.replace_substring(text, '.', ''), ',', '.')
+        elif self.mark == '.':
+            text = pc.replace_substring(text, ',', '')
+        # As with pd.to_numeric(errors="coerce")
+        text = pc.if_else(pc.match_substring_regex(text, PLAIN_NUMBER), text, pa.scalar(None, pa.string()))
+        return pc.cast(text, pa.float64())
+
+
+def settled_chunks(chunks, decimal, texts, convert):
+    """Yield ``(convert(raw), done, total)`` for the ``(raw, done, total)`` items of ``chunks``.
+
+    The numeric text ``texts(raw)`` of every chunk goes through ``decimal``
+    first. Chunks whose numbers read either way are held back until a later
+    chunk settles the mark; AmbiguousNumbersError is raised if none does.
+    """
+    held = []
+    for item in chunks:
+        decimal.observe(texts(item[0]))
+        held.append(item)
+        if decimal.settled:
+            for raw, done, total in held:
+                yield convert(raw), done, total
+            held = []
+    decimal.require()
+
+
+def resolve_columns(header, schema=SALES_SCHEMA, optional=OPTIONAL_SCHEMA):
+    """Map each canonical column name to the name used in ``header``.
+
+    Matching ignores case and surrounding whitespace; the first matching
+    header wins. Raises MissingColumnsError if a required column is absent.
+    """
+    lookup = {}
+    for name in header:
+        lookup.setdefault(str(name).strip().lower(), name)
+
+    resolved = {}
+    missing = []
+    for col in schema:
+        actual = lookup.get(col.lower())
+        if actual is None:
+            missing.append(col)
+        else:
+            resolved[col] = actual
+    if missing:
+        raise MissingColumnsError(missing, header, list(schema))
+
+    for col in optional:
+        actual = lookup.get(col.lower())
+        if actual is not None:
+            resolved[col] = actual
+    return resolved
+
+
+def read_dtypes(resolved):
+    """dtypes to hand to the reader for the resolved source columns.
+
+    Text columns are read as str. Numeric columns are read as object so
+    that native numbers are kept as they are and formatted strings can be
+    cleaned afterwards.
+    """
+    dtypes = {}
+    for col, actual in resolved.items():
+        target = SALES_SCHEMA.get(col, OPTIONAL_SCHEMA.get(col))
+        dtypes[actual] = str if target == "string" else object
+    return dtypes
+
+
+def text_cells(series):
+    """The text cells of ``series`` as a pyarrow string array."""
+    return pa.array([value for value in series if isinstance(value, str)], pa.string())
+
+
+def parse_numeric(series, decimal=None):
+    """Convert a column of numbers to float64.
+
+    Native numeric cells are used as is. Text cells are read with the
+    decimal mark of ``decimal`` (a DecimalMark that has seen them), or of
+    the column alone when it is None. Anything that cannot be parsed
+    becomes NaN.
+    """
+    values = pd.to_numeric(series, errors="coerce").astype("float64")
+    is_text = series.map(lambda v: isinstance(v, str)).to_numpy(dtype=bool)
+    if is_text.any():
+        text = text_cells(series)
+        if decimal is None:
+            decimal = DecimalMark()
+            decimal.observe([text])
+            decimal.require()
+        values[is_text] = decimal.parse(text).to_numpy(zero_copy_only=False)
+    return values
+
+
+def parse_dates(series):
+    """Convert a column of dates to datetime64.
+
+    Native date cells are used as is; text is tried against DATE_FORMATS in
+    turn. Anything that cannot be parsed becomes NaT.
+    """
+    is_text = series.map(lambda v: isinstance(v, str)).to_numpy(dtype=bool)
+    dates = pd.to_datetime(series.where(~is_text), errors="coerce")
+    if is_text.any():
+        text = series[is_text].str.strip()
+        parsed = pd.Series(pd.NaT, index=text.index, dtype="datetime64[ns]")
+        for fmt in DATE_FORMATS:
+            parsed = parsed.fillna(pd.to_datetime(text, format=fmt, errors="coerce"))
+        dates[is_text] = parsed
+    return dates.astype("datetime64[ns]")
+
+
+def sheet_numeric_text(frame, schema=SALES_SCHEMA):
+    """The text cells of the numeric columns of ``frame``."""
+    return [text_cells(frame[col]) for col, target in schema.items() if target == "float64" and col in frame.columns]
+
+
+def apply_schema(frame, schema=SALES_SCHEMA, decimal=None):
+    """Cast the canonical columns of ``frame`` to their target dtypes.
+
+    Numeric text is read with the decimal mark of ``decimal``, a DecimalMark
+    that has seen it, or of ``frame`` alone when it is None.
+    """
+    if decimal is None:
+        decimal = DecimalMark()
+        decimal.observe(sheet_numeric_text(frame, schema))
+        decimal.require()
+    for col, target in {**schema, **OPTIONAL_SCHEMA}.items():
+        if col not in frame.columns:
+            continue
+        if target == "float64":
+            frame[col] = parse_numeric(frame[col], decimal)
+        elif target == "datetime64[ns]":
+            frame[col] = parse_dates(frame[col])
+        else:
+            text = frame[col]
+            frame[col] = text.where(text.isna(), text.astype(str)).str.strip()
+    return frame
+
+
+def read_sales_sheet(source, sheet_name=0):
+    """Read the required columns of one sheet, renamed to canonical names."""
+    header = pd.read_excel(source, sheet_name=sheet_name, nrows=0).columns
+    resolved = resolve_columns(header)
+    if hasattr(source, "seek"):
+        source.seek(0)
+
+    frame = pd.read_excel(
+        source,
+        sheet_name=sheet_name,
+        usecols=list(resolved.values()),
+        dtype=read_dtypes(resolved),
+    )
+    frame.rename(columns={actual: col for col, actual in resolved.items()}, inplace=True)
+    return apply_schema(frame)
+
+
+def clean_sales_data(frame):
+    """Drop invalid rows and add the derived columns the tabs rely on:
+    Gross Margin, Margin %, Date and Division.
+
+    Works on any slice of the sheet, so the chunked reader can apply it one
+    chunk at a time. Sorting and display columns are left to the caller.
+    """
+    # Drop rows with invalid numeric values
+    rows = len(frame)
+    frame = frame.dropna(subset=NUMERIC_COLUMNS + ['year']).copy()
+    metrics.inc('sales_dashboard_rows_dropped_total', rows - len(frame), reason='numeric')
+    frame['year'] = frame['year'].astype(int)
+
+    # Derived measures: Gross Margin is always Penjualan - HPP, whatever the sheet says
+    frame['Gross Margin'] = frame['Penjualan'] - frame['HPP']
+    frame['Margin %'] = (frame['Gross Margin'] / frame['Penjualan']) * 100
+
+    # Create a Date column, accepting full or abbreviated month names
+    period = frame['year'].astype(str) + '-' + frame['Month']
+    frame['Date'] = pd.to_datetime(period, format='%Y-%B', errors='coerce')
+    unparsed = frame['Date'].isna()
+    if unparsed.any():
+        frame.loc[unparsed, 'Date'] = pd.to_datetime(period[unparsed], format='%Y-%b', errors='coerce')
+
+    # Drop rows with invalid Date
+    rows = len(frame)
+    frame.dropna(subset=['Date'], inplace=True)
+    metrics.inc('sales_dashboard_rows_dropped_total', rows - len(frame), reason='date')
+
+    return with_division(frame)
+
+
+def with_division(frame):
+    """Keep the rows of the valid Groups and add their Division."""
+    # If a Group column isn't present, derive it (e.g., first 3 chars of Grouping)
+    if 'Group' not in frame.columns:
+        frame['Group'] = frame['Grouping'].astype(str).str[:3].str.upper()
+
+    # Filter only GRC, FRS and BZR, and roll GRC and FRS up into one division
+    frame = frame[frame['Group'].isin(VALID_GROUPS)].reset_index(drop=True)
+    frame['Division'] = frame['Group'].map(DIVISIONS)
+    return frame
+
+
+def clean_transactions(frame):
+    """Drop invalid line items and add Gross Margin and Division.
+
+    The transaction counterpart of clean_sales_data, for one chunk at a time.
+    """
+    rows = len(frame)
+    frame = frame.dropna(subset=['Penjualan', 'HPP', 'Stock Value']).copy()
+    metrics.inc('sales_dashboard_rows_dropped_total', rows - len(frame), reason='numeric')
+    frame['Gross Margin'] = frame['Penjualan'] - frame['HPP']
+
+    rows = len(frame)
+    frame.dropna(subset=['Date'], inplace=True)
+    metrics.inc('sales_dashboard_rows_dropped_total', rows - len(frame), reason='date')
+    return with_division(frame)
+
+
+def upload_format(name):
+    """'csv', 'parquet' or 'xlsx', from the extension of the file ``name``."""
+    extension = os.path.splitext(name or "")[1].lower().lstrip(".")
+    return extension if extension in ("csv", "parquet") else "xlsx"
+
+
+def is_arrow_text(column):
+    return pa.types.is_string(column.type) or pa.types.is_large_string(column.type)
+
+
+def arrow_column(column, target, decimal=None):
+    """Convert a pyarrow column to the pandas column of dtype ``target``.
+
+    Native numbers are used as is. Numeric text is read with the decimal
+    mark of ``decimal``, a DecimalMark that has seen it, or of the column
+    alone when it is None.
+    """
+    is_text = is_arrow_text(column)
+    if target == "datetime64[ns]":
+        if not is_text:
+            return column.cast(pa.timestamp('ns')).to_pandas()
+        text = pc.utf8_trim_whitespace(column)
+        return pc.coalesce(*[pc.strptime(text, format=fmt, unit='ns', error_is_null=True)
+                             for fmt in DATE_FORMATS]).to_pandas()
+    if target == "float64":
+        if is_text:
+            if decimal is None:
+                decimal = DecimalMark()
+                decimal.observe([column])
+                decimal.require()
+            return decimal.parse(column).to_pandas()
+        return column.cast(pa.float64()).to_pandas()
+    if is_text:
+        return pc.utf8_trim_whitespace(column).to_pandas()
+    text = column.to_pandas()
+    return text.where(text.isna(), text.astype(str)).str.strip()
+
+
+def arrow_numeric_text(table, resolved, schema=SALES_SCHEMA):
+    """The numeric columns of a pyarrow table or batch that hold text."""
+    columns = [table.column(actual) for col, actual in resolved.items() if schema.get(col) == "float64"]
+    return [column for column in columns if is_arrow_text(column)]
+
+
+def arrow_frame(table, resolved, schema=SALES_SCHEMA, decimal=None):
+    """The resolved columns of a pyarrow table or batch, renamed and typed like read_sales_sheet.
+
+    Numeric text is read with the decimal mark of ``decimal``, a DecimalMark
+    that has seen it, or of ``table`` alone when it is None.
+    """
+    if decimal is None:
+        decimal = DecimalMark()
+        decimal.observe(arrow_numeric_text(table, resolved, schema))
+        decimal.require()
+    return pd.DataFrame({
+        col: arrow_column(table.column(actual), schema.get(col, OPTIONAL_SCHEMA.get(col)), decimal)
+        for col, actual in resolved.items()
+    })
+
+
+def csv_header(fileobj):
+    """The header and the delimiter of the CSV in ``fileobj``, sniffed from its first line."""
+    fileobj.seek(0)
+    header_line = fileobj.readline().decode("utf-8-sig", errors="replace")
+    fileobj.seek(0)
+    try:
+        delimiter = csv.Sniffer().sniff(header_line, delimiters=CSV_DELIMITERS).delimiter
+    except csv.Error:
+        delimiter = ","
+    return next(csv.reader([header_line], delimiter=delimiter), []), delimiter
+
+
+def csv_options(fileobj, schema=SALES_SCHEMA):
+    """pyarrow read, parse and convert options for the CSV in ``fileobj``, and its resolved columns.
+
+    The delimiter is sniffed from the header line. All the resolved columns
+    are declared as text so that pyarrow does not infer their types from the
+    first block; empty fields become nulls.
+    """
+    header, delimiter = csv_header(fileobj)
+    resolved = resolve_columns([h for h in header if h.strip()], schema)
+
+    return (
+        pacsv.ReadOptions(use_threads=True, block_size=CSV_BLOCK_BYTES),
+        pacsv.ParseOptions(delimiter=delimiter),
+        pacsv.ConvertOptions(
+            include_columns=list(resolved.values()),
+            column_types={actual: pa.string() for actual in resolved.values()},
+            strings_can_be_null=True,
+        ),
+        resolved,
+    )
+
+
+def iter_csv_chunks(fileobj, schema=SALES_SCHEMA):
+    """Yield ``(chunk, bytes_read, total_bytes)`` for the CSV in ``fileobj``, one parsed block at a time.
+
+    Numeric text is read with one decimal mark for the whole file (see settled_chunks).
+    """
+    read_options, parse_options, convert_options, resolved = csv_options(fileobj, schema)
+    total_bytes = fileobj.seek(0, os.SEEK_END)
+    fileobj.seek(0)
+    reader = pacsv.open_csv(fileobj, read_options=read_options, parse_options=parse_options,
+                            convert_options=convert_options)
+    decimal = DecimalMark()
+    # The reader runs ahead of the batches it has returned, so bytes read is an estimate
+    batches = ((batch, min(fileobj.tell(), total_bytes), total_bytes) for batch in reader)
+    yield from settled_chunks(batches, decimal, lambda batch: arrow_numeric_text(batch, resolved, schema),
+                              lambda batch: arrow_frame(batch, resolved, schema, decimal))
+
+
+def read_sales_csv(fileobj):
+    """Read the required columns of a CSV export in one multithreaded pass."""
+    read_options, parse_options, convert_options, resolved = csv_options(fileobj)
+    table = pacsv.read_csv(fileobj, read_options=read_options, parse_options=parse_options,
+                           convert_options=convert_options)
+    return arrow_frame(table, resolved)
+
+
+def iter_parquet_chunks(fileobj, chunk_rows=CHUNK_ROWS, schema=SALES_SCHEMA):
+    """Yield ``(chunk, rows_read, total_rows)`` for the Parquet file in ``fileobj``,
+    reading only the required columns."""
+    parquet = pq.ParquetFile(fileobj)
+    resolved = resolve_columns(parquet.schema_arrow.names, schema)
+
+    def batches():
+        rows_read = 0
+        for batch in parquet.iter_batches(batch_size=chunk_rows, columns=list(resolved.values())):
+            rows_read += batch.num_rows
+            yield batch, rows_read, parquet.metadata.num_rows
+
+    decimal = DecimalMark()
+    yield from settled_chunks(batches(), decimal, lambda batch: arrow_numeric_text(batch, resolved, schema),
+                              lambda batch: arrow_frame(batch, resolved, schema, decimal))
+
+
+def read_sales_parquet(fileobj):
+    """Read the required columns of a Parquet export in one go."""
+    resolved = resolve_columns(pq.read_schema(fileobj).names)
+    fileobj.seek(0)
+    return arrow_frame(pq.read_table(fileobj, columns=list(resolved.values())), resolved)
+
+
+def spool_to_disk(fileobj, suffix=".xlsx"):
+    """Copy an uploaded file object to a temporary file and return its path."""
+    if hasattr(fileobj, "seek"):
+        fileobj.seek(0)
+    with tempfile.NamedTemporaryFile(suffix=suffix, delete=False) as spool:
+        shutil.copyfileobj(fileobj, spool, length=1024 * 1024)
+    return spool.name
+
+
+def iter_sheet_chunks(path, chunk_rows=CHUNK_ROWS, schema=SALES_SCHEMA):
+    """Yield ``(chunk, rows_read, total_rows)`` for the first sheet of ``path``.
+
+    Each chunk holds at most ``chunk_rows`` rows of the required columns,
+    renamed and typed like read_sales_sheet, with one decimal mark for the
+    numeric text of the whole sheet (see settled_chunks). ``total_rows``
+    comes from the sheet dimensions and is None when the writer did not
+    record them.
+    """
+    workbook = load_workbook(path, read_only=True, data_only=True)
+    try:
+        decimal = DecimalMark()
+        yield from settled_chunks(raw_sheet_chunks(workbook, chunk_rows, schema), decimal,
+                                  lambda frame: sheet_numeric_text(frame, schema),
+                                  lambda frame: apply_schema(frame, schema, decimal))
+    finally:
+        workbook.close()
+
+
+def raw_sheet_chunks(workbook, chunk_rows, schema):
+    # The (chunk, rows_read, total_rows) of iter_sheet_chunks, as read: renamed but not typed
+    sheet = workbook.worksheets[0]
+    rows = sheet.iter_rows(values_only=True)
+    header = next(rows, ())
+    resolved = resolve_columns([h for h in header if h is not None], schema)
+
+    positions = {str(h).strip().lower(): i for i, h in reversed(list(enumerate(header))) if h is not None}
+    columns = list(resolved)
+    pick = itemgetter(*[positions[str(resolved[col]).strip().lower()] for col in columns])
+    total_rows = sheet.max_row - 1 if sheet.max_row else None
+    padding = (None,) * len(header)
+
+    buffer = []
+    rows_read = 0
+    for row in rows:
+        if len(row) < len(header):
+            row = row + padding[len(row):]
+        buffer.append(pick(row))
+        if len(buffer) == chunk_rows:
+            rows_read += len(buffer)
+            yield pd.DataFrame(buffer, columns=columns, dtype=object), rows_read, total_rows
+            buffer = []
+    if buffer:
+        rows_read += len(buffer)
+        yield pd.DataFrame(buffer, columns=columns, dtype=object), rows_read, total_rows
+
+
+def tracked_chunks(chunks, progress=None):
+    """Yield the frames of ``(chunk, done, total)`` items, calling ``progress``
+    with the fraction ``done / total`` (0..1) after each one and 1.0 at the end.
+
+    Raises ValueError if there are none.
+    """
+    read_any = False
+    for chunk, done, total in chunks:
+        read_any = True
+        yield chunk
+        if progress is not None and total:
+            progress(min(done / total, 1.0))
+
+    if not read_any:
+        raise ValueError("The uploaded sheet has no data rows.")
+    if progress is not None:
+        progress(1.0)
+
+
+def clean_chunks(chunks, progress=None):
+    """Clean every chunk of ``chunks`` (see tracked_chunks) and concatenate them.
+
+    Only the cleaned, typed rows are kept between chunks, so peak memory is
+    bounded by the chunk size rather than the file size.
+    """
+    return pd.concat([clean_sales_data(chunk) for chunk in tracked_chunks(chunks, progress)], ignore_index=True)
+
+
+def load_large_upload(fileobj, chunk_rows=CHUNK_ROWS, progress=None):
+    """Spool ``fileobj`` to disk and load it chunk by chunk (see clean_chunks)."""
+    path = spool_to_disk(fileobj)
+    try:
+        return clean_chunks(iter_sheet_chunks(path, chunk_rows), progress)
+    finally:
+        os.remove(path)
+
+
+def upload_schema(fileobj, name=None):
+    """TRANSACTION_SCHEMA for files of line items (a Date column but no Month), else SALES_SCHEMA."""
+    fmt = upload_format(name)
+    fileobj.seek(0)
+    if fmt == "csv":
+        header = csv_header(fileobj)[0]
+    elif fmt == "parquet":
+        header = pq.read_schema(fileobj).names
+    else:
+        workbook = load_workbook(fileobj, read_only=True)
+        try:
+            header = next(workbook.worksheets[0].iter_rows(max_row=1, values_only=True), ())
+        finally:
+            workbook.close()
+    fileobj.seek(0)
+
+    names = {str(h).strip().lower() for h in header if h is not None}
+    return TRANSACTION_SCHEMA if 'date' in names and 'month' not in names else SALES_SCHEMA
+
+
+def iter_transaction_chunks(fileobj, name=None):
+    """Yield ``(chunk, done, total)`` typed chunks of a transaction file of any format."""
+    fmt = upload_format(name)
+    if fmt == "csv":
+        yield from iter_csv_chunks(fileobj, TRANSACTION_SCHEMA)
+    elif fmt == "parquet":
+        yield from iter_parquet_chunks(fileobj, TRANSACTION_CHUNK_ROWS, TRANSACTION_SCHEMA)
+    else:
+        path = spool_to_disk(fileobj)
+        try:
+            yield from iter_sheet_chunks(path, TRANSACTION_CHUNK_ROWS, TRANSACTION_SCHEMA)
+        finally:
+            os.remove(path)
+
+
+def load_transactions(fileobj, progress=None, name=None):
+    """Roll a transaction file up to the monthly rollup while reading it.
+
+    Chunks are cleaned and folded into a MonthlyAccumulator, so memory is
+    bounded by the number of (Grouping, Store, month) cells rather than by
+    the number of line items.
+    """
+    accumulator = MonthlyAccumulator()
+    for chunk in tracked_chunks(iter_transaction_chunks(fileobj, name), progress):
+        accumulator.add(clean_transactions(chunk))
+    if not accumulator.rows:
+        raise ValueError("The uploaded file has no valid rows.")
+    return accumulator.result()
+
+
+def load_rollups(fileobj, size, progress=None, name=None):
+    """Rollups of an uploaded file, monthly or transaction-level (see upload_schema)."""
+    if upload_schema(fileobj, name) is TRANSACTION_SCHEMA:
+        return Rollups(load_transactions(fileobj, progress=progress, name=name))
+    return Rollups.from_rows(load_sales_upload(fileobj, size, progress=progress, name=name))
+
+
+def load_sales_upload(fileobj, size, progress=None, name=None):
+    """Load and clean an uploaded file of ``size`` bytes.
+
+    The format comes from the extension of ``name``: Excel unless it ends in
+    .csv or .parquet. Large files take the chunked path; smaller ones are
+    read in one go. The result is sorted by Date.
+    """
+    fmt = upload_format(name)
+    if fmt == "csv":
+        raw_data = (clean_chunks(iter_csv_chunks(fileobj), progress) if size > LARGE_FILE_BYTES
+                    else clean_sales_data(read_sales_csv(fileobj)))
+    elif fmt == "parquet":
+        raw_data = (clean_chunks(iter_parquet_chunks(fileobj), progress) if size > LARGE_FILE_BYTES
+                    else clean_sales_data(read_sales_parquet(fileobj)))
+    elif size > LARGE_FILE_BYTES:
+        raw_data = load_large_upload(fileobj, progress=progress)
+    else:
+        raw_data = clean_sales_data(read_sales_sheet(fileobj, sheet_name=0))
+
+    # Sort raw_data by Date
+    raw_data.sort_values('Date', inplace=True)
+    return raw_data
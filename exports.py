@@ -0,0 +1,244 @@
+"""On-demand table exports.
+
+Nothing is serialized while the dashboard renders. Each exportable table
+gets an Export popover; only when "Prepare file" is clicked is the table
+built (if it was given as a callable) and streamed chunk by chunk to a
+temporary file as CSV, Parquet or XLSX. The prepared file is remembered per
+table until the table's signature or the format changes, and then offered
+through st.download_button. Other writers, such as the multi-sheet
+workbook of report.py, plug into write_export through its ``formats``
+argument.
+"""
+import os
+import tempfile
+import time
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+import streamlit as st
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+
+EXPORT_CHUNK_ROWS = 50_000
+EXPORT_DIR = os.path.join(tempfile.gettempdir(), "sales_dashboard_exports")
+# Prepared files older than this are removed the next time anything is exported
+EXPORT_MAX_AGE_SECONDS = 6 * 60 * 60
+XLSX_MAX_ROWS = 1_048_575
+XLSX_MIME = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+
+def iter_chunks(frame, chunk_rows=EXPORT_CHUNK_ROWS):
+    """Row slices of ``frame``; an empty frame still yields its header."""
+    if frame.empty:
+        yield frame
+    for start in range(0, len(frame), chunk_rows):
+        yield frame.iloc[start:start + chunk_rows]
+
+
+def _export_frame(chunk):
+    # Keep a named index (e.g. Group or Store Name) as a column, drop a positional one,
+    # and give every column a string name
+    if any(name is not None for name in chunk.index.names):
+        chunk = chunk.reset_index()
+    else:
+        chunk = chunk.reset_index(drop=True)
+    chunk.columns = [str(col) for col in chunk.columns]
+    return chunk
+
+
+def write_csv(chunks, path):
+    with open(path, "w", newline="", encoding="utf-8") as out:
+        for i, chunk in enumerate(chunks):
+            _export_frame(chunk).to_csv(out, header=i == 0, index=False)
+
+
+def _arrow_safe(chunk):
+    # Display tables can mix formatted strings and numbers in one object column
+    chunk = chunk.copy()
+    for col in chunk.columns:
+        if chunk[col].dtype == object and pd.api.types.infer_dtype(chunk[col], skipna=True) not in ("string", "empty"):
+            chunk[col] = chunk[col].where(chunk[col].isna(), chunk[col].astype(str))
+    return chunk
+
+
+def write_parquet(chunks, path):
+    writer = None
+    try:
+        for chunk in chunks:
+            chunk = _arrow_safe(_export_frame(chunk))
+            if writer is None:
+                table = pa.Table.from_pandas(chunk, preserve_index=False)
+                writer = pq.ParquetWriter(path, table.schema)
+            else:
+                table = pa.Table.from_pandas(chunk, schema=writer.schema, preserve_index=False)
+            writer.write_table(table)
+    finally:
+        if writer is not None:
+            writer.close()
+
+
+# Native Excel number formats. Percent columns hold percent values (12.5 for 12.5%),
+# so they get a literal % sign rather than Excel's 0.00% (which would multiply by 100)
+XLSX_NUMBER_FORMAT = '#,##0'
+XLSX_PERCENT_FORMAT = '0.00"%"'
+XLSX_COUNT_COLUMNS = ('Year', 'year', 'Rank', 'Rows')
+
+
+def xlsx_number_format(column, dtype):
+    """Excel number format for a column, matching how the dashboard displays it."""
+    if not pd.api.types.is_numeric_dtype(dtype) or pd.api.types.is_bool_dtype(dtype):
+        return None
+    if column in XLSX_COUNT_COLUMNS:
+        return '0'
+    if '%' in column or column.startswith('Percent Change_'):
+        return XLSX_PERCENT_FORMAT
+    return XLSX_NUMBER_FORMAT
+
+
+def _xlsx_rows(chunk):
+    # Column-wise conversion to Python values; openpyxl cannot store NaN/NaT
+    columns = [series.astype(object).where(series.notna(), None).tolist() for _, series in chunk.items()]
+    return zip(*columns)
+
+
+def append_sheet(workbook, title, chunks):
+    """Stream ``chunks`` into a new sheet of a write-only ``workbook``, with
+    number formats applied to the numeric columns."""
+    sheet = workbook.create_sheet(title)
+    styled = None
+    rows_written = 0
+    for chunk in chunks:
+        chunk = _export_frame(chunk)
+        if styled is None:
+            sheet.append(list(chunk.columns))
+            # One formatted cell per numeric column, reused for every row: a write-only
+            # sheet serializes each row as soon as it is appended
+            styled = []
+            for i, (column, dtype) in enumerate(chunk.dtypes.items()):
+                number_format = xlsx_number_format(column, dtype)
+                if number_format is not None:
+                    cell = WriteOnlyCell(sheet)
+                    cell.number_format = number_format
+                    styled.append((i, cell))
+        rows_written += len(chunk)
+        if rows_written > XLSX_MAX_ROWS:
+            raise ValueError(f"'{title}' has more than {XLSX_MAX_ROWS:,} rows, too many for Excel. "
+                             f"Export it as CSV or Parquet instead.")
+        for row in _xlsx_rows(chunk):
+            row = list(row)
+            for i, cell in styled:
+                if row[i] is not None:
+                    cell.value = row[i]
+                    row[i] = cell
+            sheet.append(row)
+
+
+def write_xlsx(chunks, path):
+    workbook = Workbook(write_only=True)
+    append_sheet(workbook, "Export", chunks)
+    workbook.save(path)
+
+
+def as_chunks(data):
+    """``data`` (a DataFrame, an iterable of chunks or a callable returning
+    either) as an iterable of DataFrame chunks."""
+    if callable(data):
+        data = data()
+    return iter_chunks(data) if isinstance(data, pd.DataFrame) else data
+
+
+def write_workbook(sheets, path):
+    """One XLSX with a sheet per ``(title, data)`` pair, written sheet by sheet."""
+    workbook = Workbook(write_only=True)
+    for title, data in sheets:
+        append_sheet(workbook, title, as_chunks(data))
+    workbook.save(path)
+
+
+# Format -> (file extension, MIME type, writer)
+EXPORT_FORMATS = {
+    "CSV": (".csv", "text/csv", write_csv),
+    "Parquet": (".parquet", "application/vnd.apache.parquet", write_parquet),
+    "Excel": (".xlsx", XLSX_MIME, write_xlsx),
+}
+
+
+def _prune_exports():
+    cutoff = time.time() - EXPORT_MAX_AGE_SECONDS
+    for name in os.listdir(EXPORT_DIR):
+        path = os.path.join(EXPORT_DIR, name)
+        try:
+            if os.path.getmtime(path) < cutoff:
+                os.remove(path)
+        except OSError:
+            pass
+
+
+def write_export(data, fmt, formats=EXPORT_FORMATS):
+    """Write ``data`` to a new temporary file in ``fmt`` and return its path.
+
+    ``data`` is a DataFrame, an iterable of DataFrame chunks with the same
+    columns, or a callable returning either. With other ``formats``, it is
+    whatever (or a callable returning whatever) their writer takes.
+    """
+    suffix, _, writer = formats[fmt]
+    os.makedirs(EXPORT_DIR, exist_ok=True)
+    _prune_exports()
+
+    if formats is EXPORT_FORMATS:
+        data = as_chunks(data)
+    elif callable(data):
+        data = data()
+
+    handle, path = tempfile.mkstemp(suffix=suffix, dir=EXPORT_DIR)
+    os.close(handle)
+    try:
+        writer(data, path)
+    except Exception:
+        os.remove(path)
+        raise
+    return path
+
+
+def render_export(key, signature, data, file_name, label="Export", formats=EXPORT_FORMATS):
+    """Export popover for one table.
+
+    ``signature`` identifies the table's content; a file prepared for an
+    older signature or another format is discarded. ``data`` is only
+    evaluated when the user asks for the file.
+    """
+    state_key = f"_export_{key}"
+    with st.popover(label, icon=":material/download:"):
+        if len(formats) > 1:
+            fmt = st.radio("Format:", options=list(formats), horizontal=True, key=f"{key}_export_format")
+        else:
+            fmt = next(iter(formats))
+        suffix, mime, _ = formats[fmt]
+
+        prepared = st.session_state.get(state_key)
+        if prepared is not None and (prepared[0] != signature or prepared[1] != fmt or not os.path.exists(prepared[2])):
+            if os.path.exists(prepared[2]):
+                os.remove(prepared[2])
+            st.session_state.pop(state_key)
+            prepared = None
+
+        if prepared is None and st.button("Prepare file", key=f"{key}_export_prepare"):
+            try:
+                with st.spinner("Writing export..."):
+                    prepared = (signature, fmt, write_export(data, fmt, formats))
+                st.session_state[state_key] = prepared
+            except ValueError as e:
+                st.error(str(e))
+
+        if prepared is not None:
+            size = os.path.getsize(prepared[2])
+            with open(prepared[2], "rb") as export_file:
+                st.download_button(
+                    f"Download {file_name}{suffix} ({size / 1024:,.0f} KB)",
+                    data=export_file,
+                    file_name=f"{file_name}{suffix}",
+                    mime=mime,
+                    key=f"{key}_export_download",
+                    on_click="ignore"
+                )
@@ -0,0 +1,97 @@
+"""The sidebar filters, applied to the materialized rollups.
+
+The general filters (divisions, years, months, stores) select the rows
+behind most tabs; the Grouping tabs (4 to 6) use the selected Grouping
+instead of the divisions. Both are returned monthly and at the selected
+time grain, with the measures of the compact rollups widened to float64.
+
+The date range is applied first: the rollups are clustered by Date, so it
+is a slice of rows found with searchsorted, and the other filters only
+mask the rows inside it. Masks keep the Date order, so the rows returned
+need no sorting.
+"""
+from collections import namedtuple
+
+from rollups import coarsen, widen, with_period
+
+FilteredView = namedtuple("FilteredView", ["filtered_data", "grain_data", "kelompok_data"])
+
+
+def _at_time_grain(rollups, monthly_rows, months, date_range, grain, row_filter):
+    # Coarser grains use the materialized rollup, unless a subset of months is selected or
+    # the date range cuts a period: then the period totals are re-derived from the filtered monthly rows
+    if grain == 'Month':
+        return monthly_rows
+    if set(months) != set(rollups.monthly['Month'].dropna().unique()) or rollups.splits_periods(grain, *date_range):
+        return coarsen(monthly_rows, grain)
+    rollup = rollups.between(grain, *date_range)
+    return widen(rollup[row_filter(rollup)])
+
+
+def general_rows(rollups, groups, years, months, stores, grain, date_range=(None, None)):
+    """Rows selected by the general filters, monthly and at ``grain``.
+
+    ``date_range`` is the first and last month (period start Dates) to
+    include; None leaves that end open.
+    """
+    raw_data = rollups.between('Month', *date_range)
+
+    # Apply General Filters
+    filtered_data = widen(raw_data[
+        (raw_data['Group'].isin(groups)) &
+        (raw_data['year'].isin(years)) &
+        (raw_data['Month'].isin(months)) &
+        (raw_data['Store Name'].isin(stores))
+    ])
+
+    grain_data = _at_time_grain(rollups, filtered_data, months, date_range, grain, lambda rollup: (
+        rollup['Group'].isin(groups) &
+        rollup['year'].isin(years) &
+        rollup['Store Name'].isin(stores)
+    ))
+    return filtered_data, grain_data
+
+
+def grouping_rows(rollups, categories, years, months, stores, grain, date_range=(None, None)):
+    """Rows of the selected Grouping at ``grain``, with a Period column."""
+    raw_data = rollups.between('Month', *date_range)
+
+    # Apply Grouping Filters
+    kelompok_data = widen(raw_data[
+        (raw_data['Grouping'].isin(categories)) &
+        (raw_data['year'].isin(years)) &
+        (raw_data['Month'].isin(months)) &
+        (raw_data['Store Name'].isin(stores))
+    ])
+
+    if not kelompok_data.empty:
+        kelompok_data = with_period(_at_time_grain(rollups, kelompok_data, months, date_range, grain, lambda rollup: (
+            rollup['Grouping'].isin(categories) &
+            rollup['year'].isin(years) &
+            rollup['Store Name'].isin(stores)
+        )), grain)
+    return kelompok_data
+
+
+def months_in_selection(rollups, years, months, date_range=(None, None)):
+    """Start Dates of the months of ``rollups`` in ``date_range`` with a selected year and month name."""
+    periods = rollups.periods['Month']
+    start, end = date_range
+    selected = periods.year.isin(years) & periods.month_name().isin(months)
+    if start is not None:
+        selected &= periods >= start
+    if end is not None:
+        selected &= periods <= end
+    return periods[selected]
+
+
+def filter_rollups(rollups, groups, years, months, stores, categories, grain, date_range=(None, None)):
+    """Rows of ``rollups`` selected by the sidebar filters.
+
+    ``filtered_data`` is monthly, ``grain_data`` the same selection at
+    ``grain``, and ``kelompok_data`` the selected Grouping at ``grain``
+    with a Period column.
+    """
+    filtered_data, grain_data = general_rows(rollups, groups, years, months, stores, grain, date_range)
+    kelompok_data = grouping_rows(rollups, categories, years, months, stores, grain, date_range)
+    return FilteredView(filtered_data, grain_data, kelompok_data)
@@ -0,0 +1,145 @@
+"""Sales forecasts for every Grouping x Store series at once.
+
+The monthly sales of all series are laid out as one series x month array
+(from pivot_sum, with months without sales as 0), and each model forecasts
+every row of it with whole-array operations:
+
+- Seasonal naive: the same month a year earlier (the last month while
+  there is less than a year of history).
+- Linear trend: the least-squares line through each row, extended.
+- Exponential smoothing: the smoothed level, held flat; one pass over the
+  months updates every series together.
+
+Each model is backtested by forecasting the last HORIZON months from the
+months before them. Per series the model with the smallest backtest error
+gives the forecast, and its error is reported as a percentage of the
+actual sales of those months.
+
+The months must be consecutive: a month left out by the filters would
+otherwise be read as a month without sales, so BatchForecast raises
+MonthGapError when the selected months have gaps.
+"""
+import numpy as np
+import pandas as pd
+
+from group_sums import pivot_sum
+from rollups import period_labels
+
+HORIZON = 3
+SEASON = 12
+SMOOTHING_ALPHA = 0.5
+MODELS = ['Seasonal naive', 'Linear trend', 'Exponential smoothing']
+
+
+def seasonal_naive(history, horizon=HORIZON, season=SEASON):
+    """Forecasts (series x horizon) repeating each row's last ``season`` months."""
+    n_months = history.shape[1]
+    if n_months < season:
+        return np.repeat(history[:, -1:], horizon, axis=1)
+    return history[:, n_months - season + np.arange(horizon) % season]
+
+
+def linear_trend(history, horizon=HORIZON):
+    """Forecasts (series x horizon) on each row's least-squares line over the months."""
+    n_months = history.shape[1]
+    x = np.arange(n_months) - (n_months - 1) / 2
+    level = history.mean(axis=1)
+    slope = history @ x / max((x ** 2).sum(), 1)
+    return level[:, None] + slope[:, None] * (x[-1] + np.arange(1, horizon + 1))
+
+
+def exponential_smoothing(history, horizon=HORIZON, alpha=SMOOTHING_ALPHA):
+    """Forecasts (series x horizon) at each row's exponentially smoothed level."""
+    level = history[:, 0].copy()
+    for month in range(1, history.shape[1]):
+        level += alpha * (history[:, month] - level)
+    return np.repeat(level[:, None], horizon, axis=1)
+
+
+FORECASTERS = dict(zip(MODELS, [seasonal_naive, linear_trend, exponential_smoothing]))
+
+
+class MonthGapError(ValueError):
+    """Raised when the months to forecast from are not consecutive."""
+
+    def __init__(self, missing):
+        self.missing = missing
+        super().__init__(
+            "Forecasts need consecutive months, but the filters leave out "
+            f"{', '.join(period_labels(missing, 'Month'))}. Select every month from the first to the last "
+            "to forecast."
+        )
+
+
+def missing_months(months):
+    """Start Dates of the months between the first and last of ``months`` that are not in it."""
+    months = pd.DatetimeIndex(months)
+    if months.empty:
+        return months
+    return pd.date_range(months.min(), months.max(), freq='MS').difference(months)
+
+
+class BatchForecast:
+    """Forecasts of the next ``horizon`` months of ``measure`` for every ``keys`` series of the
+    monthly rows ``monthly``.
+
+    ``months`` are the start Dates of the months the rows were selected
+    from, by default every month from the first to the last of the rows.
+    Raises MonthGapError when they are not consecutive.
+    """
+
+    def __init__(self, monthly, keys=('Grouping', 'Store Name'), measure='Penjualan', horizon=HORIZON, months=None):
+        pivot = pivot_sum(monthly, list(keys), 'Date', measure)
+        if months is None:
+            months = pd.date_range(pivot.columns.min(), pivot.columns.max(), freq='MS')
+        missing = missing_months(months)
+        if len(missing):
+            raise MonthGapError(missing)
+        self.months = pd.DatetimeIndex(months).sort_values()
+        self.future = pd.date_range(self.months[-1] + pd.offsets.MonthBegin(), periods=horizon, freq='MS')
+        self.keys = pivot.index.to_frame(index=False)
+        history = pivot.reindex(columns=self.months, fill_value=0).to_numpy()
+        self.last = history[:, -1]
+
+        # Backtest: forecast the last months from the months before them; without
+        # enough history every model scores NaN and the first one is used
+        n_series = len(history)
+        errors = np.full((n_series, len(MODELS)), np.nan)
+        if len(self.months) > horizon:
+            train, actual = history[:, :-horizon], history[:, -horizon:]
+            for i, forecaster in enumerate(FORECASTERS.values()):
+                errors[:, i] = np.abs(forecaster(train, horizon) - actual).sum(axis=1)
+            actual_sales = np.abs(actual).sum(axis=1)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                errors = np.where(actual_sales[:, None] > 0, errors / actual_sales[:, None] * 100, np.nan)
+        self.errors = errors
+        self.model = np.where(np.isnan(errors).all(axis=1), 0, np.argmin(np.nan_to_num(errors, nan=np.inf), axis=1))
+
+        forecasts = np.stack([forecaster(history, horizon) for forecaster in FORECASTERS.values()])
+        self.forecasts = np.maximum(forecasts[self.model, np.arange(n_series)], 0)
+        self.error = errors[np.arange(n_series), self.model]
+
+    def __len__(self):
+        return len(self.keys)
+
+    def table(self):
+        """One row per series: keys, the model used, its forecasts and backtest error %."""
+        table = self.keys.copy()
+        table['Model'] = np.array(MODELS, dtype=object)[self.model]
+        for i, label in enumerate(period_labels(self.future, 'Month')):
+            table[f"Forecast_{label}"] = self.forecasts[:, i]
+        table['Backtest Error %'] = self.error
+        return table
+
+    def rows(self):
+        """The forecasts as monthly rows (keys, Date, Penjualan, Model, Backtest Error %), each series
+        starting from its last actual month so that the forecast line joins the actuals."""
+        n_series, horizon = self.forecasts.shape
+        dates = np.append(self.months[-1:], self.future)
+        values = np.column_stack([self.last, self.forecasts])
+        rows = self.keys.loc[np.repeat(np.arange(n_series), horizon + 1)].reset_index(drop=True)
+        rows['Date'] = np.tile(dates, n_series)
+        rows['Penjualan'] = values.ravel()
+        rows['Model'] = np.repeat(np.array(MODELS, dtype=object)[self.model], horizon + 1)
+        rows['Backtest Error %'] = np.repeat(self.error, horizon + 1)
+        return rows
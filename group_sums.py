@@ -0,0 +1,118 @@
+"""Sums per group on integer codes, for the plain sums behind the tabs.
+
+Nearly every aggregation in the dashboard is a sum of one or two float
+columns over one to three low-cardinality keys. CodedGroups replaces each
+key by its integer code (the categorical codes when the column is
+categorical, else its position among the sorted distinct values), combines
+the codes into one linear cell key with np.ravel_multi_index, and sums every
+measure with np.bincount over that key. When the key space is too large for
+dense counts, the observed keys are compacted with np.unique first.
+
+group_sum and pivot_sum are drop-in replacements for
+``groupby(by)[values].sum().reset_index()`` and
+``pivot_table(values, index, columns, aggfunc='sum', fill_value=0)``: the
+same observed groups in the same sorted order, rows with a missing key left
+out and missing values counted as 0. Keys come back as plain values, also
+from categorical columns, so results look the same whatever the layout of
+the rows. Sums are plain running sums, where
+pandas compensates its float sums, so totals of non-integral amounts can
+differ from pandas in the last bits.
+"""
+import math
+
+import numpy as np
+import pandas as pd
+
+# Largest key space counted densely; above it the observed keys are compacted
+DENSE_CELLS = 1 << 22
+
+
+def key_codes(column):
+    """Integer codes of a key column (-1 where missing) and the labels they index, in sorted order."""
+    if isinstance(column.dtype, pd.CategoricalDtype):
+        return column.cat.codes.to_numpy(), column.cat.categories
+    return pd.factorize(column, sort=True)
+
+
+class CodedGroups:
+    """The rows of ``frame`` grouped by the key columns ``by``."""
+
+    def __init__(self, frame, by):
+        self.by = list(by)
+        codes, self.labels = zip(*(key_codes(frame[col]) for col in self.by))
+        self.shape = tuple(len(labels) for labels in self.labels)
+
+        # Rows with a missing key belong to no group
+        self._rows = None
+        if any(c.size and c.min() < 0 for c in codes):
+            self._rows = np.logical_and.reduce([c >= 0 for c in codes])
+            codes = [c[self._rows] for c in codes]
+        n_cells = math.prod(self.shape)
+        key = np.ravel_multi_index(codes, self.shape) if codes[0].size else np.zeros(0, dtype=np.int64)
+
+        if n_cells <= DENSE_CELLS:
+            counts = np.bincount(key, minlength=n_cells)
+            self.cells = np.flatnonzero(counts)
+            self._ids, self._minlength = key, n_cells
+        else:
+            self.cells, self._ids = np.unique(key, return_inverse=True)
+            self._minlength = len(self.cells)
+
+    def __len__(self):
+        return len(self.cells)
+
+    def sum(self, values):
+        """Sum of the float array ``values`` (one per row of the frame) per observed group, NaN as 0."""
+        values = np.asarray(values, dtype=np.float64)
+        if self._rows is not None:
+            values = values[self._rows]
+        missing = np.isnan(values)
+        if missing.any():
+            values = np.where(missing, 0.0, values)
+        sums = np.bincount(self._ids, weights=values, minlength=self._minlength)
+        return sums[self.cells] if self._minlength > len(self.cells) else sums
+
+    def key_positions(self):
+        """Code of every key column per observed group, in the order of ``by``."""
+        return np.unravel_index(self.cells, self.shape)
+
+    def key_values(self, level, codes):
+        """Index of the values of key ``level`` at ``codes``."""
+        return self.labels[level].take(codes).rename(self.by[level])
+
+    def keys(self):
+        """The key columns of the observed groups, as a frame."""
+        positions = self.key_positions()
+        return pd.DataFrame({col: self.key_values(level, positions[level]).array for level, col in enumerate(self.by)})
+
+
+def group_sum(frame, by, values):
+    """Equivalent of ``frame.groupby(by)[values].sum().reset_index()``."""
+    by = [by] if isinstance(by, str) else list(by)
+    values = [values] if isinstance(values, str) else list(values)
+    groups = CodedGroups(frame, by)
+    result = groups.keys()
+    for col in values:
+        result[col] = groups.sum(frame[col])
+    return result
+
+
+def pivot_sum(frame, index, columns, values, fill_value=0):
+    """Equivalent of ``frame.pivot_table(values=values, index=index, columns=columns,
+    aggfunc='sum', fill_value=fill_value)`` for one ``values`` column."""
+    index = [index] if isinstance(index, str) else list(index)
+    groups = CodedGroups(frame, index + [columns])
+    sums = groups.sum(frame[values])
+
+    # Rows are the observed combinations of the index codes, columns the observed column codes
+    positions = groups.key_positions()
+    row_key = np.ravel_multi_index(positions[:-1], groups.shape[:-1])
+    row_keys, row_ids = np.unique(row_key, return_inverse=True)
+    col_codes, col_ids = np.unique(positions[-1], return_inverse=True)
+    block = np.full((len(row_keys), len(col_codes)), fill_value, dtype=np.float64)
+    block[row_ids, col_ids] = sums
+
+    row_codes = np.unravel_index(row_keys, groups.shape[:-1])
+    levels = [groups.key_values(level, codes) for level, codes in enumerate(row_codes)]
+    rows = levels[0] if len(levels) == 1 else pd.MultiIndex.from_arrays(levels)
+    return pd.DataFrame(block, index=rows, columns=groups.key_values(len(index), col_codes))
@@ -0,0 +1,108 @@
+"""Month-by-month growth KPIs for the whole history.
+
+GrowthKPIs sums each measure into one series per month, for the total and
+for every division and store, over a contiguous month calendar (months
+without rows count as 0). MoM, YoY, trailing-3-month and YTD growth are then
+shifted array operations on those series, so the KPIs for any month are
+lookups rather than new scans over the rows.
+"""
+import numpy as np
+import pandas as pd
+
+GROWTH_MEASURES = ['Penjualan', 'HPP', 'Gross Margin', 'Stock Value']
+
+# Growth kind -> what the current value is compared with
+GROWTH_KINDS = {
+    'MoM': "previous month",
+    'YoY': "same month last year",
+    'Trailing 3M': "previous three months",
+    'YTD': "same period last year",
+}
+
+TOTAL = "All"
+
+
+def _shift(matrix, months):
+    """Values ``months`` columns earlier; NaN before the first month."""
+    shifted = np.full(matrix.shape, np.nan)
+    if months < matrix.shape[1]:
+        shifted[:, months:] = matrix[:, :matrix.shape[1] - months]
+    return shifted
+
+
+def growth_rate(current, previous):
+    """Percent change from ``previous`` to ``current``; NaN unless ``previous`` > 0."""
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rate = (current - previous) / previous * 100
+    return np.where(previous > 0, rate, np.nan)
+
+
+class GrowthKPIs:
+    """Monthly series and growth rates of ``measures`` over the filtered rows."""
+
+    def __init__(self, data, measures=GROWTH_MEASURES, dimensions=('Division', 'Store Name')):
+        first, last = data['Date'].min(), data['Date'].max()
+        self.months = pd.date_range(first, last, freq='MS')
+        month_pos = ((data['Date'].dt.year - first.year) * 12 + data['Date'].dt.month - first.month).to_numpy()
+        n_months = len(self.months)
+
+        # Trailing-3-month and YTD windows as cumulative-sum differences
+        self._window_start = {
+            'Trailing 3M': np.arange(n_months) - 2,
+            'YTD': np.arange(n_months) - (self.months.month.to_numpy() - 1),
+        }
+
+        self.labels = {None: pd.Index([TOTAL])}
+        self.values = {}
+        self._growth = {}
+        for dimension in (None,) + tuple(dimensions):
+            if dimension is None:
+                series = np.zeros(len(data), dtype=np.int64)
+            else:
+                series, self.labels[dimension] = pd.factorize(data[dimension], sort=True)
+            n_series = len(self.labels[dimension])
+            cell = series * n_months + month_pos
+            for measure in measures:
+                sums = np.bincount(cell, weights=data[measure].to_numpy(dtype=np.float64),
+                                   minlength=n_series * n_months).reshape(n_series, n_months)
+                self.values[dimension, measure] = sums
+                self._add_growth(dimension, measure, sums)
+
+    def _window_sums(self, sums, kind):
+        # Sum over [start, t] per month; NaN where the window starts before the first month
+        start = self._window_start[kind]
+        cumulative = np.concatenate([np.zeros((sums.shape[0], 1)), np.cumsum(sums, axis=1)], axis=1)
+        totals = cumulative[:, 1:] - cumulative[:, np.clip(start, 0, None)]
+        totals[:, start < 0] = np.nan
+        return totals
+
+    def _add_growth(self, dimension, measure, sums):
+        trailing = self._window_sums(sums, 'Trailing 3M')
+        ytd = self._window_sums(sums, 'YTD')
+        self._growth[dimension, measure] = {
+            'MoM': growth_rate(sums, _shift(sums, 1)),
+            'YoY': growth_rate(sums, _shift(sums, 12)),
+            'Trailing 3M': growth_rate(trailing, _shift(trailing, 3)),
+            'YTD': growth_rate(ytd, _shift(ytd, 12)),
+        }
+
+    def month_position(self, month):
+        return self.months.get_loc(pd.Timestamp(month))
+
+    def growth(self, measure, kind, dimension=None):
+        """Growth in % as a (series x month) array."""
+        return self._growth[dimension, measure][kind]
+
+    def at(self, measure, month, dimension=None):
+        """One row per series with ``measure`` and every growth kind in ``month``."""
+        pos = self.month_position(month)
+        result = pd.DataFrame({measure: self.values[dimension, measure][:, pos]},
+                              index=self.labels[dimension].rename(dimension or TOTAL))
+        for kind in GROWTH_KINDS:
+            result[f"{kind} %"] = self._growth[dimension, measure][kind][:, pos]
+        return result
+
+    def history(self, measure, label=TOTAL, dimension=None):
+        """Monthly values of one series, as a frame for charts."""
+        row = self.labels[dimension].get_loc(label)
+        return pd.DataFrame({'Date': self.months, measure: self.values[dimension, measure][row]})
@@ -0,0 +1,164 @@
+"""Background ingest jobs shared by every session of the app.
+
+Uploads are parsed on a small thread pool so the script run that submitted
+them returns immediately. Jobs are keyed by the SHA-256 of the file content;
+submitting a file that is already queued or loading joins the existing job
+instead of starting a competing parse.
+
+Each session holds the job it submitted or joined through an IngestLease.
+A session that cancels loading only gives up its own lease; the job itself
+is cancelled once no session holds it any more.
+"""
+import hashlib
+import io
+import threading
+import time
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+
+import metrics
+from data_loader import load_rollups
+
+# Finished jobs kept around so that repeated uploads can reuse their result
+MAX_FINISHED_JOBS = 4
+
+_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="ingest")
+_jobs = {}
+# Reentrant: a lease collected with a closed session's state may be released
+# by the garbage collector while this thread already holds the lock
+_lock = threading.RLock()
+
+
+class IngestCancelled(Exception):
+    """Raised inside a job when cancellation was requested."""
+
+
+class IngestJob:
+    """Handle for one background ingest.
+
+    ``status`` moves from 'queued' to 'running' and ends in 'done', 'failed'
+    or 'cancelled'. ``progress`` is the fraction of rows read so far. A done
+    job's ``result`` is the Rollups of the cleaned rows. ``sessions`` counts
+    the leases held on the job.
+    """
+
+    def __init__(self, key, name, size):
+        self.key = key
+        self.name = name
+        self.size = size
+        self.status = 'queued'
+        self.progress = 0.0
+        self.result = None
+        self.error = None
+        self.sessions = 0
+        self.submitted_at = time.time()
+        self.finished_at = None
+        self.future = None
+        self._cancel_requested = threading.Event()
+
+    @property
+    def active(self):
+        return self.status in ('queued', 'running')
+
+    @property
+    def joinable(self):
+        """Whether a new request for the same content may reuse this job."""
+        return self.status == 'done' or (self.active and not self._cancel_requested.is_set())
+
+    def cancel(self):
+        """Ask the job to stop at the next chunk; a queued job never starts."""
+        self._cancel_requested.set()
+        if self.future is not None and self.future.cancel():
+            self._finish('cancelled')
+
+    def _report(self, fraction):
+        if self._cancel_requested.is_set():
+            raise IngestCancelled()
+        self.progress = fraction
+
+    def _finish(self, status, result=None, error=None):
+        self.result = result
+        self.error = error
+        self.finished_at = time.time()
+        self.status = status
+        metrics.observe('sales_dashboard_ingest_seconds', self.finished_at - self.submitted_at, status=status)
+
+    def _run(self, data):
+        if self._cancel_requested.is_set():
+            self._finish('cancelled')
+            return
+        self.status = 'running'
+        try:
+            rollups = load_rollups(io.BytesIO(data), self.size, progress=self._report, name=self.name)
+            if self._cancel_requested.is_set():
+                raise IngestCancelled()
+            metrics.inc('sales_dashboard_ingest_rows_total', int(rollups.monthly['Rows'].sum()))
+        except IngestCancelled:
+            self._finish('cancelled')
+        except Exception as e:
+            self._finish('failed', error=e)
+        else:
+            self.progress = 1.0
+            self._finish('done', result=rollups)
+
+
+class IngestLease:
+    """One session's hold on an ingest job.
+
+    ``cancel`` detaches the session from the job, which goes on loading for
+    the other sessions holding it. A session that closes without releasing
+    its lease gives it up when its state, and the lease with it, is
+    collected.
+    """
+
+    def __init__(self, job):
+        self.job = job
+        self.cancelled = False
+        self._finalizer = weakref.finalize(self, _release, job)
+
+    def cancel(self):
+        """Stop waiting for the job; it is cancelled if no other session holds it."""
+        self.cancelled = True
+        self.release()
+
+    def release(self):
+        """Give up the hold; calling it again does nothing."""
+        self._finalizer()
+
+
+def _release(job):
+    with _lock:
+        job.sessions -= 1
+        if job.sessions <= 0 and job.active:
+            job.cancel()
+
+
+def content_hash(data):
+    """SHA-256 hex digest of the uploaded bytes."""
+    return hashlib.sha256(data).hexdigest()
+
+
+def submit_ingest(uploaded_file):
+    """Start loading ``uploaded_file`` in the background, or join the job
+    already loading the same content, and return the caller's IngestLease on it."""
+    data = uploaded_file.getvalue()
+    key = content_hash(data)
+    with _lock:
+        job = _jobs.get(key)
+        if job is None or not job.joinable:
+            job = IngestJob(key, uploaded_file.name, len(data))
+            _jobs[key] = job
+            _forget_finished_jobs()
+            job.future = _executor.submit(job._run, data)
+        job.sessions += 1
+        return IngestLease(job)
+
+
+def _forget_finished_jobs():
+    # Caller holds _lock
+    finished = sorted(
+        (job for job in _jobs.values() if not job.active),
+        key=lambda job: job.finished_at,
+    )
+    for job in finished[:max(len(finished) - MAX_FINISHED_JOBS, 0)]:
+        del _jobs[job.key]
@@ -0,0 +1,326 @@
+"""Process metrics of the dashboard, for production monitoring.
+
+Recording is off unless one of these environment variables is set when the
+app starts:
+
+    SALES_DASHBOARD_METRICS_FILE  path of a Prometheus text file, rewritten
+                                  every METRICS_FILE_INTERVAL seconds (for the
+                                  node exporter's textfile collector)
+    SALES_DASHBOARD_METRICS_PORT  port of a local HTTP endpoint serving
+                                  /metrics (Prometheus text) and /metrics.json
+
+When both are unset every recording call returns at its first line, so the
+hot paths pay one attribute check. Figure sizes are only measured when
+recording is on, since that serializes the figure a second time.
+
+Streamlit does not let an app add routes to its own tornado server, so the
+endpoint is a small tornado server of its own, on a background thread.
+"""
+import asyncio
+import contextlib
+import json
+import logging
+import os
+import resource
+import sys
+import threading
+import time
+from bisect import bisect_left
+
+from result_cache import RESULT_CACHE
+
+METRICS_FILE_ENV = "SALES_DASHBOARD_METRICS_FILE"
+METRICS_PORT_ENV = "SALES_DASHBOARD_METRICS_PORT"
+# The endpoint is only reachable from the host, where the scraper runs
+METRICS_ADDRESS = "127.0.0.1"
+METRICS_FILE_INTERVAL = 15.0
+
+# Upper bounds of the histogram buckets
+SECONDS_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+BYTES_BUCKETS = tuple(1024 * 4 ** i for i in range(10))
+
+logger = logging.getLogger(__name__)
+
+
+class Metric:
+    """One metric family: a counter or a histogram, with a sample per label set."""
+
+    def __init__(self, name, kind, help, buckets=None):
+        self.name = name
+        self.kind = kind
+        self.help = help
+        self.buckets = buckets
+        # Counters map label tuples to a value, histograms to [bucket counts, sum, count]
+        self.samples = {}
+
+    def add(self, labels, value):
+        if self.kind == 'counter':
+            self.samples[labels] = self.samples.get(labels, 0) + value
+            return
+        sample = self.samples.get(labels)
+        if sample is None:
+            sample = self.samples[labels] = [[0] * len(self.buckets), 0.0, 0]
+        index = bisect_left(self.buckets, value)
+        if index < len(self.buckets):
+            sample[0][index] += 1
+        sample[1] += value
+        sample[2] += 1
+
+
+def _label_text(labels, extra=()):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in labels + extra]
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class MetricsRegistry:
+    """Counters and histograms recorded by the app, plus gauges read at export time."""
+
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self._metrics = {}
+        self._collectors = []
+        self._lock = threading.Lock()
+
+    def describe(self, name, kind, help, buckets=None):
+        """Declare a counter, or a histogram with the given bucket bounds."""
+        self._metrics[name] = Metric(name, kind, help, buckets)
+
+    def collector(self, func):
+        """Register ``func()``, returning (name, kind, help, labels, value) samples, for every export."""
+        self._collectors.append(func)
+        return func
+
+    def inc(self, name, value=1, **labels):
+        if not self.enabled:
+            return
+        with self._lock:
+            self._metrics[name].add(tuple(sorted(labels.items())), value)
+
+    def observe(self, name, value, **labels):
+        self.inc(name, value, **labels)
+
+    def timed(self, name, **labels):
+        """Context manager observing the seconds spent in its block."""
+        if not self.enabled:
+            return _NOT_TIMED
+        return self._timer(name, labels)
+
+    @contextlib.contextmanager
+    def _timer(self, name, labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    def _families(self):
+        # (name, kind, help, samples) of every metric, recorded ones first
+        with self._lock:
+            families = [
+                (m.name, m.kind, m.help, [(labels, list(v) if m.kind == 'histogram' else v)
+                                          for labels, v in m.samples.items()], m.buckets)
+                for m in self._metrics.values()
+            ]
+        gauges = {}
+        for collect in self._collectors:
+            for name, kind, help, labels, value in collect():
+                gauges.setdefault(name, (name, kind, help, [], None))[3].append(
+                    (tuple(sorted(labels.items())), value))
+        return families + list(gauges.values())
+
+    def prometheus_text(self):
+        """All metrics in the Prometheus text exposition format."""
+        lines = []
+        for name, kind, help, samples, buckets in self._families():
+            lines.append(f"# HELP {name} {help}")
+            lines.append(f"# TYPE {name} {kind}")
+            for labels, value in samples:
+                if kind != 'histogram':
+                    lines.append(f"{name}{_label_text(labels)} {_number(value)}")
+                    continue
+                counts, total, count = value
+                cumulative = 0
+                for bound, bucket_count in zip(buckets, counts):
+                    cumulative += bucket_count
+                    lines.append(f"{name}_bucket{_label_text(labels, (('le', _number(bound)),))} {cumulative}")
+                lines.append(f"{name}_bucket{_label_text(labels, (('le', '+Inf'),))} {count}")
+                lines.append(f"{name}_sum{_label_text(labels)} {_number(total)}")
+                lines.append(f"{name}_count{_label_text(labels)} {count}")
+        return '\n'.join(lines) + '\n'
+
+    def as_json(self):
+        """All metrics as a JSON document keyed by metric name."""
+        document = {}
+        for name, kind, help, samples, buckets in self._families():
+            entries = []
+            for labels, value in samples:
+                if kind == 'histogram':
+                    counts, total, count = value
+                    value = {'buckets': dict(zip(map(_number, buckets), counts)), 'sum': total, 'count': count}
+                entries.append({'labels': dict(labels), 'value': value})
+            document[name] = {'type': kind, 'help': help, 'samples': entries}
+        return json.dumps(document)
+
+
+_NOT_TIMED = contextlib.nullcontext()
+
+REGISTRY = MetricsRegistry(enabled=bool(os.environ.get(METRICS_FILE_ENV) or os.environ.get(METRICS_PORT_ENV)))
+
+REGISTRY.describe('sales_dashboard_rerun_seconds', 'histogram',
+                  "Wall time of a full script run of the dashboard.", SECONDS_BUCKETS)
+REGISTRY.describe('sales_dashboard_tab_seconds', 'histogram',
+                  "Time spent computing and rendering one tab in a script run.", SECONDS_BUCKETS)
+REGISTRY.describe('sales_dashboard_figure_json_bytes', 'histogram',
+                  "Size of the JSON of a plotly figure sent to the browser.", BYTES_BUCKETS)
+REGISTRY.describe('sales_dashboard_ingest_seconds', 'histogram',
+                  "Duration of a background ingest job, by final status.", SECONDS_BUCKETS)
+REGISTRY.describe('sales_dashboard_ingest_rows_total', 'counter',
+                  "Cleaned rows loaded by finished ingest jobs.")
+REGISTRY.describe('sales_dashboard_rows_dropped_total', 'counter',
+                  "Rows dropped while cleaning an upload, by reason (numeric or date coercion).")
+
+
+@REGISTRY.collector
+def _result_cache_samples():
+    stats = RESULT_CACHE.stats()
+    return [
+        ('sales_dashboard_result_cache_hits_total', 'counter', "Result cache lookups answered from the cache.",
+         {}, stats['hits']),
+        ('sales_dashboard_result_cache_misses_total', 'counter', "Result cache lookups that computed the result.",
+         {}, stats['misses']),
+        ('sales_dashboard_result_cache_hit_ratio', 'gauge', "Share of result cache lookups that were hits.",
+         {}, stats['hit_rate']),
+        ('sales_dashboard_result_cache_evictions_total', 'counter', "Results evicted from the result cache.",
+         {}, stats['evictions']),
+        ('sales_dashboard_result_cache_entries', 'gauge', "Results kept in the result cache.",
+         {}, stats['entries']),
+        ('sales_dashboard_result_cache_bytes', 'gauge', "Approximate memory held by the result cache.",
+         {}, stats['bytes']),
+    ]
+
+
+def resident_memory_bytes():
+    """Current resident memory of the process, or None where /proc is not available."""
+    try:
+        with open('/proc/self/statm') as statm:
+            return int(statm.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def peak_resident_memory_bytes():
+    """Peak resident memory of the process so far."""
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+@REGISTRY.collector
+def _process_samples():
+    samples = [('process_peak_resident_memory_bytes', 'gauge', "Peak resident memory size of the process.",
+                {}, peak_resident_memory_bytes())]
+    resident = resident_memory_bytes()
+    if resident is not None:
+        samples.append(('process_resident_memory_bytes', 'gauge', "Resident memory size of the process.",
+                        {}, resident))
+    return samples
+
+
+def inc(name, value=1, **labels):
+    """Add ``value`` to the counter ``name``."""
+    REGISTRY.inc(name, value, **labels)
+
+
+def observe(name, value, **labels):
+    """Record one observation of the histogram ``name``."""
+    REGISTRY.observe(name, value, **labels)
+
+
+def timed(name, **labels):
+    """Context manager recording the seconds spent in its block into the histogram ``name``."""
+    return REGISTRY.timed(name, **labels)
+
+
+def record_figure(fig, chart):
+    """Record the JSON size of the plotly figure ``fig``."""
+    if REGISTRY.enabled:
+        observe('sales_dashboard_figure_json_bytes', len(fig.to_json()), chart=chart)
+
+
+def write_text_file(path, registry=REGISTRY):
+    """Write the metrics to ``path`` atomically, so a scraper never reads half a file."""
+    temporary = f"{path}.{os.getpid()}.tmp"
+    with open(temporary, 'w', encoding='utf-8') as f:
+        f.write(registry.prometheus_text())
+    os.replace(temporary, path)
+
+
+def _write_periodically(path, interval):
+    while True:
+        try:
+            write_text_file(path)
+        except OSError as e:
+            logger.warning("Could not write metrics to %s: %s", path, e)
+        time.sleep(interval)
+
+
+def _serve(sockets):
+    import tornado.httpserver
+    import tornado.web
+
+    class PrometheusHandler(tornado.web.RequestHandler):
+        def get(self):
+            self.set_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+            self.write(REGISTRY.prometheus_text())
+
+    class JSONHandler(tornado.web.RequestHandler):
+        def get(self):
+            self.set_header('Content-Type', 'application/json')
+            self.write(REGISTRY.as_json())
+
+    async def serve_forever():
+        server = tornado.httpserver.HTTPServer(tornado.web.Application([
+            (r"/metrics", PrometheusHandler),
+            (r"/metrics\.json", JSONHandler),
+        ]))
+        server.add_sockets(sockets)
+        await asyncio.Event().wait()
+
+    asyncio.run(serve_forever())
+
+
+_started = False
+_start_lock = threading.Lock()
+
+
+def start():
+    """Start the exporters configured by the environment, once per process."""
+    global _started
+    with _start_lock:
+        if _started or not REGISTRY.enabled:
+            return
+        _started = True
+
+    path = os.environ.get(METRICS_FILE_ENV)
+    if path:
+        threading.Thread(target=_write_periodically, args=(path, METRICS_FILE_INTERVAL),
+                         name="metrics-file", daemon=True).start()
+
+    port = os.environ.get(METRICS_PORT_ENV)
+    if port:
+        import tornado.netutil
+        try:
+            # Bound here so that a busy port is reported right away
+            sockets = tornado.netutil.bind_sockets(int(port), address=METRICS_ADDRESS)
+        except (OSError, ValueError) as e:
+            logger.warning("Metrics endpoint not started on port %s: %s", port, e)
+            return
+        threading.Thread(target=_serve, args=(sockets,), name="metrics-http", daemon=True).start()
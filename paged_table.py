@@ -0,0 +1,162 @@
+"""Server-side paged tables.
+
+A PagedTable keeps the full result on the server. Searching, sorting and
+paging resolve to row positions, and only the rows of the visible page are
+styled and sent to the browser. Sort orders and column-max highlight masks
+are computed once per table and reused on every rerun that shows it.
+"""
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from exports import EXPORT_CHUNK_ROWS, render_export
+
+HIGHLIGHT_PROPS = 'background-color: yellow'
+DEFAULT_ORDER = "(default)"
+
+
+def is_text(dtype):
+    """Whether a column of ``dtype`` holds text: object, string, or categorical over either."""
+    if isinstance(dtype, pd.CategoricalDtype):
+        dtype = dtype.categories.dtype
+    return dtype == object or isinstance(dtype, pd.StringDtype)
+
+
+class PagedTable:
+    """A table whose rows are addressed by position.
+
+    ``frame`` holds the columns that can be searched and sorted. When the
+    displayed table is wider than that (for example the sparse Tab 3 pivot),
+    ``expand(positions)`` builds the displayed rows for a page.
+    """
+
+    def __init__(self, frame, formats=None, highlight_max=False, expand=None):
+        self.frame = frame
+        self.formats = formats or {}
+        self.expand = expand
+        self._orders = {}
+        self._lowercase = {}
+        self._views = {}
+        self._max_positions = self._column_max_positions() if highlight_max else None
+
+    def __len__(self):
+        return len(self.frame)
+
+    @property
+    def sortable_columns(self):
+        return list(self.frame.columns)
+
+    @property
+    def search_columns(self):
+        return [col for col in self.frame.columns if is_text(self.frame[col].dtype)]
+
+    def _column_max_positions(self):
+        # Same cells as Styler.highlight_max(axis=0) over the full table
+        positions = {}
+        for col in self.frame.columns:
+            values = self.frame[col]
+            try:
+                top = values.max()
+            except TypeError:
+                continue
+            positions[col] = np.flatnonzero((values == top).to_numpy())
+        return positions
+
+    def _order(self, column, ascending):
+        key = (column, ascending)
+        if key not in self._orders:
+            ranked = self.frame[column].reset_index(drop=True).sort_values(
+                ascending=ascending, kind='stable', na_position='last')
+            self._orders[key] = ranked.index.to_numpy()
+        return self._orders[key]
+
+    def _matches(self, query):
+        needle = query.strip().lower()
+        mask = np.zeros(len(self.frame), dtype=bool)
+        for col in self.search_columns:
+            if col not in self._lowercase:
+                self._lowercase[col] = self.frame[col].astype(str).str.lower()
+            mask |= self._lowercase[col].str.contains(needle, regex=False).to_numpy()
+        return mask
+
+    def view(self, query="", sort_by=None, ascending=True):
+        """Positions of the rows matching ``query``, in the requested order."""
+        key = (query.strip().lower(), sort_by, ascending)
+        if key not in self._views:
+            if sort_by is None:
+                positions = np.arange(len(self.frame))
+            else:
+                positions = self._order(sort_by, ascending)
+            if key[0]:
+                positions = positions[self._matches(query)[positions]]
+            # Only the most recent views are worth keeping
+            if len(self._views) >= 8:
+                self._views.pop(next(iter(self._views)))
+            self._views[key] = positions
+        return self._views[key]
+
+    def rows(self, positions):
+        """Displayed rows at ``positions``, unstyled."""
+        if self.expand is not None:
+            return self.expand(positions)
+        return self.frame.iloc[positions]
+
+    def export_chunks(self, positions, chunk_rows=EXPORT_CHUNK_ROWS):
+        """The rows at ``positions`` in bounded chunks, for exports of wide tables."""
+        for start in range(0, max(len(positions), 1), chunk_rows):
+            yield self.rows(positions[start:start + chunk_rows])
+
+    def page(self, positions):
+        """Styler for the rows at ``positions``."""
+        rows = self.rows(positions)
+        styler = rows.style.format({col: fmt for col, fmt in self.formats.items() if col in rows.columns})
+
+        if self._max_positions:
+            def highlight(page_rows):
+                css = np.full(page_rows.shape, '', dtype=object)
+                for i, col in enumerate(page_rows.columns):
+                    if col in self._max_positions:
+                        css[np.isin(positions, self._max_positions[col]), i] = HIGHLIGHT_PROPS
+                return css
+
+            styler = styler.apply(highlight, axis=None)
+        return styler
+
+
+def cached_table(key, signature, build):
+    """PagedTable for ``key``, rebuilt by ``build()`` only when ``signature``
+    changes, so its sort orders and masks survive reruns."""
+    state_key = f"_paged_table_{key}"
+    cached = st.session_state.get(state_key)
+    if cached is None or cached[0] != signature:
+        cached = (signature, build())
+        st.session_state[state_key] = cached
+    return cached[1]
+
+
+def render_paged_table(table, key, page_sizes=(50, 100, 500, 1000), export_name=None):
+    """Search, sort and page controls plus the styled visible page.
+
+    With ``export_name``, an Export popover writes every row of the current
+    view (search and sort applied), not just the visible page.
+    """
+    search_col, sort_col, order_col, size_col = st.columns([3, 2, 1, 1])
+    query = search_col.text_input("Search:", key=f"{key}_search")
+    sort_by = sort_col.selectbox("Sort by:", options=[DEFAULT_ORDER] + table.sortable_columns, key=f"{key}_sort")
+    descending = order_col.toggle("Descending", value=False, key=f"{key}_descending")
+    rows_per_page = size_col.selectbox("Rows per page:", options=list(page_sizes), index=1, key=f"{key}_page_size")
+
+    positions = table.view(query, None if sort_by == DEFAULT_ORDER else sort_by, not descending)
+    n_pages = max(-(-len(positions) // rows_per_page), 1)
+    # Keyed on the page count, so the page resets when the result size changes
+    page = st.number_input(f"Page (of {n_pages}):", min_value=1, max_value=n_pages, value=1,
+                           key=f"{key}_page_of_{n_pages}")
+    first_row = (page - 1) * rows_per_page
+    page_positions = positions[first_row:first_row + rows_per_page]
+
+    st.dataframe(table.page(page_positions))
+    st.caption(f"Showing rows {first_row + 1 if len(page_positions) else 0:,}-{first_row + len(page_positions):,} "
+               f"of {len(positions):,}" + (f" (filtered from {len(table):,})" if len(positions) != len(table) else ""))
+    if export_name is not None:
+        render_export(key, (id(table), query.strip().lower(), sort_by, descending), lambda: table.export_chunks(positions),
+                      export_name)
@@ -0,0 +1,139 @@
+"""Top-k / bottom-k ranking of Grouping.
+
+GroupingRanker aggregates the filtered rows once per (Grouping, Division,
+Store) cell. Rankings by any measure, over all rows or within one division
+or store, are then bincount totals over those cells followed by a partial
+selection with np.argpartition, so asking for another k, measure or scope
+never goes back to the rows.
+
+Average Stock Value is the mean stock level over the stock observations,
+one per row of the rollup (a key's month-end level), not per line item
+counted in Rows.
+"""
+import threading
+
+import numpy as np
+import pandas as pd
+
+# Measure label -> column name used in the ranked frame
+RANK_MEASURES = {
+    'Sales': 'Penjualan',
+    'Gross Margin': 'Gross Margin',
+    'Margin %': 'Margin %',
+    'Average Stock Value': 'Stock Value',
+}
+
+# Scope label -> dimension column ranked within
+RANK_SCOPES = {
+    'Division': 'Division',
+    'Store': 'Store Name',
+}
+
+
+class GroupingRanker:
+    """Per-Grouping rankings over a fixed set of filtered rows."""
+
+    def __init__(self, data):
+        cells = data.groupby(['Grouping', 'Division', 'Store Name'], sort=False, observed=True).agg(
+            sales=('Penjualan', 'sum'),
+            cost=('HPP', 'sum'),
+            stock=('Stock Value', 'sum'),
+            rows=('Rows', 'sum'),
+            stock_rows=('Stock Value', 'count'),
+        ).reset_index()
+
+        self.grouping_codes, self.groupings = pd.factorize(cells['Grouping'], sort=True)
+        self.scope_codes = {}
+        self.scope_labels = {}
+        for scope, column in RANK_SCOPES.items():
+            self.scope_codes[scope], self.scope_labels[scope] = pd.factorize(cells[column], sort=True)
+        self.sales = cells['sales'].to_numpy(dtype=np.float64)
+        self.cost = cells['cost'].to_numpy(dtype=np.float64)
+        self.stock = cells['stock'].to_numpy(dtype=np.float64)
+        self.rows = cells['rows'].to_numpy(dtype=np.float64)
+        self.stock_rows = cells['stock_rows'].to_numpy(dtype=np.float64)
+        self._totals = {}
+        self._rankings = {}
+        # Rankers are shared by sessions through the result cache
+        self._lock = threading.Lock()
+
+    def scope_values(self, scope):
+        """Divisions or stores that can be ranked within."""
+        return list(self.scope_labels[scope])
+
+    def _scope_totals(self, scope, value):
+        # Per-Grouping sums for one scope, computed once and reused by every measure and k
+        key = (scope, value)
+        if key not in self._totals:
+            if scope is None:
+                selected = slice(None)
+            else:
+                code = self.scope_labels[scope].get_loc(value)
+                selected = self.scope_codes[scope] == code
+            codes = self.grouping_codes[selected]
+            n = len(self.groupings)
+            self._totals[key] = {
+                name: np.bincount(codes, weights=values[selected], minlength=n)
+                for name, values in (('sales', self.sales), ('cost', self.cost),
+                                     ('stock', self.stock), ('rows', self.rows),
+                                     ('stock_rows', self.stock_rows))
+            }
+        return self._totals[key]
+
+    def measure(self, measure, scope=None, value=None):
+        """Value of ``measure`` per Grouping; NaN where the Grouping has no rows in scope."""
+        totals = self._scope_totals(scope, value)
+        present = totals['rows'] > 0
+        with np.errstate(divide='ignore', invalid='ignore'):
+            if measure == 'Sales':
+                result = totals['sales'].copy()
+            elif measure == 'Gross Margin':
+                result = totals['sales'] - totals['cost']
+            elif measure == 'Margin %':
+                result = (totals['sales'] - totals['cost']) / totals['sales'] * 100
+                result[~np.isfinite(result)] = np.nan
+            elif measure == 'Average Stock Value':
+                result = totals['stock'] / totals['stock_rows']
+            else:
+                raise KeyError(f"Unknown ranking measure: {measure}")
+        result[~present] = np.nan
+        return result
+
+    def rank(self, measure, k, largest=True, scope=None, value=None, positive_only=False):
+        """The ``k`` best (or worst) Grouping by ``measure``.
+
+        Returns a frame with Grouping and the measure column, best first,
+        indexed by the Grouping's position in the sorted Grouping list. Ties
+        at the cut-off keep the alphabetically first Grouping, like
+        DataFrame.nlargest(keep='first') on a Grouping-sorted frame.
+        """
+        key = (measure, k, largest, scope, value, positive_only)
+        ranked = self._rankings.get(key)
+        if ranked is not None:
+            return ranked
+
+        values = self.measure(measure, scope, value)
+        candidates = np.flatnonzero(~np.isnan(values) & ((values > 0) if positive_only else True))
+        scores = values[candidates] if not largest else -values[candidates]
+        k = min(k, len(candidates))
+        if k == 0:
+            selected = candidates[:0]
+        else:
+            # Partial selection: everything strictly better than the k-th score, then ties in name order
+            kth = scores[np.argpartition(scores, k - 1)[k - 1]]
+            better = np.flatnonzero(scores < kth)
+            ties = np.flatnonzero(scores == kth)[:k - len(better)]
+            chosen = np.concatenate([better, ties])
+            chosen = chosen[np.lexsort((candidates[chosen], scores[chosen]))]
+            selected = candidates[chosen]
+
+        ranked = pd.DataFrame(
+            {'Grouping': self.groupings[selected], RANK_MEASURES[measure]: values[selected]},
+            index=selected
+        )
+        # Only the most recent rankings are worth keeping
+        with self._lock:
+            if len(self._rankings) >= 32:
+                self._rankings.pop(next(iter(self._rankings)))
+            self._rankings[key] = ranked
+        return ranked
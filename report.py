@@ -0,0 +1,39 @@
+"""Full report: every analysis table of the dashboard in one Excel workbook.
+
+One sheet per analysis, built from the current filters, time grain and
+ranking settings whether or not its tab is showing the table. The workbook
+is written sheet by sheet in openpyxl's write-only mode and the Tab 3
+detail is densified a chunk at a time, so memory stays flat however many
+detail rows there are. Numbers keep native Excel number formats. The app
+builds the workbook in the background when it is asked for (see
+report_worker) and then offers it for download.
+"""
+from aggregations import (detail_chunks, detailed_gm_division, detailed_gm_store, group_sales_overview,
+                          group_sales_tables, store_sales_table)
+from exports import EXPORT_CHUNK_ROWS, XLSX_MIME, write_workbook
+
+REPORT_FORMATS = {"Excel": (".xlsx", XLSX_MIME, write_workbook)}
+
+
+def report_sheets(aggregates, filtered_data, grain, performers):
+    """(sheet title, table) pairs of the full report.
+
+    ``aggregates`` are the dashboard's DASHBOARD_GRAPH results for the
+    current view; ``performers`` the (title, table) pairs of the ranked
+    Grouping tables, as Tab 7 currently shows them.
+    """
+    _, group_sales_table_with_total, group_sales_diff_with_total = group_sales_tables(
+        aggregates['group_sales'], grain)
+
+    return [
+        ("Group Sales", group_sales_overview(group_sales_table_with_total, group_sales_diff_with_total)),
+        ("Store Sales", store_sales_table(aggregates['store_comparison'], grain)),
+        ("Detail per Category", detail_chunks(aggregates['detail_pivot'], grain, EXPORT_CHUNK_ROWS)),
+        *performers,
+        ("GM by Division", aggregates['gm_by_division']),
+        ("GM by Store", aggregates['gm_by_store']),
+        ("GM by Store and Grouping", lambda: detailed_gm_store(filtered_data)),
+        ("GM by Division and Month", lambda: detailed_gm_division(filtered_data)),
+        ("Stock by Store", aggregates['store_stock_table']),
+        ("Sales vs Stock", aggregates['sales_stock_comparison']),
+    ]
@@ -0,0 +1,157 @@
+"""Background builds of the full report, shared by every session of the app.
+
+A build starts only when a session asks for the report, and the workbook
+is written on a single worker thread, so no script run waits for it. Builds
+are keyed by the view's signature: sessions asking for the report of the
+same view share one build and its file.
+
+A session holds the build it asked for through a ReportLease until it moves
+to another view or closes. The file is kept while any session holds it; a
+build that nobody holds any more is cancelled, before it starts or at the
+next sheet or detail chunk, and its file is removed.
+"""
+import os
+import threading
+import time
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+
+from exports import as_chunks, write_export
+from report import REPORT_FORMATS
+
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="report")
+_jobs = {}
+# Reentrant: a lease collected with a closed session's state may be released
+# by the garbage collector while this thread already holds the lock
+_lock = threading.RLock()
+
+
+class ReportCancelled(Exception):
+    """Raised inside a build when cancellation was requested."""
+
+
+class ReportJob:
+    """Handle for one background report build.
+
+    ``status`` moves from 'queued' to 'running' and ends in 'done', 'failed'
+    or 'cancelled'. ``progress`` is the fraction of sheets written so far. A
+    done job's ``path`` is the workbook file. ``sessions`` counts the leases
+    held on the job.
+    """
+
+    def __init__(self, key):
+        self.key = key
+        self.status = 'queued'
+        self.progress = 0.0
+        self.path = None
+        self.error = None
+        self.sessions = 0
+        self.submitted_at = time.time()
+        self.finished_at = None
+        self.future = None
+        self._cancel_requested = threading.Event()
+
+    @property
+    def active(self):
+        return self.status in ('queued', 'running')
+
+    @property
+    def joinable(self):
+        """Whether a session asking for the same view may use this build."""
+        if self.status == 'done':
+            return os.path.exists(self.path)
+        return self.active and not self._cancel_requested.is_set()
+
+    def cancel(self):
+        """Ask the build to stop at the next sheet or chunk; a queued build never starts."""
+        self._cancel_requested.set()
+        if self.future is not None and self.future.cancel():
+            self._finish('cancelled')
+
+    def _check(self):
+        if self._cancel_requested.is_set():
+            raise ReportCancelled()
+
+    def _chunks(self, chunks):
+        for chunk in chunks:
+            self._check()
+            yield chunk
+
+    def _sheets(self, sheets):
+        sheets = list(sheets)
+        for i, (title, data) in enumerate(sheets):
+            self._check()
+            self.progress = i / len(sheets)
+            yield title, self._chunks(as_chunks(data))
+
+    def _finish(self, status, path=None, error=None):
+        self.path = path
+        self.error = error
+        self.finished_at = time.time()
+        self.status = status
+
+    def _run(self, sheets):
+        if self._cancel_requested.is_set():
+            self._finish('cancelled')
+            return
+        self.status = 'running'
+        try:
+            path = write_export(lambda: self._sheets(sheets()), "Excel", REPORT_FORMATS)
+        except ReportCancelled:
+            self._finish('cancelled')
+        except Exception as e:
+            self._finish('failed', error=e)
+        else:
+            with _lock:
+                self.progress = 1.0
+                self._finish('done', path=path)
+                # Released while the workbook was being saved
+                if self.sessions <= 0:
+                    _discard(self)
+
+
+class ReportLease:
+    """One session's hold on a report build.
+
+    ``release`` gives it up; a session that closes without releasing its
+    lease gives it up when its state, and the lease with it, is collected.
+    """
+
+    def __init__(self, job):
+        self.job = job
+        self._finalizer = weakref.finalize(self, _release, job)
+
+    def release(self):
+        """Give up the hold; calling it again does nothing."""
+        self._finalizer()
+
+
+def submit_report(key, sheets):
+    """Start building the report of the view ``key`` in the background, or join the build
+    already made for it, and return the caller's ReportLease on it. ``sheets`` is called on
+    the worker and returns the (title, table) pairs of the workbook (see report.report_sheets)."""
+    with _lock:
+        job = _jobs.get(key)
+        if job is None or not job.joinable:
+            job = ReportJob(key)
+            _jobs[key] = job
+            job.future = _executor.submit(job._run, sheets)
+        job.sessions += 1
+        return ReportLease(job)
+
+
+def _release(job):
+    with _lock:
+        job.sessions -= 1
+        if job.sessions <= 0:
+            _discard(job)
+
+
+def _discard(job):
+    # Caller holds _lock
+    if _jobs.get(job.key) is job:
+        del _jobs[job.key]
+    if job.active:
+        job.cancel()
+    elif job.path is not None and os.path.exists(job.path):
+        os.remove(job.path)
@@ -0,0 +1,149 @@
+"""Filter and aggregation results shared by every session of the app.
+
+Results are kept in one process-wide LRU cache whose size is measured in
+bytes (DataFrame.memory_usage(deep=True) for frames, sampled on long string
+columns), so the least recently used results are evicted once the byte
+budget is exceeded. Keys are built
+by ``result_key`` from the dataset hash and the filter selections, sorted
+and de-duplicated, so the order in which options were picked does not
+matter. A result that is being computed is not computed a second time by
+another session asking for it; that session waits for it instead.
+"""
+import sys
+import threading
+from concurrent.futures import Future
+
+import numpy as np
+import pandas as pd
+from cachetools import LRUCache
+
+RESULT_CACHE_MAX_BYTES = 1024 * 1024 ** 2
+# Longer object columns have their deep size estimated from this many rows
+SIZE_SAMPLE_ROWS = 100_000
+
+
+def canonical(values):
+    """A selection as a sorted tuple without duplicates; numpy scalars become Python values."""
+    return tuple(sorted({value.item() if isinstance(value, np.generic) else value for value in values}))
+
+
+def result_key(dataset_key, **selections):
+    """Cache key of a result over ``dataset_key`` for the given selections.
+
+    List-like selections are canonicalized; other values (grain, comparison
+    column) are used as they are.
+    """
+    return (dataset_key,) + tuple(
+        (name, canonical(value) if isinstance(value, (list, tuple, set)) else value)
+        for name, value in sorted(selections.items())
+    )
+
+
+def _column_nbytes(column):
+    # memory_usage(deep=True) of an object column sums the size of every element;
+    # on long columns it is measured on evenly spaced rows and scaled up
+    if column.dtype == object and len(column) > SIZE_SAMPLE_ROWS:
+        sample = column.iloc[::len(column) // SIZE_SAMPLE_ROWS]
+        return int(sample.memory_usage(deep=True, index=False) * len(column) / len(sample))
+    return int(column.memory_usage(deep=True, index=False))
+
+
+def _index_nbytes(index):
+    if index.dtype == object and len(index) > SIZE_SAMPLE_ROWS:
+        return _column_nbytes(index.to_series(index=pd.RangeIndex(len(index))))
+    return int(index.memory_usage(deep=True))
+
+
+def nbytes(value, _seen=None):
+    """Approximate memory held by a result: frames, arrays and the objects built from them."""
+    seen = set() if _seen is None else _seen
+    if id(value) in seen:
+        return 0
+    seen.add(id(value))
+
+    if isinstance(value, pd.DataFrame):
+        return _index_nbytes(value.index) + sum(_column_nbytes(value.iloc[:, i]) for i in range(value.shape[1]))
+    if isinstance(value, pd.Series):
+        return _index_nbytes(value.index) + _column_nbytes(value)
+    if isinstance(value, pd.Index):
+        return _index_nbytes(value)
+    if isinstance(value, np.ndarray):
+        return int(value.nbytes)
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(nbytes(k, seen) + nbytes(v, seen) for k, v in value.items())
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return sys.getsizeof(value) + sum(nbytes(item, seen) for item in value)
+    if hasattr(value, '__dict__') and not callable(value):
+        return sys.getsizeof(value) + nbytes(vars(value), seen)
+    return sys.getsizeof(value)
+
+
+class ResultCache:
+    """Thread-safe LRU cache of results with a byte budget and hit statistics."""
+
+    def __init__(self, max_bytes=RESULT_CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        # Entries are (size, result): sizes are measured before taking the lock
+        self._cache = LRUCache(maxsize=max_bytes, getsizeof=lambda entry: entry[0])
+        self._pending = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get_or_compute(self, key, compute):
+        """The cached result for ``key``, computing it with ``compute()`` on a miss."""
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry is not None:
+                self.hits += 1
+                return entry[1]
+            pending = self._pending.get(key)
+            if pending is None:
+                self.misses += 1
+                self._pending[key] = future = Future()
+            else:
+                self.hits += 1
+        if pending is not None:
+            # Another session is computing the same result
+            return pending.result()
+
+        try:
+            value = compute()
+        except BaseException as e:
+            with self._lock:
+                del self._pending[key]
+            future.set_exception(e)
+            raise
+        size = nbytes(value)
+        with self._lock:
+            del self._pending[key]
+            # A result larger than the whole budget is returned but not kept
+            if size <= self.max_bytes:
+                before = len(self._cache)
+                self._cache[key] = (size, value)
+                self.evictions += before + 1 - len(self._cache)
+        future.set_result(value)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+
+    def stats(self):
+        """Hits, misses, hit rate, entries and bytes in use."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'evictions': self.evictions,
+                'entries': len(self._cache),
+                'bytes': self._cache.currsize,
+                'max_bytes': self.max_bytes,
+            }
+
+
+# The cache shared by all sessions
+RESULT_CACHE = ResultCache()
@@ -0,0 +1,312 @@
+"""Materialized rollups at month, quarter and year grain.
+
+The cleaned rows are summed once per (Grouping, Store, Group, Division,
+month) at ingest; that monthly rollup is what the dashboard filters. The
+quarter and year rollups are derived from the monthly one rather than from
+the rows, so switching grains is a lookup. Flow measures (sales, cost,
+margin, row counts) are summed into the coarser period; Stock Value is a
+level, so each key takes its value at the end of the period (its last
+month with data).
+
+Every period is identified by the Date of its first day. ``Period`` labels
+are only made for display and are ordered by that Date.
+
+Transaction-level uploads are rolled up to the same monthly frame while
+they are read, by MonthlyAccumulator.
+
+The rollups are kept in a compact layout (see compact): keys and month
+names as categoricals, the period Date as an int16 month number, small
+integers, and float32 for every measure whose values float32 holds
+exactly. pandas sums float32 in float32, so the filters hand out slices
+widened back to datetime64 Dates and float64 measures, and every total is
+the same as on the full-width frame.
+"""
+import numpy as np
+import pandas as pd
+
+GRAINS = ['Month', 'Quarter', 'Year']
+
+ROLLUP_KEYS = ['Grouping', 'Store Name', 'Group', 'Division']
+FLOW_MEASURES = ['Penjualan', 'HPP', 'Gross Margin', 'Rows']
+STOCK_MEASURE = 'Stock Value'
+
+_PERIOD_FREQ = {'Month': 'M', 'Quarter': 'Q', 'Year': 'Y'}
+
+# Compact layout: categorical columns (categories in sorted order, like the
+# groupby keys they replace) and integer columns with their narrow dtype
+CATEGORICAL_COLUMNS = ROLLUP_KEYS + ['Month']
+INTEGER_DTYPES = {'year': np.int16, 'Rows': np.int32}
+MEASURES = ['Penjualan', 'HPP', 'Gross Margin', STOCK_MEASURE]
+# Compact period Dates: months since January 1970, numpy's datetime64[M] epoch
+MONTH_NUMBER_DTYPE = np.int16
+
+
+def month_numbers(dates):
+    """The compact form of period start ``dates``: their months since January 1970, as int16."""
+    return np.asarray(dates, dtype='datetime64[M]').astype(np.int64).astype(MONTH_NUMBER_DTYPE)
+
+
+def month_dates(numbers):
+    """The period start Dates (datetime64[ns]) of compact month ``numbers``."""
+    return np.asarray(numbers, dtype=np.int64).astype('datetime64[M]').astype('datetime64[ns]')
+
+
+def period_dates(frame):
+    """The Date column of ``frame`` as datetime64[ns] values, in either layout."""
+    dates = frame['Date'].to_numpy()
+    return month_dates(dates) if np.issubdtype(dates.dtype, np.integer) else dates
+
+
+def period_label(date, grain):
+    """Display label of the period starting at ``date``: 'Jan 2024', 'Q1 2024' or '2024'."""
+    if grain == 'Month':
+        return date.strftime('%b %Y')
+    if grain == 'Quarter':
+        return f"Q{(date.month - 1) // 3 + 1} {date.year}"
+    return str(date.year)
+
+
+def period_labels(dates, grain):
+    return [period_label(date, grain) for date in pd.DatetimeIndex(dates)]
+
+
+def with_period(frame, grain):
+    """``frame`` with a 'Period' label column, as a categorical ordered by Date."""
+    dates = frame['Date'].drop_duplicates().sort_values()
+    frame = frame.copy()
+    frame['Period'] = pd.Categorical(
+        frame['Date'].map(dict(zip(dates, period_labels(dates, grain)))),
+        categories=period_labels(dates, grain),
+        ordered=True
+    )
+    return frame
+
+
+def monthly_rollup(rows):
+    """Sum the cleaned rows per key and month. ``Rows`` counts the rows summed."""
+    monthly = rows.assign(Rows=1).groupby(ROLLUP_KEYS + ['Date'], sort=False, observed=True)[
+        FLOW_MEASURES + [STOCK_MEASURE]].sum().reset_index()
+    monthly['year'] = monthly['Date'].dt.year.astype(int)
+    monthly['Month'] = monthly['Date'].dt.month_name()
+    return monthly.sort_values('Date', kind='stable').reset_index(drop=True)
+
+
+# Bits given to each key's code in the int64 cell key, followed by the month
+CELL_KEY_BITS = [('Grouping', 26), ('Store Name', 18), ('Group', 4), ('Division', 3)]
+MONTH_BITS = 12
+FIRST_MONTH = np.datetime64('1800-01', 'M')
+
+
+def _fold_cells(cells):
+    # Combine rows or partial sums of the same cell (equal 'key'): flow measures are
+    # summed, Stock Value is summed over the entries of the cell's latest 'day' only
+    ids, keys = pd.factorize(cells['key'])
+    n_cells = len(keys)
+    folded = {'key': keys}
+    for col in FLOW_MEASURES:
+        folded[col] = np.bincount(ids, weights=cells[col], minlength=n_cells)
+    folded['Rows'] = folded['Rows'].astype(np.int64)
+    folded['day'] = np.full(n_cells, np.iinfo(np.int64).min)
+    np.maximum.at(folded['day'], ids, cells['day'])
+    at_latest_day = cells['day'] == folded['day'][ids]
+    folded[STOCK_MEASURE] = np.bincount(ids[at_latest_day], weights=cells[STOCK_MEASURE][at_latest_day],
+                                        minlength=n_cells)
+    return folded
+
+
+class MonthlyAccumulator:
+    """Running monthly rollup of cleaned rows with daily dates, fed a chunk at a time.
+
+    This is a hash aggregate: key values are replaced by integer codes as
+    they arrive, packed with the month into one int64 per (key, month) cell,
+    and each chunk is folded into partial sums per cell with np.bincount.
+    The partials are folded into the running totals once they outnumber
+    them, so memory is bounded by the number of distinct cells, not rows.
+    Stock Value is a level: a cell takes the total of the rows on its latest
+    date. For rows that are already monthly the result is the same as
+    monthly_rollup.
+    """
+
+    def __init__(self):
+        self._keys = {col: pd.Index([], dtype=object) for col, _ in CELL_KEY_BITS}
+        self._totals = None
+        self._partials = []
+        self._partial_cells = 0
+        self.rows = 0
+
+    def _codes(self, col, values):
+        # Code of each value in the key's index, growing the index with values seen for the first time
+        index = self._keys[col]
+        codes = index.get_indexer(values)
+        unseen = codes < 0
+        if unseen.any():
+            index = self._keys[col] = index.append(pd.Index(pd.unique(values[unseen]), dtype=object))
+            codes = index.get_indexer(values)
+        return codes.astype(np.int64)
+
+    def _cell_keys(self, rows):
+        key = np.zeros(len(rows), dtype=np.int64)
+        for col, bits in CELL_KEY_BITS:
+            codes = self._codes(col, rows[col].to_numpy())
+            if len(self._keys[col]) > 1 << bits:
+                raise ValueError(f"Too many distinct {col} values to roll up (at most {1 << bits:,}).")
+            key = (key << bits) | codes
+        months = (rows['Date'].to_numpy().astype('datetime64[M]') - FIRST_MONTH).astype(np.int64)
+        if len(months) and (months.min() < 0 or months.max() >= 1 << MONTH_BITS):
+            raise ValueError("Dates must fall between 1800 and 2141.")
+        return (key << MONTH_BITS) | months
+
+    def add(self, rows):
+        # Rows without a key value are left out, as groupby does in monthly_rollup
+        rows = rows.dropna(subset=[col for col, _ in CELL_KEY_BITS])
+        if rows.empty:
+            return
+        cells = {'key': self._cell_keys(rows), 'day': rows['Date'].to_numpy().astype(np.int64),
+                 'Rows': np.ones(len(rows))}
+        for col in FLOW_MEASURES[:-1] + [STOCK_MEASURE]:
+            cells[col] = rows[col].to_numpy(dtype=np.float64)
+
+        partial = _fold_cells(cells)
+        self.rows += len(rows)
+        self._partials.append(partial)
+        self._partial_cells += len(partial['key'])
+        if self._totals is None or self._partial_cells > len(self._totals['key']):
+            self._fold()
+
+    def _fold(self):
+        parts = ([] if self._totals is None else [self._totals]) + self._partials
+        self._totals = _fold_cells({col: np.concatenate([part[col] for part in parts]) for col in parts[0]})
+        self._partials = []
+        self._partial_cells = 0
+
+    def result(self):
+        """The monthly rollup of every row added, like monthly_rollup(rows)."""
+        if self._partials:
+            self._fold()
+        if self._totals is None:
+            raise ValueError("No rows were added.")
+
+        # Unpack the cell keys, last part first
+        key = self._totals['key']
+        months = key & ((1 << MONTH_BITS) - 1)
+        key = key >> MONTH_BITS
+        monthly = {}
+        for col, bits in reversed(CELL_KEY_BITS):
+            monthly[col] = self._keys[col].take(key & ((1 << bits) - 1)).to_numpy()
+            key = key >> bits
+        monthly = pd.DataFrame({col: monthly[col] for col in ROLLUP_KEYS})
+        monthly['Date'] = (FIRST_MONTH + months).astype('datetime64[ns]')
+        for col in FLOW_MEASURES + [STOCK_MEASURE]:
+            monthly[col] = self._totals[col]
+        monthly['year'] = monthly['Date'].dt.year.astype(int)
+        monthly['Month'] = monthly['Date'].dt.month_name()
+        return monthly.sort_values('Date', kind='stable').reset_index(drop=True)
+
+
+def coarsen(monthly, grain):
+    """Roll a monthly rollup (or a filtered slice of one) up to ``grain``."""
+    if grain == 'Month':
+        return monthly
+    period = monthly['Date'].dt.to_period(_PERIOD_FREQ[grain]).dt.start_time
+    # Rows are in Date order, so the last Stock Value per key is the end-of-period level
+    grouped = monthly.assign(Date=period).groupby(ROLLUP_KEYS + ['Date'], sort=False, observed=True)
+    result = grouped[FLOW_MEASURES].sum()
+    result[STOCK_MEASURE] = grouped[STOCK_MEASURE].last()
+    result = result.reset_index()
+    result['year'] = result['Date'].dt.year.astype(int)
+    return result.sort_values('Date', kind='stable').reset_index(drop=True)
+
+
+def compact(frame):
+    """``frame`` in the compact in-memory layout.
+
+    Keys and month names become categoricals, the period Date its month
+    number (see month_numbers), year and Rows narrow integers, and a measure
+    becomes float32 when every one of its values round-trips through
+    float32 unchanged (whole amounts under 2**24, for instance); other
+    measures stay float64.
+    """
+    frame = frame.copy()
+    frame['Date'] = month_numbers(frame['Date'].to_numpy())
+    for col in CATEGORICAL_COLUMNS:
+        if col in frame.columns:
+            frame[col] = frame[col].astype('category')
+    for col, dtype in INTEGER_DTYPES.items():
+        if col in frame.columns and np.iinfo(dtype).min <= frame[col].min() <= frame[col].max() <= np.iinfo(dtype).max:
+            frame[col] = frame[col].astype(dtype)
+    for col in MEASURES:
+        values = frame[col].to_numpy(dtype=np.float64)
+        narrow = values.astype(np.float32)
+        if np.array_equal(narrow, values, equal_nan=True):
+            frame[col] = narrow
+    return frame
+
+
+def widen(frame):
+    """Copy of a slice of a compact rollup with datetime64 Dates, float64 measures and int64 Rows
+    again, for summing."""
+    widths = {**{col: np.float64 for col in MEASURES}, 'Rows': np.int64}
+    frame = frame.astype({col: dtype for col, dtype in widths.items() if col in frame.columns})
+    if 'Date' in frame.columns:
+        frame['Date'] = period_dates(frame)
+    return frame
+
+
+class Rollups:
+    """The monthly rollup of a dataset and the coarser grains derived from it.
+
+    The grains are derived at full width and stored compact (see compact);
+    read them through the filters, which widen the measures again. Every
+    grain is clustered by Date, with the row offset where each period
+    starts, so a date range is a slice of rows (see between).
+    """
+
+    def __init__(self, monthly, compact_layout=True):
+        self.frames = {grain: coarsen(monthly, grain) for grain in GRAINS}
+        if compact_layout:
+            self.frames = {grain: compact(frame) for grain, frame in self.frames.items()}
+
+        # The rows of period i of a grain are offsets[i]:offsets[i + 1]
+        self.periods = {}
+        self.offsets = {}
+        for grain, frame in self.frames.items():
+            dates = period_dates(frame)
+            periods = np.unique(dates)
+            self.periods[grain] = pd.DatetimeIndex(periods)
+            self.offsets[grain] = np.append(np.searchsorted(dates, periods), len(dates))
+
+    @classmethod
+    def from_rows(cls, rows, compact_layout=True):
+        return cls(monthly_rollup(rows), compact_layout)
+
+    @property
+    def monthly(self):
+        return self.frames['Month']
+
+    def at(self, grain):
+        return self.frames[grain]
+
+    def _positions(self, grain, start, end):
+        # Positions of the first and past the last period of ``grain`` from ``start`` to ``end``;
+        # a period counts from its first day, so a start inside a period includes it
+        periods = self.periods[grain]
+        first = 0 if start is None else periods.searchsorted(
+            pd.Timestamp(start).to_period(_PERIOD_FREQ[grain]).start_time, side='left')
+        last = len(periods) if end is None else periods.searchsorted(end, side='right')
+        return first, max(first, last)
+
+    def splits_periods(self, grain, start=None, end=None):
+        """Whether the months from ``start`` to ``end`` leave out months with data of a period of
+        ``grain`` they include, so that the materialized rollup of ``grain`` does not apply."""
+        first, last = self._positions('Month', start, end)
+        if grain == 'Month' or first == last:
+            return False
+        periods = self.periods['Month'].to_period(_PERIOD_FREQ[grain])
+        return bool((first > 0 and periods[first - 1] == periods[first])
+                    or (last < len(periods) and periods[last - 1] == periods[last]))
+
+    def between(self, grain, start=None, end=None):
+        """Rows of ``grain`` for the periods from ``start`` to ``end`` (inclusive; None leaves an
+        end open), as a slice of the rollup rather than a copy."""
+        first, last = self._positions(grain, start, end)
+        return self.frames[grain].iloc[self.offsets[grain][first]:self.offsets[grain][last]]
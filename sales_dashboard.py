@@ -1,85 +1,198 @@
+import os
+import time
+
 import streamlit as st
 import pandas as pd
 import numpy as np
 import plotly.express as px
 from datetime import datetime
 
+import metrics
+from data_loader import UPLOAD_TYPES, MissingColumnsError
+from growth_kpis import GROWTH_KINDS, GrowthKPIs
+from anomalies import CHECKS, Z_THRESHOLD, find_anomalies
+from aggregations import (DASHBOARD_GRAPH, detail_page, detailed_gm_division, detailed_gm_store, group_sales_overview,
+                          group_sales_tables, grouping_trend, store_sales_table)
+from charts import (FACETS_PER_PAGE, facet_page, facet_pages, gm_by_division_chart, gm_by_store_chart,
+                    gm_growth_sparkline, group_sales_chart, grouping_comparison_chart, grouping_share_chart,
+                    sales_trend_chart, stock_chart, store_comparison_chart, top_stores)
+from filters import general_rows, grouping_rows, months_in_selection
+from forecasting import HORIZON, BatchForecast, MonthGapError
+from group_sums import group_sum
+from ingest_worker import submit_ingest
+from exports import render_export
+from paged_table import PagedTable, cached_table, render_paged_table
+from report import REPORT_FORMATS, report_sheets
+from report_worker import submit_report
+from result_cache import RESULT_CACHE, result_key
+from ranking import RANK_MEASURES, RANK_SCOPES, GroupingRanker
+from rollups import GRAINS, Rollups, period_labels
+from sales_dataset import DATASET_ENV, dataset_months, dataset_values, dataset_version, read_monthly
+
 # Set Streamlit page configuration
 st.set_page_config(layout="wide", page_title="Comprehensive Sales & Stock Dashboard")
 
+# Metrics are only recorded and exported when configured through the environment
+metrics.start()
+rerun_started = time.perf_counter()
+
 # Title of the Dashboard
 st.title("Comprehensive Sales & Stock Dashboard")
 
 # File uploader in the main area
-uploaded_file = st.file_uploader("Upload your Sales Data file (Excel format)", type=["xlsx"])
+uploaded_file = st.file_uploader("Upload your Sales Data file (Excel, CSV or Parquet)", type=UPLOAD_TYPES)
+
+
+@st.fragment(run_every=1.0)
+def show_ingest_progress(lease):
+    """Poll the background ingest job of ``lease`` until it finishes, then rerun the app."""
+    job = lease.job
+    if not job.active:
+        st.rerun()
+    st.progress(job.progress, text=f"Loading and processing {job.name}... {job.progress:.0%}")
+    if st.button("Cancel loading", key="cancel_ingest"):
+        lease.cancel()
+        st.rerun()
+
+
+@st.fragment(run_every=1.0)
+def show_report_progress(job):
+    """Poll a background report build until it finishes, then rerun the app."""
+    if not job.active:
+        st.rerun()
+    st.button(f"Preparing full report... {job.progress:.0%}", icon=":material/download:", disabled=True,
+              key="report_preparing")
+
+
+def render_report_download(report_key, sheets, file_name):
+    """The full report of the view ``report_key``: a "Prepare full report" button that starts
+    building ``sheets`` in the background (see report_worker), then the download of the built
+    file. The session's hold on the build of another view is released."""
+    lease = st.session_state.get('report_lease')
+    if lease is not None and (lease.job.key != report_key or lease.job.status == 'cancelled'):
+        lease.release()
+        lease = st.session_state['report_lease'] = None
+
+    if lease is not None and lease.job.active:
+        show_report_progress(lease.job)
+        return
+    if lease is not None and lease.job.status == 'done':
+        suffix, mime, _ = REPORT_FORMATS["Excel"]
+        try:
+            with open(lease.job.path, "rb") as report_file:
+                st.download_button(
+                    f"Download full report ({os.path.getsize(lease.job.path) / 1024:,.0f} KB)",
+                    data=report_file,
+                    file_name=f"{file_name}{suffix}",
+                    mime=mime,
+                    icon=":material/download:",
+                    key="report_download",
+                    on_click="ignore"
+                )
+            return
+        except FileNotFoundError:
+            # Pruned with the other old exports; offer to build it again
+            pass
+    elif lease is not None and lease.job.status == 'failed':
+        st.error(f"The full report could not be built: {lease.job.error}")
+
+    if st.button("Prepare full report", icon=":material/download:", key="report_prepare"):
+        if lease is not None:
+            lease.release()
+        st.session_state['report_lease'] = submit_report(report_key, sheets)
+        st.rerun()
+
+
+def facet_page_number(data, key):
+    """The page of Grouping facets of ``data`` picked under ``key``, from 1."""
+    n_pages = facet_pages(data)
+    if n_pages > 1:
+        return int(st.number_input(f"Page of {FACETS_PER_PAGE} Grouping (1-{n_pages}):", min_value=1,
+                                   max_value=n_pages, value=1, step=1, key=key))
+    return 1
+
+
+def select_facet_page(data, key):
+    """The Grouping facets of ``data`` on the page picked under ``key``, with the smaller stores
+    summed into one."""
+    return top_stores(facet_page(data, facet_page_number(data, key) - 1))
+
+
+ingest_lease = st.session_state.get('ingest_lease')
+if uploaded_file is None:
+    # Forget the previous dataset when the file is removed
+    if ingest_lease is not None:
+        ingest_lease.release()
+    for state_key in ('ingest_file_id', 'ingest_lease', 'dataset_key', 'rollups'):
+        st.session_state.pop(state_key, None)
+elif st.session_state.get('ingest_file_id') != uploaded_file.file_id:
+    # Parse in the background; identical content joins the job already running
+    if ingest_lease is not None:
+        ingest_lease.release()
+    st.session_state['ingest_file_id'] = uploaded_file.file_id
+    st.session_state['ingest_lease'] = submit_ingest(uploaded_file)
+
+ingest_lease = st.session_state.get('ingest_lease')
+ingest_job = ingest_lease.job if ingest_lease is not None else None
+if ingest_job is not None:
+    if ingest_lease.cancelled or ingest_job.status == 'cancelled':
+        st.warning(f"Loading {ingest_job.name} was cancelled.")
+        if st.button("Retry loading", key="retry_ingest"):
+            st.session_state['ingest_lease'] = submit_ingest(uploaded_file)
+            st.rerun()
+    elif ingest_job.status == 'done':
+        if st.session_state.get('dataset_key') != ingest_job.key:
+            st.session_state['dataset_key'] = ingest_job.key
+            st.session_state['rollups'] = ingest_job.result
+        st.success('Data loaded and processed successfully!')
+    elif ingest_job.active:
+        # Previously loaded results stay usable below while the new file loads
+        show_ingest_progress(ingest_lease)
+    else:
+        if isinstance(ingest_job.error, MissingColumnsError):
+            st.error(str(ingest_job.error))
+        else:
+            st.error(f"An error occurred while processing the file: {ingest_job.error}")
 
-if uploaded_file is not None:
-    try:
-        # Load and process data
-        with st.spinner('Loading and processing data...'):
-            # Read the Excel file and load the first sheet automatically
-            excel_data = pd.ExcelFile(uploaded_file)
-            first_sheet = excel_data.sheet_names[0]
-            raw_data = pd.read_excel(uploaded_file, sheet_name=first_sheet)
-
-            # Define required columns
-            required_cols = ["Grouping", "Penjualan", "HPP", "Gross Margin", "Store Name", "Month", "year", "Stock Value"]
-            raw_data.columns = raw_data.columns.str.strip()  # Remove any leading/trailing spaces
-
-            # Check for required columns (case-insensitive)
-            raw_data_lower = raw_data.columns.str.lower()
-            required_cols_lower = [col.lower() for col in required_cols]
-            if not all(col in raw_data_lower for col in required_cols_lower):
-                st.error(f"The uploaded sheet must contain the following columns: {required_cols}")
-            else:
-                # Rename columns to standard names (case-insensitive)
-                rename_dict = {col.lower(): col for col in raw_data.columns}
-                raw_data.rename(columns=rename_dict, inplace=True)
-
-                # Convert numeric columns
-                numeric_cols = ["Penjualan", "HPP", "Gross Margin", "Stock Value"]
-                for col in numeric_cols:
-                    # Remove thousand separators '.' and replace decimal ',' with '.' if necessary
-                    raw_data[col] = raw_data[col].astype(str).str.replace('.', '', regex=False).str.replace(',', '.', regex=False)
-                    raw_data[col] = pd.to_numeric(raw_data[col], errors='coerce')
-
-                # Drop rows with invalid numeric values
-                raw_data.dropna(subset=numeric_cols, inplace=True)
-
-                # Calculate Margin %
-                raw_data['Margin %'] = (raw_data['Gross Margin'] / raw_data['Penjualan']) * 100
-
-                # Create a Date column
-                try:
-                    raw_data['Date'] = pd.to_datetime(raw_data['year'].astype(int).astype(str) + '-' + raw_data['Month'],
-                                                     format='%Y-%B', errors='coerce')
-                    # If parsing failed (all NaT), try abbreviated month names
-                    if raw_data['Date'].isna().all():
-                        raw_data['Date'] = pd.to_datetime(raw_data['year'].astype(int).astype(str) + '-' + raw_data['Month'],
-                                                         format='%Y-%b', errors='coerce')
-                except Exception as e:
-                    st.error(f"Error parsing dates: {e}")
-                    raw_data['Date'] = pd.NaT
-
-                # Drop rows with invalid Date
-                raw_data.dropna(subset=['Date'], inplace=True)
-
-                # Sort raw_data by Date
-                raw_data.sort_values('Date', inplace=True)
-
-                # If a Group column isn't present, derive it (e.g., first 3 chars of Grouping)
-                if 'Group' not in raw_data.columns:
-                    raw_data['Group'] = raw_data['Grouping'].astype(str).str[:3].str.upper()
-
-                # Combine GRC and FRS into GRC+FRS
-                # raw_data['Group'] = raw_data['Group'].replace({'GRC': 'GRC+FRS', 'FRS': 'GRC+FRS'})
-                # Filter only GRC+FRS and BZR
-                raw_data = raw_data[raw_data['Group'].isin(['GRC', 'FRS', 'BZR'])]
-
-                # Create a Month_Display column
-                raw_data['Month_Display'] = raw_data['Date'].dt.strftime('%b %Y')
+rollups = st.session_state.get('rollups')
+dataset_key = st.session_state.get('dataset_key')
+# Without an upload, the Parquet dataset named by SALES_DASHBOARD_DATASET is shown instead
+dataset_root = os.environ.get(DATASET_ENV) if rollups is None and ingest_job is None else None
 
-        st.success('Data loaded and processed successfully!')
+if rollups is not None or dataset_root:
+    try:
+        time_grain = st.sidebar.radio(
+            "Time grain:",
+            options=GRAINS,
+            horizontal=True,
+            key='time_grain',
+            help="Period used by the tables and charts over time. Stock Value is taken at the end of each period."
+        )
+
+        # Date range: a contiguous span of months, applied before the other filters; None
+        # leaves an end open, so the full span shares its results with the default view
+        date_range = (None, None)
+        months_loaded = rollups.periods['Month'] if rollups is not None else dataset_months(dataset_root)
+        if len(months_loaded) > 1:
+            month_labels = period_labels(months_loaded, 'Month')
+            start, end = st.sidebar.select_slider(
+                "Date range:",
+                options=month_labels,
+                value=(month_labels[0], month_labels[-1]),
+                help="First and last month to include."
+            )
+            start, end = month_labels.index(start), month_labels.index(end)
+            date_range = (None if start == 0 else months_loaded[start],
+                          None if end == len(months_loaded) - 1 else months_loaded[end])
+
+        if rollups is None:
+            # The filter options come from the dataset's key columns; its rows are read once selected
+            dataset_key = ('dataset', dataset_root, dataset_version(dataset_root))
+            filter_values = RESULT_CACHE.get_or_compute(('dataset_values', dataset_key),
+                                                        lambda: dataset_values(dataset_root))
+        else:
+            # The dashboard filters the monthly rollup; coarser grains come from the rollups too
+            filter_values = rollups.monthly
 
         # Sidebar Filters
         st.sidebar.header("Filters")
@@ -87,21 +200,21 @@ if uploaded_file is not None:
             # Divisions Filter (Now only GRC+FRS and BZR)
             selected_groups = st.multiselect(
                 "Select Divisions (GRC+FRS, BZR):",
-                options=sorted(raw_data['Group'].unique()),
-                default=sorted(raw_data['Group'].unique()),
+                options=sorted(filter_values['Group'].unique()),
+                default=sorted(filter_values['Group'].unique()),
                 help="Choose one or more divisions to filter the sales data accordingly."
             )
 
             # Years Filter
             selected_years = st.multiselect(
                 "Select Years:",
-                options=sorted(raw_data['year'].unique()),
-                default=sorted(raw_data['year'].unique()),
+                options=sorted(filter_values['year'].unique()),
+                default=sorted(filter_values['year'].unique()),
                 help="Select the years you want to include in the analysis."
             )
 
             # Months Filter
-            unique_months = sorted(raw_data['Month'].dropna().unique(), key=lambda x: datetime.strptime(x, '%B').month)
+            unique_months = sorted(filter_values['Month'].dropna().unique(), key=lambda x: datetime.strptime(x, '%B').month)
             selected_months = st.multiselect(
                 "Select Months:",
                 options=unique_months,
@@ -112,13 +225,24 @@ if uploaded_file is not None:
             # Stores Filter
             selected_stores = st.multiselect(
                 "Select Stores:",
-                options=sorted(raw_data['Store Name'].unique()),
-                default=sorted(raw_data['Store Name'].unique()),
+                options=sorted(filter_values['Store Name'].unique()),
+                default=sorted(filter_values['Store Name'].unique()),
                 help="Choose the stores you want to include in the dashboard."
             )
 
+        if rollups is None:
+            # Only the month partitions of the date range, years and months are read, and of those
+            # only the row groups of the selected stores. The divisions are filtered in memory:
+            # the Grouping tabs compare Grouping of every division.
+            rollups = RESULT_CACHE.get_or_compute(
+                ('dataset_rollups', result_key(dataset_key, years=selected_years, months=selected_months,
+                                               stores=selected_stores, start=date_range[0], end=date_range[1])),
+                lambda: Rollups(read_monthly(dataset_root, *date_range, years=selected_years, months=selected_months,
+                                             stores=selected_stores))
+            )
+
         with st.sidebar.expander("Grouping Filters", expanded=True):
-            unique_categories = sorted(raw_data['Grouping'].unique())
+            unique_categories = sorted(filter_values['Grouping'].unique())
             default_cat = [unique_categories[0]] if unique_categories else []
             selected_categories = st.multiselect(
                 "Search and Compare Grouping:",
@@ -127,54 +251,90 @@ if uploaded_file is not None:
                 help="Select one or more 'Grouping' categories to compare their sales performance."
             )
 
-        # Apply General Filters
-        filtered_data = raw_data[
-            (raw_data['Group'].isin(selected_groups)) &
-            (raw_data['year'].isin(selected_years)) &
-            (raw_data['Month'].isin(selected_months)) &
-            (raw_data['Store Name'].isin(selected_stores))
-        ].copy()
-
-        # Sort filtered_data by Date
-        filtered_data.sort_values('Date', inplace=True)
-
-        # Apply Grouping Filters
-        kelompok_data = raw_data[
-            (raw_data['Grouping'].isin(selected_categories)) &
-            (raw_data['year'].isin(selected_years)) &
-            (raw_data['Month'].isin(selected_months)) &
-            (raw_data['Store Name'].isin(selected_stores))
-        ].copy()
-
-        # Sort kelompok_data by Date
-        kelompok_data.sort_values('Date', inplace=True)
+        # Identifies the loaded dataset and general filter selection, in any order of selection;
+        # results are shared through RESULT_CACHE by every session asking for the same ones
+        filter_signature = result_key(
+            dataset_key,
+            groups=selected_groups, years=selected_years, months=selected_months, stores=selected_stores,
+            start=date_range[0], end=date_range[1]
+        )
+        # Tables over time also depend on the grain
+        view_signature = filter_signature + (('grain', time_grain),)
+        # The Grouping tabs use the selected Grouping instead of the divisions
+        grouping_signature = result_key(
+            dataset_key,
+            categories=selected_categories, years=selected_years, months=selected_months, stores=selected_stores,
+            start=date_range[0], end=date_range[1], grain=time_grain
+        )
+
+        filtered_data, grain_data = RESULT_CACHE.get_or_compute(
+            ('general_rows', view_signature),
+            lambda: general_rows(rollups, selected_groups, selected_years, selected_months, selected_stores, time_grain,
+                                 date_range)
+        )
+        kelompok_data = RESULT_CACHE.get_or_compute(
+            ('grouping_rows', grouping_signature),
+            lambda: grouping_rows(rollups, selected_categories, selected_years, selected_months, selected_stores,
+                                  time_grain, date_range)
+        )
+        # Forecasts are made from the selected months, which have to be consecutive
+        forecast_months = months_in_selection(rollups, selected_years, selected_months, date_range)
 
         if filtered_data.empty:
             st.warning("No data available after applying the selected filters.")
         else:
-            # Aggregations
-            group_sales = filtered_data.groupby(['Group', 'Date'])['Penjualan'].sum().reset_index()
-            store_comparison = filtered_data.groupby(['Date', 'Store Name'])['Penjualan'].sum().reset_index()
-
-            # Sort by date
-            group_sales.sort_values('Date', inplace=True)
-            store_comparison.sort_values('Date', inplace=True)
-
-            # Add Month_Display for aggregated data
-            group_sales['Month_Display'] = group_sales['Date'].dt.strftime('%b %Y')
-            store_comparison['Month_Display'] = store_comparison['Date'].dt.strftime('%b %Y')
-
-            if not kelompok_data.empty:
-                kelompok_data['Date'] = pd.to_datetime(kelompok_data['Date'], errors='coerce')
-                kelompok_data.dropna(subset=['Date'], inplace=True)
-                kelompok_data.sort_values('Date', inplace=True)
-                kelompok_data['Month_Display'] = kelompok_data['Date'].dt.strftime('%b %Y')
-
-            # Define a colorblind-friendly palette
-            color_palette = px.colors.qualitative.Safe
+            # Aggregations: independent ones run concurrently on the task graph's thread pool
+            comparison_basis = st.session_state.get('comparison_basis', "Division")
+            comparison_col = (
+                "Division" if comparison_basis == "Division"
+                else "Store Name" if comparison_basis == "Store"
+                else "Grouping"
+            )
+            aggregates = RESULT_CACHE.get_or_compute(('aggregates', view_signature, comparison_col),
+                                                     lambda: DASHBOARD_GRAPH.run({
+                                                         'filtered_data': filtered_data,
+                                                         'grain_data': grain_data,
+                                                         'grain': time_grain,
+                                                         'comparison_col': comparison_col
+                                                     }))
+            group_sales = aggregates['group_sales']
+            store_comparison = aggregates['store_comparison']
+
+            # The ranker and growth series only depend on the general filters, so they (and the
+            # answers they have already worked out) are reused until one of them changes
+            grouping_ranker = RESULT_CACHE.get_or_compute(('grouping_ranker', filter_signature),
+                                                          lambda: GroupingRanker(filtered_data))
+            growth_kpis = RESULT_CACHE.get_or_compute(('growth_kpis', filter_signature),
+                                                      lambda: GrowthKPIs(filtered_data))
+
+            with st.sidebar.expander("Profiling", expanded=False):
+                st.caption(f"Aggregations: {aggregates.wall_time * 1000:,.0f} ms wall time, "
+                           f"{aggregates.busy_time * 1000:,.0f} ms total task time (when last computed)")
+                cache_stats = RESULT_CACHE.stats()
+                st.caption(f"Result cache: {cache_stats['hit_rate']:.0%} hits "
+                           f"({cache_stats['hits']:,} of {cache_stats['hits'] + cache_stats['misses']:,}), "
+                           f"{cache_stats['entries']:,} results in "
+                           f"{cache_stats['bytes'] / 1024 ** 2:,.0f} of {cache_stats['max_bytes'] / 1024 ** 2:,.0f} MB, "
+                           f"{cache_stats['evictions']:,} evicted")
+                if st.checkbox("Show aggregation timeline", value=False, key='show_timeline'):
+                    timeline = pd.DataFrame(aggregates.timeline)
+                    timeline['Start (ms)'] = timeline['start'] * 1000
+                    timeline['Duration (ms)'] = (timeline['end'] - timeline['start']) * 1000
+                    timeline_chart = px.bar(
+                        timeline,
+                        x='Duration (ms)',
+                        y='name',
+                        base='Start (ms)',
+                        color='thread',
+                        orientation='h',
+                        labels={'name': 'Task', 'thread': 'Thread'},
+                        color_discrete_sequence=px.colors.qualitative.Safe
+                    )
+                    timeline_chart.update_layout(xaxis_title='Time since start (ms)', yaxis_title='', height=400)
+                    st.plotly_chart(timeline_chart, use_container_width=True)
 
             # Create Tabs
-            tab1, tab2, tab3, tab4, tab5, tab6, tab7, tab8, tab9 = st.tabs([
+            tab1, tab2, tab3, tab4, tab5, tab6, tab7, tab8, tab9, tab10 = st.tabs([
                 "Group Sales Overview",
                 "Store Comparison",
                 "Detailed View per Category",
@@ -183,11 +343,12 @@ if uploaded_file is not None:
                 "Sales Trend",
                 "Top/Bottom Performers",
                 "Gross Margin Analysis",
-                "Stock Value Analysis"
+                "Stock Value Analysis",
+                "Anomalies"
             ])
 
             # -------------------- 1. Group Sales Overview (Tab 1) --------------------
-            with tab1:
+            with tab1, metrics.timed('sales_dashboard_tab_seconds', tab="Group Sales Overview"):
                 st.header("Detailed Group Sales by Month")
                 st.markdown("""
                     This section provides a detailed overview of sales by group for each month.
@@ -198,32 +359,9 @@ if uploaded_file is not None:
                 if group_sales.empty:
                     st.write("No Group Sales data available.")
                 else:
-                    # Create a pivot table for group sales
-                    group_sales_table = group_sales.pivot_table(
-                        values="Penjualan",
-                        index="Group",
-                        columns="Month_Display",
-                        aggfunc="sum",
-                        fill_value=0
-                    )
-
-                    # Ensure columns are ordered chronologically
-                    group_sales_table = group_sales_table.reindex(
-                        sorted(group_sales_table.columns, key=lambda x: datetime.strptime(x, '%b %Y')),
-                        axis=1
-                    )
-
-                    # Calculate differences
-                    group_sales_diff = group_sales_table.diff(axis=1)
-
-                    # Compute total row
-                    total_sales_row = group_sales_table.sum(axis=0)
-                    total_sales_row.name = 'Grand Total'
-                    group_sales_table_with_total = pd.concat([group_sales_table, total_sales_row.to_frame().T])
-
-                    total_diff_row = group_sales_diff.sum(axis=0)
-                    total_diff_row.name = 'Grand Total'
-                    group_sales_diff_with_total = pd.concat([group_sales_diff, total_diff_row.to_frame().T])
+                    # Sales per Group by period, with Grand Total rows, and the differences
+                    group_sales_table, group_sales_table_with_total, group_sales_diff_with_total = \
+                        group_sales_tables(group_sales, time_grain)
 
                     show_percentage = st.checkbox("Show Percentage Differences", value=False, key='group_pct')
                     show_contribution = st.checkbox("Show Contribution to Grand Total", value=False,
@@ -251,6 +389,7 @@ if uploaded_file is not None:
                         })
 
                         st.dataframe(group_contribution_style)
+                        group_sales_export = group_contribution
 
                     elif show_percentage:
                         # Percentage change
@@ -275,6 +414,8 @@ if uploaded_file is not None:
                             f"{col[0]}_{col[1]}" if col[0] != 'Group' else 'Group' for col in
                             group_sales_combined.columns
                         ]
+                        # Exports keep the numbers, not the display strings
+                        group_sales_export = group_sales_combined.copy()
 
 
                         def format_percentage_with_arrows(val):
@@ -302,90 +443,41 @@ if uploaded_file is not None:
                         st.dataframe(group_sales_combined)
 
                     else:
-                        group_sales_combined = pd.concat(
-                            [group_sales_table_with_total, group_sales_diff_with_total],
-                            keys=["Sales", "Difference"],
-                            axis=1
-                        )
-
-                        group_sales_combined.columns.names = ['Type', 'Month']
-                        group_sales_combined.reset_index(inplace=True)
-
-                        group_sales_combined.columns = [
-                            f"{col[0]}_{col[1]}" if col[0] != 'Group' else 'Group' for col in
-                            group_sales_combined.columns
-                        ]
-
-                        group_sales_combined.fillna(0, inplace=True)
+                        group_sales_combined = group_sales_overview(group_sales_table_with_total,
+                                                                    group_sales_diff_with_total)
+                        # Exports keep the numbers, not the display strings
+                        group_sales_export = group_sales_combined.copy()
                         for col in group_sales_combined.columns[1:]:
                             group_sales_combined[col] = group_sales_combined[col].apply(
                                 lambda x: f"{float(x):,.0f}" if x != 0 else x)
 
                         st.dataframe(group_sales_combined)
 
+                    render_export('group_sales', (view_signature, show_percentage, show_contribution),
+                                  group_sales_export, 'group_sales')
+
                     # Line chart for group sales
                     if not group_sales.empty:
-                        st.subheader("Total Sales by Group Over Months")
-                        line_data = group_sales.copy()
-                        line_data['Month_Display'] = pd.Categorical(
-                            line_data['Month_Display'],
-                            categories=sorted(line_data['Month_Display'].unique(),
-                                              key=lambda x: datetime.strptime(x, '%b %Y')),
-                            ordered=True
-                        )
-
-                        fig = px.line(
-                            line_data,
-                            x="Month_Display",
-                            y="Penjualan",
-                            color="Group",
-                            title="Total Sales by Group Over Months",
-                            labels={"Penjualan": "Total Sales", "Month_Display": "Month"},
-                            color_discrete_sequence=px.colors.qualitative.Safe
-                        )
-
-                        fig.update_traces(mode='lines+markers')
-                        fig.update_layout(
-                            xaxis_title='Month',
-                            yaxis_title='Total Sales',
-                            legend_title='Group',
-                            hovermode='x unified'
-                        )
-                        fig.update_traces(
-                            hovertemplate="Group: %{legendgroup}<br>Month: %{x}<br>Total Sales: %{y:,.0f}"
-                        )
+                        st.subheader("Total Sales by Group Over Time")
 
+                        fig = group_sales_chart(group_sales, time_grain)
+                        metrics.record_figure(fig, 'group_sales')
                         st.plotly_chart(fig, use_container_width=True)
 
             # -------------------- 2. Store Comparison (Tab 2) --------------------
-            with tab2:
+            with tab2, metrics.timed('sales_dashboard_tab_seconds', tab="Store Comparison"):
                 st.header("Month-to-Month Comparison Between Stores")
                 st.markdown("""
                     Compare sales performance across different stores on a monthly basis.
                     This visualization helps in identifying top-performing stores and tracking their growth.
                 """)
 
-                if store_comparison.empty or 'Month_Display' not in store_comparison.columns:
+                if store_comparison.empty or 'Period' not in store_comparison.columns:
                     st.write("No Store Comparison data available.")
                 else:
                     # Bar chart for store comparison
-                    fig_store = px.bar(
-                        store_comparison,
-                        x="Month_Display",
-                        y="Penjualan",
-                        color="Store Name",
-                        barmode="group",
-                        title="Store Sales Comparison",
-                        labels={"Penjualan": "Total Sales", "Month_Display": "Month"},
-                        color_discrete_sequence=px.colors.qualitative.Safe
-                    )
-                    fig_store.update_traces(hovertemplate="Month: %{x}<br>Total Sales: %{y:,.0f}")
-                    fig_store.update_layout(
-                        xaxis_title='Month',
-                        yaxis_title='Total Sales',
-                        legend_title='Store Name',
-                        hovermode='x unified'
-                    )
+                    fig_store = store_comparison_chart(store_comparison, time_grain)
+                    metrics.record_figure(fig_store, 'store_comparison')
                     st.plotly_chart(fig_store, use_container_width=True)
 
                     # Checkbox to show the detailed data table
@@ -394,63 +486,7 @@ if uploaded_file is not None:
                     if show_table:
                         st.subheader("Detailed Data with Month-to-Month Changes")
 
-                        # Pivot table for sales by store and month
-                        pivot_store = store_comparison.pivot_table(
-                            values="Penjualan",
-                            index="Store Name",
-                            columns="Month_Display",
-                            aggfunc="sum",
-                            fill_value=0
-                        )
-
-                        # Ensure columns are ordered chronologically
-                        pivot_store = pivot_store.reindex(
-                            sorted(pivot_store.columns, key=lambda x: datetime.strptime(x, '%b %Y')),
-                            axis=1
-                        )
-
-                        # Calculate month-to-month differences
-                        if len(pivot_store.columns) > 1:
-                            store_diff = pivot_store.diff(axis=1)
-                            include_difference = True
-                        else:
-                            store_diff = pd.DataFrame(index=pivot_store.index)
-                            include_difference = False
-
-                        # Add Grand Total row
-                        sales_total = pivot_store.sum(axis=0)
-                        pivot_store_with_total = pd.concat(
-                            [pivot_store, pd.DataFrame([sales_total], index=["Grand Total"])]
-                        )
-
-                        if include_difference:
-                            diff_total = store_diff.sum(axis=0)
-                            store_diff_with_total = pd.concat(
-                                [store_diff, pd.DataFrame([diff_total], index=["Grand Total"])]
-                            )
-
-                            # Combine sales and differences
-                            combined_store = pd.concat(
-                                [pivot_store_with_total, store_diff_with_total],
-                                keys=["Sales", "Difference"],
-                                axis=1
-                            )
-                        else:
-                            # If no differences, just display sales
-                            combined_store = pivot_store_with_total.copy()
-                            combined_store.columns = pd.MultiIndex.from_arrays(
-                                [["Sales"] * len(combined_store.columns), combined_store.columns],
-                                names=["Type", "Month"]
-                            )
-
-                        combined_store.columns.names = ['Type', 'Month']
-                        combined_store.reset_index(inplace=True)
-
-                        # Flatten MultiIndex columns
-                        combined_store.columns = [
-                            f"{col[0]}_{col[1]}" if col[0] != 'Store Name' else 'Store Name'
-                            for col in combined_store.columns
-                        ]
+                        combined_store = store_sales_table(store_comparison, time_grain)
 
                         # Use Styler to format numbers with thousand separators
                         format_dict = {
@@ -461,11 +497,12 @@ if uploaded_file is not None:
 
                         # Display the styled DataFrame
                         st.dataframe(combined_store_style)
+                        render_export('store_comparison', view_signature, combined_store, 'store_comparison')
 
 
 
             # -------------------- 3. Detailed View per Category (Tab 3) --------------------
-            with tab3:
+            with tab3, metrics.timed('sales_dashboard_tab_seconds', tab="Detailed View per Category"):
                 st.header("Month-to-Month Sales for All Grouping (Detailed View per Category)")
                 st.markdown("""
                     Dive deep into the sales data for each grouping across different stores and divisions.
@@ -475,146 +512,73 @@ if uploaded_file is not None:
                 if filtered_data.empty:
                     st.write("No data available for Detailed View per Category.")
                 else:
-                    # Pivot table for sales by Grouping, Store, and Group
-                    detail_pivot = filtered_data.pivot_table(
-                        values="Penjualan",
-                        index=["Grouping", "Store Name", "Group"],
-                        columns="Date",
-                        aggfunc="sum",
-                        fill_value=0
-                    )
-
-                    # Sort columns by date
-                    detail_pivot = detail_pivot.reindex(sorted(detail_pivot.columns), axis=1)
-
-                    # Convert columns back to Month_Display
-                    month_display_cols = [d.strftime('%b %Y') for d in detail_pivot.columns]
-                    detail_pivot.columns = month_display_cols
-
-                    # Check how many months we have
-                    if len(detail_pivot.columns) < 2:
-                        # Only one month, no change or pct change possible
-                        include_changes = False
-                        include_pct_changes = False
-                    else:
-                        # Calculate changes (value difference)
-                        detail_changes = detail_pivot.diff(axis=1)
-                        include_changes = not detail_changes.isna().all().all()
-
-                        # Calculate percent changes
-                        detail_pct_change = detail_pivot.pct_change(axis=1) * 100
-                        include_pct_changes = not detail_pct_change.isna().all().all()
-
-                    # Always include Sales
-                    keys = ["Sales"]
-                    all_dfs = [detail_pivot]
-
-                    if include_changes:
-                        all_dfs.append(detail_changes)
-                        keys.append("Change")
-                    if include_pct_changes:
-                        all_dfs.append(detail_pct_change)
-                        keys.append("Percent Change")
-
-                    detailed_combined_table = pd.concat(all_dfs, keys=keys, axis=1, names=['Type', 'Month'])
-                    detailed_combined_table.reset_index(inplace=True)
-
-                    # Flatten MultiIndex columns
-                    detailed_combined_table.columns = [
-                        '_'.join([str(i) for i in col if str(i) != '']).strip('_') if isinstance(col, tuple) else col
-                        for col in detailed_combined_table.columns.values
-                    ]
-
-                    # Calculate total sales for ranking
-                    sales_cols = [c for c in detailed_combined_table.columns if c.startswith("Sales_")]
-                    # Ensure numeric types
-                    for col in sales_cols:
-                        detailed_combined_table[col] = pd.to_numeric(detailed_combined_table[col], errors='coerce')
-                    detailed_combined_table['Total Sales'] = detailed_combined_table[sales_cols].sum(axis=1)
-
-                    # Rank by group
-                    detailed_combined_table['Rank'] = detailed_combined_table.groupby('Group')['Total Sales'].rank(
-                        ascending=False, method='min')
-
-                    # Sort by Group and Rank
-                    detailed_combined_table.sort_values(['Group', 'Rank'], inplace=True)
+                    # Only the rows on the current page are densified from the sparse pivot
+                    detail = aggregates['detail_pivot']
+                    detail_columns = detail_page(detail, [], time_grain).columns
 
                     # Format numeric columns using Styler
-                    style_dict_detail = {col: "{:,.0f}" for col in detailed_combined_table.columns if
+                    style_dict_detail = {col: "{:,.0f}" for col in detail_columns if
                                          col.startswith('Sales_') or col.startswith('Change_') or
                                          col == 'Total Sales'}
                     style_dict_detail.update({
-                        col: "{:.2f}%" for col in detailed_combined_table.columns if col.startswith('Percent Change_')
+                        col: "{:.2f}%" for col in detail_columns if col.startswith('Percent Change_')
                     })
                     style_dict_detail['Group'] = '{}'
                     style_dict_detail['Store Name'] = '{}'
 
-                    detailed_combined_style = detailed_combined_table.style.format(style_dict_detail)
-
-                    st.dataframe(detailed_combined_style)
+                    detail_table = cached_table('detail', view_signature, lambda: PagedTable(
+                        detail.rows,
+                        formats=style_dict_detail,
+                        expand=lambda positions: detail_page(detail, positions, time_grain)
+                    ))
+                    render_paged_table(detail_table, key='detail', export_name='detail_per_category')
+
+                    # Forecasts of every Grouping x Store row, from its monthly sales in the filters
+                    if st.checkbox(f"Forecast the next {HORIZON} months of every row", value=False,
+                                   key='detail_forecast'):
+                        try:
+                            forecast = RESULT_CACHE.get_or_compute(
+                                ('detail_forecast', filter_signature),
+                                lambda: BatchForecast(filtered_data, months=forecast_months))
+                        except MonthGapError as error:
+                            st.info(str(error))
+                        else:
+                            forecast_table = cached_table('detail_forecast', filter_signature, lambda: PagedTable(
+                                forecast.table(),
+                                formats={**{f"Forecast_{label}": "{:,.0f}"
+                                            for label in period_labels(forecast.future, 'Month')},
+                                         'Backtest Error %': "{:.1f}%"}
+                            ))
+                            st.caption(f"Each row uses the model with the smallest error when forecasting its last "
+                                       f"{HORIZON} months from the months before them.")
+                            render_paged_table(forecast_table, key='detail_forecast', export_name='sales_forecast')
 
             # -------------------- 4. Grouping BarChart (Tab 4) --------------------
-            with tab4:
+            with tab4, metrics.timed('sales_dashboard_tab_seconds', tab="Grouping BarChart"):
                 st.header("Grouping Comparison")
                 st.markdown("""
                     Compare sales performance across different 'Grouping' categories.
                     Visualizations adjust based on the number of categories selected.
                 """)
 
-                if kelompok_data.empty or 'Month_Display' not in kelompok_data.columns:
+                if kelompok_data.empty or 'Period' not in kelompok_data.columns:
                     st.write("No data available for the selected Grouping.")
                 else:
                     if len(selected_categories) == 1:
-                        single_cat = selected_categories[0]
-                        st.subheader(f"Sales Comparison for {single_cat}")
-
-                        comparison_chart = px.bar(
-                            kelompok_data,
-                            x="Month_Display",
-                            y="Penjualan",
-                            color="Store Name",
-                            barmode="group",
-                            title=f"Sales Comparison for {single_cat}",
-                            labels={"Penjualan": "Total Sales", "Month_Display": "Month", "Store Name": "Store"},
-                            color_discrete_sequence=color_palette
-                        )
-                        comparison_chart.update_traces(hovertemplate="Month: %{x}<br>Total Sales: %{y:,.0f}")
-                        comparison_chart.update_layout(
-                            xaxis_title='Month',
-                            yaxis_title='Total Sales',
-                            legend_title='Store',
-                            hovermode='x unified'
-                        )
-                        st.plotly_chart(comparison_chart, use_container_width=True)
+                        st.subheader(f"Sales Comparison for {selected_categories[0]}")
                     else:
                         st.subheader("Sales Comparison for Selected Grouping")
+                    comparison_chart = grouping_comparison_chart(
+                        select_facet_page(kelompok_data, 'comparison_page'), selected_categories, time_grain)
+                    metrics.record_figure(comparison_chart, 'grouping_comparison')
+                    st.plotly_chart(comparison_chart, use_container_width=True)
 
-                        comparison_chart = px.bar(
-                            kelompok_data,
-                            x="Month_Display",
-                            y="Penjualan",
-                            color="Store Name",
-                            barmode="group",
-                            facet_col="Grouping",
-                            facet_col_wrap=2,
-                            title="Sales Comparison for Selected Grouping",
-                            labels={"Penjualan": "Total Sales", "Month_Display": "Month", "Store Name": "Store",
-                                    "Grouping": "Grouping"},
-                            color_discrete_sequence=color_palette
-                        )
-                        comparison_chart.update_traces(hovertemplate="Month: %{x}<br>Total Sales: %{y:,.0f}")
-                        comparison_chart.update_layout(
-                            xaxis_title='Month',
-                            yaxis_title='Total Sales',
-                            legend_title='Store',
-                            hovermode='x unified',
-                            title_font_size=20,
-                            height=600
-                        )
-                        st.plotly_chart(comparison_chart, use_container_width=True)
+                    render_export('grouping_sales', grouping_signature,
+                                  lambda: kelompok_data[['Period', 'Grouping', 'Store Name', 'Penjualan']],
+                                  'grouping_sales', label="Export chart data")
 
             # -------------------- 5. Grouping PieChart (Tab 5) --------------------
-            with tab5:
+            with tab5, metrics.timed('sales_dashboard_tab_seconds', tab="Grouping PieChart"):
                 st.header("Comparison of Grouping by PieChart")
                 st.markdown("""
                     Visualize the sales distribution of selected 'Grouping' across different stores using a pie chart.
@@ -623,107 +587,111 @@ if uploaded_file is not None:
                 if kelompok_data.empty:
                     st.write("No data available for the selected Grouping.")
                 else:
-                    pie_chart = px.pie(
-                        kelompok_data,
-                        names="Store Name",
-                        values="Penjualan",
-                        title="Sales Distribution for Selected Grouping",
-                        color_discrete_sequence=color_palette
-                    )
-                    pie_chart.update_traces(hovertemplate="Store: %{label}<br>Sales: %{value:,.0f} (%{percent})")
+                    pie_chart = grouping_share_chart(kelompok_data)
+                    metrics.record_figure(pie_chart, 'grouping_share')
                     st.plotly_chart(pie_chart, use_container_width=True)
+                    render_export('grouping_store_share', grouping_signature,
+                                  lambda: group_sum(kelompok_data, 'Store Name', 'Penjualan'),
+                                  'grouping_sales_by_store', label="Export chart data")
 
             # -------------------- 6. Sales Trend (Tab 6) --------------------
-            with tab6:
+            with tab6, metrics.timed('sales_dashboard_tab_seconds', tab="Sales Trend"):
                 st.header("Sales Trend for Selected Grouping by Store")
                 st.markdown("""
                     Analyze the sales trends over time for selected 'Grouping' across different stores.
                     Faceted line charts provide a clear view of each category's performance.
                 """)
 
-                if kelompok_data.empty or 'Month_Display' not in kelompok_data.columns:
+                if kelompok_data.empty or 'Period' not in kelompok_data.columns:
                     st.write("No data available for the selected Grouping.")
                 else:
-                    trend_data = kelompok_data.groupby(['Date', 'Store Name', 'Grouping'])['Penjualan'].sum().reset_index()
-                    trend_data.sort_values('Date', inplace=True)
-                    if not trend_data.empty:
-                        trend_data['Month_Display'] = trend_data['Date'].dt.strftime('%b %Y')
+                    trend_data = RESULT_CACHE.get_or_compute(('grouping_trend', grouping_signature),
+                                                             lambda: grouping_trend(kelompok_data, time_grain))
 
-                    if trend_data.empty or 'Month_Display' not in trend_data.columns:
+                    if trend_data.empty or 'Period' not in trend_data.columns:
                         st.write("No data to display for trend.")
                     else:
-                        trend_chart = px.line(
-                            trend_data,
-                            x='Month_Display',
-                            y='Penjualan',
-                            color='Store Name',
-                            facet_col='Grouping',
-                            facet_col_wrap=2,
-                            title='Sales Trend for Selected Grouping by Store',
-                            labels={'Penjualan': 'Total Sales', 'Month_Display': 'Month', 'Store Name': 'Store', 'Grouping': 'Grouping'},
-                            color_discrete_sequence=color_palette
-                        )
-
-                        # Add markers to the trend chart
-                        trend_chart.update_traces(mode='lines+markers')
-
-                        trend_chart.update_layout(
-                            xaxis_title='Month',
-                            yaxis_title='Total Sales',
-                            legend_title='Store',
-                            title_font_size=20,
-                            hovermode='x unified',
-                            height=600
-                        )
-
-                        trend_chart.update_traces(
-                            hovertemplate="Month: %{x}<br>Total Sales: %{y:,.0f}<br>Grouping: %{legendgroup}"
-                        )
+                        trend_page_number = facet_page_number(trend_data, 'trend_page')
+                        trend_page = top_stores(facet_page(trend_data, trend_page_number - 1))
+                        trend_forecast = None
+                        if st.checkbox(f"Forecast the next {HORIZON} months", value=False, key='trend_forecast'):
+                            if time_grain == 'Month':
+                                try:
+                                    trend_forecast = RESULT_CACHE.get_or_compute(
+                                        ('trend_forecast', grouping_signature, trend_page_number),
+                                        lambda: BatchForecast(trend_page, months=forecast_months).rows())
+                                except MonthGapError as error:
+                                    st.caption(str(error))
+                            else:
+                                st.caption("Forecasts are drawn at the Month grain.")
+                        trend_chart = sales_trend_chart(trend_page, time_grain, forecast=trend_forecast)
 
+                        metrics.record_figure(trend_chart, 'sales_trend')
                         st.plotly_chart(trend_chart, use_container_width=True)
+                        render_export('grouping_trend', grouping_signature,
+                                      lambda: trend_data[['Period', 'Grouping', 'Store Name', 'Penjualan']],
+                                      'grouping_sales_trend', label="Export chart data")
 
             # -------------------- 7. Top/Bottom Performers (Tab 7) --------------------
-            with tab7:
+            with tab7, metrics.timed('sales_dashboard_tab_seconds', tab="Top/Bottom Performers"):
                 st.header("Top/Bottom Performers")
                 st.markdown("""
-                    Identify the top 10 and bottom 10 performing 'Grouping' based on total sales.
+                    Identify the top and bottom performing 'Grouping' based on sales, gross margin, margin % or
+                    average stock value, across all data or within a single division or store.
                     This helps in recognizing high-performing categories and those that may need attention.
                 """)
 
-                all_performers = filtered_data.groupby('Grouping')['Penjualan'].sum().reset_index()
-                top_performers = all_performers.nlargest(10, 'Penjualan')
-                bottom_performers = all_performers[all_performers['Penjualan'] > 0].nsmallest(10, 'Penjualan')
+                rank_col1, rank_col2, rank_col3, rank_col4 = st.columns(4)
+                rank_measure = rank_col1.selectbox("Rank by:", options=list(RANK_MEASURES), key='rank_measure')
+                rank_k = int(rank_col2.number_input("Number of Grouping:", min_value=1, max_value=1000, value=10,
+                                                    step=1, key='rank_k'))
+                rank_scope = rank_col3.selectbox("Rank within:", options=["All"] + list(RANK_SCOPES), key='rank_scope')
+                rank_scope_value = None
+                if rank_scope == "All":
+                    rank_scope = None
+                else:
+                    rank_scope_value = rank_col4.selectbox(
+                        f"{rank_scope}:", options=grouping_ranker.scope_values(rank_scope), key='rank_scope_value'
+                    )
+
+                rank_column = RANK_MEASURES[rank_measure]
+                rank_format = {rank_column: "{:.2f}%" if rank_measure == 'Margin %' else "{:,.0f}"}
+                # Sales and average stock only count Grouping with a positive value at the bottom;
+                # a negative margin is exactly what the bottom list is for
+                positive_only = rank_measure in ('Sales', 'Average Stock Value')
 
-                st.subheader("Top 10 Grouping")
+                top_performers = grouping_ranker.rank(rank_measure, rank_k, largest=True,
+                                                      scope=rank_scope, value=rank_scope_value)
+                bottom_performers = grouping_ranker.rank(rank_measure, rank_k, largest=False,
+                                                         scope=rank_scope, value=rank_scope_value,
+                                                         positive_only=positive_only)
+
+                st.subheader(f"Top {rank_k} Grouping")
                 # Use Styler for formatting
-                top_performers_style = top_performers.style.format({
-                    'Penjualan': "{:,.0f}"
-                })
+                top_performers_style = top_performers.style.format(rank_format)
                 st.dataframe(top_performers_style)
+                ranking_signature = (filter_signature, rank_measure, rank_k, rank_scope, rank_scope_value)
+                render_export('top_performers', ranking_signature, top_performers, 'top_grouping')
 
-                st.subheader("Bottom 10 Grouping")
+                st.subheader(f"Bottom {rank_k} Grouping")
                 if bottom_performers.empty:
-                    st.write("No bottom performers with non-zero sales.")
+                    st.write("No bottom performers with non-zero sales." if rank_measure == 'Sales'
+                             else "No bottom performers to show.")
                 else:
                     # Use Styler for formatting
-                    bottom_performers_style = bottom_performers.style.format({
-                        'Penjualan': "{:,.0f}"
-                    })
+                    bottom_performers_style = bottom_performers.style.format(rank_format)
                     st.dataframe(bottom_performers_style)
+                    render_export('bottom_performers', ranking_signature, bottom_performers, 'bottom_grouping')
 
             # -------------------- 8. Gross Margin Analysis (Tab 8) --------------------
-            with tab8:
+            with tab8, metrics.timed('sales_dashboard_tab_seconds', tab="Gross Margin Analysis"):
                 st.header("Gross Margin Analysis")
                 st.markdown("""
                     Analyze the gross margin to understand profitability across divisions and stores.
                     This section includes total gross margin, average margin percentage, and growth rates.
                 """)
 
-                # Recalculate Gross Margin to ensure correctness
-                filtered_data['Gross Margin'] = filtered_data['Penjualan'] - filtered_data['HPP']
-
-                # Combine 'GRC' and 'FRS' into 'GRC+FRS' if not already combined
-                filtered_data['Group'] = filtered_data['Group'].replace({'GRC': 'GRC+FRS', 'FRS': 'GRC+FRS'})
+                # Gross Margin (Penjualan - HPP) and Division are computed at ingest
 
                 # Total Gross Margin and Correct Average Margin %
                 if not filtered_data.empty:
@@ -739,73 +707,66 @@ if uploaded_file is not None:
                 col1.metric("Total Gross Margin", f"{total_gross_margin:,.0f}")
                 col2.metric("Average Margin %", f"{avg_margin_percent:.2f}%")
 
-                # Additional KPI: Gross Margin Growth Rate
-                latest_month = filtered_data['Date'].max()
-                previous_month = latest_month - pd.DateOffset(months=1)
-
-                latest_gm = filtered_data[filtered_data['Date'] == latest_month]['Gross Margin'].sum()
-                previous_gm = filtered_data[filtered_data['Date'] == previous_month]['Gross Margin'].sum()
+                # Additional KPIs: Gross Margin growth for any month, looked up in the precomputed series
+                growth_month = st.selectbox(
+                    "Growth for month:",
+                    options=list(growth_kpis.months[::-1]),
+                    format_func=lambda d: d.strftime('%b %Y'),
+                    key='growth_month'
+                )
 
-                if previous_gm > 0:
-                    gm_growth_rate = ((latest_gm - previous_gm) / previous_gm) * 100
-                else:
-                    gm_growth_rate = np.nan
+                def growth_metric(column, label, rate, help_text):
+                    if not np.isnan(rate):
+                        column.metric(label, f"{rate:.2f}%", delta=f"{rate:.2f}%", help=help_text)
+                    else:
+                        column.metric(label, "N/A", delta="N/A", help=help_text)
+
+                gm_growth = growth_kpis.at('Gross Margin', growth_month).iloc[0]
+                growth_cols = st.columns(len(GROWTH_KINDS))
+                for growth_col, (kind, compared_with) in zip(growth_cols, GROWTH_KINDS.items()):
+                    growth_metric(
+                        growth_col,
+                        "Gross Margin Growth Rate" if kind == 'MoM' else f"Gross Margin {kind} Growth",
+                        gm_growth[f"{kind} %"],
+                        f"Gross Margin compared with the {compared_with}"
+                    )
 
-                if not np.isnan(gm_growth_rate):
-                    st.metric("Gross Margin Growth Rate", f"{gm_growth_rate:.2f}%", delta=f"{gm_growth_rate:.2f}%")
-                else:
-                    st.metric("Gross Margin Growth Rate", "N/A", delta="N/A")
+                # Sparkline of monthly Gross Margin with the selected month marked
+                gm_history = growth_kpis.history('Gross Margin')
+                gm_sparkline = gm_growth_sparkline(gm_history, growth_month)
+                metrics.record_figure(gm_sparkline, 'gm_growth_sparkline')
+                st.plotly_chart(gm_sparkline, use_container_width=True)
+
+                if st.checkbox("Show Gross Margin Growth by Division and Store", value=False):
+                    growth_formats = {
+                        'Gross Margin': "{:,.0f}",
+                        **{f"{kind} %": "{:.2f}%" for kind in GROWTH_KINDS}
+                    }
+                    st.subheader(f"Gross Margin Growth by Division, {growth_month.strftime('%b %Y')}")
+                    gm_growth_by_division = growth_kpis.at('Gross Margin', growth_month, 'Division')
+                    st.dataframe(gm_growth_by_division.style.format(growth_formats, na_rep="N/A"))
+                    render_export('gm_growth_division', (filter_signature, growth_month), gm_growth_by_division,
+                                  'gross_margin_growth_by_division')
+                    st.subheader(f"Gross Margin Growth by Store, {growth_month.strftime('%b %Y')}")
+                    gm_growth_by_store = growth_kpis.at('Gross Margin', growth_month, 'Store Name')
+                    st.dataframe(gm_growth_by_store.style.format(growth_formats, na_rep="N/A"))
+                    render_export('gm_growth_store', (filter_signature, growth_month), gm_growth_by_store,
+                                  'gross_margin_growth_by_store')
 
                 # Gross Margin Percentage by Division
                 st.subheader("Gross Margin Percentage by Division")
-                gm_by_division = filtered_data.groupby('Group').agg(
-                    {'Gross Margin': 'sum', 'Penjualan': 'sum'}).reset_index()
-                gm_by_division['Gross Margin %'] = (gm_by_division['Gross Margin'] / gm_by_division['Penjualan']) * 100
-                gm_by_division['Gross Margin %'] = gm_by_division['Gross Margin %'].fillna(0)  # Handle division by zero
-                gm_by_division_sorted = gm_by_division.sort_values('Gross Margin %', ascending=False)
-
-                fig_gm_division = px.bar(
-                    gm_by_division_sorted,
-                    x='Group',
-                    y='Gross Margin %',
-                    title="Gross Margin Percentage by Division",
-                    labels={'Group': 'Division', 'Gross Margin %': 'Gross Margin Percentage (%)'},
-                    color='Group',
-                    color_discrete_sequence=color_palette
-                )
-                fig_gm_division.update_traces(hovertemplate="Division: %{x}<br>Gross Margin %: %{y:.2f}%")
-                fig_gm_division.update_layout(
-                    xaxis_title='Division',
-                    yaxis_title='Gross Margin Percentage (%)',
-                    legend_title='Division',
-                    hovermode='x unified'
-                )
+                gm_by_division_sorted = aggregates['gm_by_division']
+
+                fig_gm_division = gm_by_division_chart(gm_by_division_sorted)
+                metrics.record_figure(fig_gm_division, 'gm_by_division')
                 st.plotly_chart(fig_gm_division, use_container_width=True)
 
                 # Gross Margin Percentage by Store
                 st.subheader("Gross Margin Percentage by Store")
-                gm_by_store = filtered_data.groupby('Store Name').agg(
-                    {'Gross Margin': 'sum', 'Penjualan': 'sum'}).reset_index()
-                gm_by_store['Gross Margin %'] = (gm_by_store['Gross Margin'] / gm_by_store['Penjualan']) * 100
-                gm_by_store['Gross Margin %'] = gm_by_store['Gross Margin %'].fillna(0)  # Handle division by zero
-                gm_by_store_sorted = gm_by_store.sort_values('Gross Margin %', ascending=False)
-
-                fig_gm_store = px.bar(
-                    gm_by_store_sorted,
-                    x='Store Name',
-                    y='Gross Margin %',
-                    title="Gross Margin Percentage by Store",
-                    labels={'Store Name': 'Store', 'Gross Margin %': 'Gross Margin Percentage (%)'},
-                    color='Store Name',
-                    color_discrete_sequence=color_palette
-                )
-                fig_gm_store.update_traces(hovertemplate="Store: %{x}<br>Gross Margin %: %{y:.2f}%")
-                fig_gm_store.update_layout(
-                    xaxis_title='Store',
-                    yaxis_title='Gross Margin Percentage (%)',
-                    legend_title='Store',
-                    hovermode='x unified'
-                )
+                gm_by_store_sorted = aggregates['gm_by_store']
+
+                fig_gm_store = gm_by_store_chart(gm_by_store_sorted)
+                metrics.record_figure(fig_gm_store, 'gm_by_store')
                 st.plotly_chart(fig_gm_store, use_container_width=True)
 
                 # Detailed Gross Margin Data by Store and Grouping
@@ -817,35 +778,16 @@ if uploaded_file is not None:
 
                 if show_detailed_store_table:
                     st.subheader("Detailed Gross Margin Data by Store and Grouping")
-                    detailed_gm_store = filtered_data.groupby(['Store Name', 'Grouping']).agg(
-                        {
-                            'Gross Margin': 'sum',
-                            'Penjualan': 'sum'
-                        }
-                    ).reset_index()
-
-                    detailed_gm_store['Gross Margin %'] = (detailed_gm_store['Gross Margin'] / detailed_gm_store['Penjualan']) * 100
-                    detailed_gm_store['Gross Margin %'] = detailed_gm_store['Gross Margin %'].fillna(0)
-
-                    detailed_gm_store.rename(columns={
-                        'Store Name': 'Store Name',
-                        'Grouping': 'Grouping',
-                        'Gross Margin': 'Gross Margin Value',
-                        'Gross Margin %': 'Gross Margin Percentage (%)'
-                    }, inplace=True)
-
-                    # Use Styler for formatting
-                    detailed_gm_store['Gross Margin Value'] = detailed_gm_store['Gross Margin Value']
-                    detailed_gm_store['Gross Margin Percentage (%)'] = detailed_gm_store['Gross Margin Percentage (%)']
-
-                    detailed_gm_store = detailed_gm_store.sort_values(by=['Gross Margin Value'], ascending=False)
-
-                    detailed_gm_store_style = detailed_gm_store.style.format({
-                        'Gross Margin Value': "{:,.0f}",
-                        'Gross Margin Percentage (%)': "{:.2f}%"
-                    }).highlight_max(axis=0)
-
-                    st.dataframe(detailed_gm_store_style)
+                    gm_store_table = cached_table('gm_store', filter_signature, lambda: PagedTable(
+                        RESULT_CACHE.get_or_compute(('detailed_gm_store', filter_signature),
+                                                    lambda: detailed_gm_store(filtered_data)),
+                        formats={
+                            'Gross Margin Value': "{:,.0f}",
+                            'Gross Margin Percentage (%)': "{:.2f}%"
+                        },
+                        highlight_max=True
+                    ))
+                    render_paged_table(gm_store_table, key='gm_store', export_name='gross_margin_by_store_grouping')
 
                 show_detailed_division_table = st.checkbox(
                     "Show Detailed Gross Margin Data by Division, Store, Month, and Year",
@@ -854,47 +796,19 @@ if uploaded_file is not None:
 
                 if show_detailed_division_table:
                     st.subheader("Detailed Gross Margin Data by Division, Store, Month, and Year")
-                    # Ensure relevant columns are numeric
-                    filtered_data['Gross Margin'] = pd.to_numeric(filtered_data['Gross Margin'], errors='coerce')
-                    filtered_data['Penjualan'] = pd.to_numeric(filtered_data['Penjualan'], errors='coerce')
-
-                    detailed_gm_division = filtered_data.groupby(['Group', 'Store Name', 'year', 'Month']).agg(
-                        {
-                            'Gross Margin': 'sum',
-                            'Penjualan': 'sum'
-                        }
-                    ).reset_index()
-
-                    detailed_gm_division['Gross Margin %'] = (detailed_gm_division['Gross Margin'] / detailed_gm_division['Penjualan']) * 100
-                    detailed_gm_division['Gross Margin %'] = detailed_gm_division['Gross Margin %'].fillna(0)
-
-                    detailed_gm_division.rename(columns={
-                        'Group': 'Division',
-                        'Store Name': 'Store Name',
-                        'year': 'Year',
-                        'Month': 'Month',
-                        'Gross Margin': 'Gross Margin Value',
-                        'Gross Margin %': 'Gross Margin Percentage (%)'
-                    }, inplace=True)
-
-                    # Use Styler for formatting
-                    detailed_gm_division['Gross Margin Value'] = detailed_gm_division['Gross Margin Value']
-                    detailed_gm_division['Gross Margin Percentage (%)'] = detailed_gm_division['Gross Margin Percentage (%)']
-
-                    detailed_gm_division = detailed_gm_division.sort_values(
-                        by=['Division', 'Store Name', 'Year', 'Month'],
-                        ascending=[True, True, True, True]
-                    )
-
-                    detailed_gm_division_style = detailed_gm_division.style.format({
-                        'Gross Margin Value': "{:,.0f}",
-                        'Gross Margin Percentage (%)': "{:.2f}%"
-                    }).highlight_max(axis=0)
-
-                    st.dataframe(detailed_gm_division_style)
+                    gm_division_table = cached_table('gm_division', filter_signature, lambda: PagedTable(
+                        RESULT_CACHE.get_or_compute(('detailed_gm_division', filter_signature),
+                                                    lambda: detailed_gm_division(filtered_data)),
+                        formats={
+                            'Gross Margin Value': "{:,.0f}",
+                            'Gross Margin Percentage (%)': "{:.2f}%"
+                        },
+                        highlight_max=True
+                    ))
+                    render_paged_table(gm_division_table, key='gm_division', export_name='gross_margin_by_division_store_month')
 
             # -------------------- 9. Stock Value Analysis (Tab 9) --------------------
-            with tab9:
+            with tab9, metrics.timed('sales_dashboard_tab_seconds', tab="Stock Value Analysis"):
                 st.header("Stock Value Analysis")
                 st.markdown("""
                     Analyze the stock value data over time across different divisions and stores.
@@ -905,58 +819,33 @@ if uploaded_file is not None:
                     st.write("No data available for Stock Value Analysis.")
                 else:
                     # -------------------- Aggregate Stock Data --------------------
-                    st.subheader("Total Stock Value by Group Over Months")
-                    stock_data = filtered_data.groupby(['Group', 'Date'])['Stock Value'].sum().reset_index()
-                    stock_data['Month_Display'] = stock_data['Date'].dt.strftime('%b %Y')
-
-                    # Ensure consistent date parsing and chronological ordering
-                    stock_data['Month_Display'] = pd.Categorical(
-                        stock_data['Month_Display'],
-                        categories=sorted(stock_data['Month_Display'].unique(),
-                                          key=lambda x: datetime.strptime(x, '%b %Y')),
-                        ordered=True
-                    )
+                    st.subheader("Total Stock Value by Group Over Time")
+                    stock_data = aggregates['stock_data']
 
-                    # -------------------- Line Chart of Stock Value Over Months by Group --------------------
+                    # -------------------- Line Chart of Stock Value Over Time by Group --------------------
                     if not stock_data.empty:
-                        fig_stock = px.line(
-                            stock_data,
-                            x="Month_Display",
-                            y="Stock Value",
-                            color="Group",
-                            title="Total Stock Value by Group Over Months",
-                            labels={"Stock Value": "Total Stock Value", "Month_Display": "Month"},
-                            color_discrete_sequence=px.colors.qualitative.Safe
-                        )
-
-                        fig_stock.update_traces(mode='lines+markers')
-                        fig_stock.update_layout(
-                            xaxis_title='Month',
-                            yaxis_title='Stock Value',
-                            legend_title='Group',
-                            hovermode='x unified'
-                        )
-
-                        fig_stock.update_traces(
-                            hovertemplate="Group: %{legendgroup}<br>Month: %{x}<br>Stock Value: %{y:,.0f}"
-                        )
+                        fig_stock = stock_chart(stock_data, time_grain)
 
+                        metrics.record_figure(fig_stock, 'stock')
                         st.plotly_chart(fig_stock, use_container_width=True)
 
                     # -------------------- Top/Bottom Stock Value Categories (Grouping) --------------------
-                    st.subheader("Top 10 Grouping by Average Stock Value")
-                    stock_by_grouping_avg = filtered_data.groupby('Grouping')['Stock Value'].mean().reset_index()
+                    stock_rank_k = int(st.number_input("Number of Grouping by average stock value:", min_value=1,
+                                                       max_value=1000, value=10, step=1, key='stock_rank_k'))
 
-                    top_stock_avg = stock_by_grouping_avg.nlargest(10, 'Stock Value')
+                    st.subheader(f"Top {stock_rank_k} Grouping by Average Stock Value")
+                    top_stock_avg = grouping_ranker.rank('Average Stock Value', stock_rank_k, largest=True)
                     top_stock_avg_style = top_stock_avg.rename(
                         columns={'Stock Value': 'Average Stock Value'}).style.format({
                         'Average Stock Value': "{:,.0f}"
                     })
                     st.dataframe(top_stock_avg_style)
+                    render_export('top_stock_avg', (filter_signature, stock_rank_k), top_stock_avg,
+                                  'top_grouping_by_average_stock')
 
-                    st.subheader("Bottom 10 Grouping by Average Stock Value")
-                    bottom_stock_avg = stock_by_grouping_avg[stock_by_grouping_avg['Stock Value'] > 0].nsmallest(10,
-                                                                                                                 'Stock Value')
+                    st.subheader(f"Bottom {stock_rank_k} Grouping by Average Stock Value")
+                    bottom_stock_avg = grouping_ranker.rank('Average Stock Value', stock_rank_k, largest=False,
+                                                            positive_only=True)
 
                     if bottom_stock_avg.empty:
                         st.write("No bottom performers with non-zero average stock value.")
@@ -966,44 +855,23 @@ if uploaded_file is not None:
                             'Average Stock Value': "{:,.0f}"
                         })
                         st.dataframe(bottom_stock_avg_style)
+                        render_export('bottom_stock_avg', (filter_signature, stock_rank_k), bottom_stock_avg,
+                                      'bottom_grouping_by_average_stock')
 
                     # -------------------- Detailed Stock Value by Store and Month --------------------
                     st.subheader("Detailed Stock Value by Store and Month")
-                    store_stock_pivot = filtered_data.pivot_table(
-                        values="Stock Value",
-                        index="Store Name",
-                        columns="Month_Display",
-                        aggfunc="sum",
-                        fill_value=0
-                    )
-
-                    store_stock_pivot = store_stock_pivot.reindex(
-                        sorted(store_stock_pivot.columns, key=lambda x: datetime.strptime(x, '%b %Y')),
-                        axis=1
-                    )
-
-                    store_stock_diff = store_stock_pivot.diff(axis=1).fillna(0)
-
-                    combined_store_stock = pd.concat(
-                        [store_stock_pivot, store_stock_diff],
-                        keys=["Stock Value", "Difference"],
-                        axis=1
-                    )
-
-                    combined_store_stock.columns.names = ['Type', 'Month']
-                    combined_store_stock.reset_index(inplace=True)
-
-                    combined_store_stock.columns = [
-                        f"{col[0]}_{col[1]}" if col[0] != 'Store Name' else 'Store Name' for col in
-                        combined_store_stock.columns
-                    ]
-
-                    combined_store_stock_style = combined_store_stock.style.format({
-                        **{col: "{:,.0f}" for col in combined_store_stock.columns if
-                           col.startswith('Stock Value_') or col.startswith('Difference_')},
-                        'Store Name': '{}'
-                    }).highlight_max(axis=0)
-                    st.dataframe(combined_store_stock_style)
+                    combined_store_stock = aggregates['store_stock_table']
+
+                    store_stock_table = cached_table('store_stock', view_signature, lambda: PagedTable(
+                        combined_store_stock,
+                        formats={
+                            **{col: "{:,.0f}" for col in combined_store_stock.columns if
+                               col.startswith('Stock Value_') or col.startswith('Difference_')},
+                            'Store Name': '{}'
+                        },
+                        highlight_max=True
+                    ))
+                    render_paged_table(store_stock_table, key='store_stock', export_name='stock_value_by_store')
 
                     # -------------------- Compare Sales and Stock for Each Month --------------------
                     st.subheader("Comparison of Sales and Stock Value by Month and Group")
@@ -1012,90 +880,74 @@ if uploaded_file is not None:
                         how inventory levels relate to sales performance over time.
                     """)
 
-                    comparison_basis = st.selectbox(
+                    # Read before the aggregations run, through its key
+                    st.selectbox(
                         "Select Comparison Basis:",
                         options=["Division", "Store", "Grouping"],
+                        key='comparison_basis',
                         help="Choose whether to compare Sales and Stock Value by Division, Store, or Grouping."
                     )
+                    grouping_col = comparison_col
 
-                    grouping_col = (
-                        "Group" if comparison_basis == "Division"
-                        else "Store Name" if comparison_basis == "Store"
-                        else "Grouping"
-                    )
-
-                    sales_pivot_compare = filtered_data.pivot_table(
-                        values="Penjualan",
-                        index=grouping_col,
-                        columns="Month_Display",
-                        aggfunc="sum",
-                        fill_value=0
-                    )
-
-                    stock_pivot_compare = filtered_data.pivot_table(
-                        values="Stock Value",
-                        index=grouping_col,
-                        columns="Month_Display",
-                        aggfunc="sum",
-                        fill_value=0
-                    )
-
-                    all_months_compare = sorted(sales_pivot_compare.columns.union(stock_pivot_compare.columns),
-                                                key=lambda x: datetime.strptime(x, '%b %Y'))
-
-                    sales_pivot_compare = sales_pivot_compare.reindex(columns=all_months_compare, fill_value=0)
-                    stock_pivot_compare = stock_pivot_compare.reindex(columns=all_months_compare, fill_value=0)
-
-                    sales_pivot_compare.reset_index(inplace=True)
-                    stock_pivot_compare.reset_index(inplace=True)
-
-                    combined_sales_stock = pd.merge(
-                        sales_pivot_compare,
-                        stock_pivot_compare,
-                        on=grouping_col,
-                        how='outer',
-                        suffixes=('_Sales', '_Stock')
-                    ).fillna(0)
-
-                    for month in all_months_compare:
-                        sales_col = f"{month}_Sales"
-                        stock_col = f"{month}_Stock"
-                        pct_col = f"Stock%_{month}"
-                        combined_sales_stock[pct_col] = combined_sales_stock.apply(
-                            lambda row: (row[stock_col] / row[sales_col] * 100) if row[sales_col] != 0 else np.nan,
-                            axis=1
-                        )
-                        combined_sales_stock[pct_col] = pd.to_numeric(combined_sales_stock[pct_col], errors='coerce')
-
-                    combined_sales_stock_display = combined_sales_stock.copy()
-                    for month in all_months_compare:
-                        pct_col = f"Stock%_{month}"
-                        combined_sales_stock_display[pct_col] = combined_sales_stock_display[pct_col].apply(
-                            lambda x: f"{x:,.2f}%" if pd.notnull(x) else "N/A"
-                        )
+                    combined_sales_stock = aggregates['sales_stock_comparison']
 
                     format_dict_sales_stock = {col: "{:,.0f}" for col in combined_sales_stock.columns if
                                                col.endswith('_Sales') or col.endswith('_Stock')}
-                    format_dict_sales_stock.update(
-                        {col: "{}" for col in combined_sales_stock.columns if col.startswith('Stock%_')})
+                    format_dict_sales_stock.update({
+                        col: (lambda x: f"{x:,.2f}%" if pd.notnull(x) else "N/A")
+                        for col in combined_sales_stock.columns if col.startswith('Stock%_')
+                    })
                     format_dict_sales_stock[grouping_col] = '{}'
 
-                    combined_sales_stock_style = combined_sales_stock_display.style.format(format_dict_sales_stock)
-
-                    st.dataframe(combined_sales_stock_style)
-
-                    # -------------------- Download Option for Comparison Table --------------------
-                    csv = combined_sales_stock.to_csv(index=False)
-                    st.download_button(
-                        label="Download Comparison Table as CSV",
-                        data=csv,
-                        file_name='sales_stock_comparison.csv',
-                        mime='text/csv',
+                    sales_stock_table = cached_table(
+                        'sales_stock', view_signature + (grouping_col,),
+                        lambda: PagedTable(combined_sales_stock, formats=format_dict_sales_stock)
                     )
+                    # Exported on demand, in CSV, Parquet or Excel
+                    render_paged_table(sales_stock_table, key='sales_stock', export_name='sales_stock_comparison')
+
+            # -------------------- 10. Anomalies (Tab 10) --------------------
+            with tab10, metrics.timed('sales_dashboard_tab_seconds', tab="Anomalies"):
+                st.header("Anomalies")
+                st.markdown(f"""
+                    Periods where a Grouping x Store series breaks from its own history: sales changes
+                    and stock/sales ratio spikes with a robust z-score (distance from the series' median
+                    in units of its median absolute deviation) above {Z_THRESHOLD}, most severe first.
+                """)
+
+                if grain_data.empty:
+                    st.write("No data available for anomaly detection.")
+                else:
+                    anomalies = RESULT_CACHE.get_or_compute(('anomalies', view_signature),
+                                                            lambda: find_anomalies(grain_data, time_grain))
+                    counts = anomalies['Check'].value_counts()
+                    for column, check in zip(st.columns(len(CHECKS)), CHECKS):
+                        column.metric(check, f"{counts.get(check, 0):,}")
+
+                    anomalies_table = cached_table('anomalies', view_signature, lambda: PagedTable(
+                        anomalies,
+                        formats={'Value': "{:,.2f}", 'Typical': "{:,.2f}", 'Robust Z': "{:.1f}",
+                                 'Severity': "{:.1f}"}
+                    ))
+                    render_paged_table(anomalies_table, key='anomalies', export_name='anomalies')
+
+            # -------------------- Full report --------------------
+            # Every analysis table in one workbook, built in the background when asked for
+            with st.sidebar:
+                render_report_download(
+                    (view_signature, comparison_col, ranking_signature),
+                    lambda: report_sheets(aggregates, filtered_data, time_grain, [
+                        (f"Top {rank_k} Grouping", top_performers),
+                        (f"Bottom {rank_k} Grouping", bottom_performers),
+                    ]),
+                    'sales_report'
+                )
 
 
     except Exception as e:
         st.error(f"An error occurred while processing the file: {e}")
 
-else:
-    st.info("Please upload an Excel file to proceed.")
\ No newline at end of file
+elif ingest_job is None:
+    st.info("Please upload an Excel, CSV or Parquet file to proceed.")
+
+metrics.observe('sales_dashboard_rerun_seconds', time.perf_counter() - rerun_started)
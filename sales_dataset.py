@@ -0,0 +1,167 @@
+"""Persistent sales history as a month-partitioned Parquet dataset.
+
+    python sales_dataset.py DATASET_DIR sales.xlsx [more files ...]
+
+The monthly rollup is stored Hive-style, one directory per month::
+
+    DATASET_DIR/year=2024/month=3/part-0.parquet
+
+Adding a file replaces the months it contains and keeps every other month,
+so the history grows one export at a time. Within a month the rows are
+sorted by Store Name and written in row groups of ROW_GROUP_ROWS, so the
+Parquet statistics of a row group cover few stores.
+
+Reads go through pyarrow.dataset. A date range, years and month names are
+turned into a filter on the partition fields, which drops whole month
+directories before any file is opened; a filter on Store Name is pushed
+down to the row groups, which are skipped when their statistics rule
+them out.
+
+When SALES_DASHBOARD_DATASET names a dataset directory, the app shows it
+until a file is uploaded. The filter options come from the partitions and
+the key columns (see dataset_values), and only the rows of the selected
+date range, years, months and stores are read.
+"""
+import os
+import sys
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+
+from rollups import FLOW_MEASURES, ROLLUP_KEYS, STOCK_MEASURE, widen
+
+DATASET_ENV = "SALES_DASHBOARD_DATASET"
+ROW_GROUP_ROWS = 8_192
+
+PARTITIONING = ds.partitioning(pa.schema([('year', pa.int16()), ('month', pa.int8())]), flavor='hive')
+SCHEMA = pa.schema(
+    [(col, pa.string()) for col in ROLLUP_KEYS]
+    + [(col, pa.float64()) for col in FLOW_MEASURES[:-1] + [STOCK_MEASURE]]
+    + [('Rows', pa.int64())]
+)
+
+MONTH_NUMBERS = {datetime(2000, month, 1).strftime('%B'): month for month in range(1, 13)}
+
+
+def write_months(monthly, root):
+    """Write the monthly rollup ``monthly`` into the dataset at ``root``, replacing the months it has."""
+    frame = widen(monthly).astype({col: str for col in ROLLUP_KEYS})
+    table = pa.Table.from_pandas(frame[SCHEMA.names], schema=SCHEMA, preserve_index=False).append_column(
+        'year', pa.array(frame['Date'].dt.year.to_numpy(), pa.int16())).append_column(
+        'month', pa.array(frame['Date'].dt.month.to_numpy(), pa.int8()))
+    table = table.sort_by([('year', 'ascending'), ('month', 'ascending'), ('Store Name', 'ascending')])
+    ds.write_dataset(
+        table, root, format='parquet', partitioning=PARTITIONING, basename_template='part-{i}.parquet',
+        existing_data_behavior='delete_matching', max_rows_per_group=ROW_GROUP_ROWS,
+        min_rows_per_group=ROW_GROUP_ROWS, max_rows_per_file=0,
+    )
+
+
+def open_dataset(root):
+    return ds.dataset(root, format='parquet', partitioning=PARTITIONING, schema=SCHEMA.append(
+        pa.field('year', pa.int16())).append(pa.field('month', pa.int8())))
+
+
+def dataset_months(root):
+    """Start Dates of the months stored at ``root``, from the directory names alone."""
+    months = sorted({
+        (keys['year'], keys['month'])
+        for keys in map(ds.get_partition_keys, (f.partition_expression for f in open_dataset(root).get_fragments()))
+    })
+    return pd.DatetimeIndex([pd.Timestamp(year, month, 1) for year, month in months])
+
+
+def dataset_version(root):
+    """Files of the dataset with their sizes and modification times; changes when months are written."""
+    return tuple(sorted(
+        (path, stat.st_size, stat.st_mtime_ns)
+        for path, stat in ((path, os.stat(path)) for path in open_dataset(root).files)
+    ))
+
+
+def dataset_values(root):
+    """Distinct values of the filter columns (Group, Store Name, Grouping, year, Month) of the
+    dataset at ``root``, as a Series per column: the key columns are read alone, without the
+    measures, and the months come from the directory names."""
+    table = open_dataset(root).to_table(columns=['Group', 'Store Name', 'Grouping'])
+    values = {col: pd.Series(pc.unique(table[col]).to_pandas(), name=col) for col in table.column_names}
+    months = dataset_months(root)
+    values['year'] = pd.Series(months.year.unique(), name='year')
+    values['Month'] = pd.Series(months.month_name().unique(), name='Month')
+    return values
+
+
+def row_filter(start=None, end=None, years=None, months=None, stores=None):
+    """Dataset filter for the months from ``start`` to ``end`` (period start Dates, None for open)
+    in ``years`` and ``months`` (names), of ``stores``; None selects everything."""
+    month_index = pc.field('year').cast(pa.int32()) * 12 + pc.field('month').cast(pa.int32())
+    conditions = []
+    if start is not None:
+        conditions.append(month_index >= start.year * 12 + start.month)
+    if end is not None:
+        conditions.append(month_index <= end.year * 12 + end.month)
+    if years is not None:
+        conditions.append(pc.field('year').isin([int(year) for year in years]))
+    if months is not None:
+        conditions.append(pc.field('month').isin([MONTH_NUMBERS[month] for month in months]))
+    if stores is not None:
+        conditions.append(pc.field('Store Name').isin(list(stores)))
+    expression = pc.scalar(True)
+    for condition in conditions:
+        expression = expression & condition
+    return expression
+
+
+def scan_plan(root, expression):
+    """Row groups of the dataset that ``expression`` cannot rule out, and the compressed bytes
+    of their columns: what a read with that filter takes from disk, not counting footers."""
+    fragments = row_groups = 0
+    nbytes = 0
+    dataset = open_dataset(root)
+    for fragment in dataset.get_fragments(filter=expression):
+        fragments += 1
+        for piece in fragment.split_by_row_group(expression, schema=dataset.schema):
+            for row_group in piece.row_groups:
+                row_groups += 1
+                metadata = piece.metadata.row_group(row_group.id)
+                nbytes += sum(metadata.column(i).total_compressed_size for i in range(metadata.num_columns))
+    return {'partitions': fragments, 'row_groups': row_groups, 'bytes': nbytes}
+
+
+def read_monthly(root, start=None, end=None, years=None, months=None, stores=None):
+    """The monthly rollup rows of the dataset at ``root`` selected like row_filter, in the
+    layout of rollups.monthly_rollup (Date order)."""
+    table = open_dataset(root).to_table(filter=row_filter(start, end, years, months, stores))
+    frame = table.to_pandas()
+    dates = pd.to_datetime(pd.DataFrame({'year': frame['year'], 'month': frame['month'], 'day': 1}))
+    monthly = frame[ROLLUP_KEYS].assign(Date=dates)
+    for col in FLOW_MEASURES + [STOCK_MEASURE]:
+        monthly[col] = frame[col]
+    monthly['year'] = frame['year'].astype(int)
+    monthly['Month'] = dates.dt.month_name()
+    return monthly.sort_values('Date', kind='stable').reset_index(drop=True)
+
+
+def main(argv=None):
+    from data_loader import load_rollups
+
+    args = sys.argv[1:] if argv is None else argv
+    if len(args) < 2:
+        print(__doc__.strip().splitlines()[0].strip(), file=sys.stderr)
+        return 2
+    root, paths = args[0], args[1:]
+    for path in paths:
+        with open(path, 'rb') as upload:
+            monthly = load_rollups(upload, os.path.getsize(path), name=path).monthly
+        write_months(monthly, root)
+        months = np.unique(monthly['Date'].to_numpy())
+        print(f"{path}: {len(monthly):,} rows in {len(months)} months written to {root}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
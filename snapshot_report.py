@@ -0,0 +1,344 @@
+"""Static HTML snapshots of the dashboard for predefined filter presets.
+
+    python snapshot_report.py sales.xlsx [--presets presets.json] [--out DIR]
+
+Runs the dashboard's analyses headlessly for each preset and writes one
+self-contained HTML page per preset (Plotly figures as embedded JSON with
+plotly.js inlined, tables pre-rendered) plus an index.html, by default into
+``<dataset>_snapshots/`` next to the dataset. Viewing a snapshot needs no
+Python at all, so read-only visitors of the default view can be sent there
+instead of to the live app.
+
+A presets file maps preset names to filters, for example::
+
+    {"bzr-2024": {"groups": ["BZR"], "years": [2024], "grain": "Quarter"}}
+
+Keys are ``groups``, ``years``, ``months`` (month names), ``stores``,
+``categories`` (Grouping) and ``grain``. A missing key selects what the app
+selects by default: everything, the first Grouping, and Month grain.
+"""
+import argparse
+import html
+import json
+import os
+import sys
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import plotly.io as pio
+from plotly.offline import get_plotlyjs
+
+from aggregations import (DASHBOARD_GRAPH, detail_page, detailed_gm_division, detailed_gm_store, group_sales_overview,
+                          group_sales_tables, grouping_trend, store_sales_table)
+from anomalies import find_anomalies
+from charts import (facet_page, facet_pages, gm_by_division_chart, gm_by_store_chart, gm_growth_sparkline,
+                    group_sales_chart, grouping_comparison_chart, grouping_share_chart, sales_trend_chart, stock_chart,
+                    store_comparison_chart, top_stores)
+from data_loader import load_rollups
+from filters import filter_rollups, months_in_selection
+from forecasting import BatchForecast, MonthGapError, missing_months
+from growth_kpis import GROWTH_KINDS, GrowthKPIs
+from ranking import GroupingRanker
+from rollups import GRAINS
+
+DEFAULT_PRESETS = {
+    "default": {},
+    "quarterly": {"grain": "Quarter"},
+    "yearly": {"grain": "Year"},
+}
+
+# Long tables show their first rows only; the full tables are in the app and its exports
+SNAPSHOT_TABLE_ROWS = 200
+SNAPSHOT_RANK_K = 10
+
+MONTH_NAMES = ['January', 'February', 'March', 'April', 'May', 'June', 'July', 'August', 'September', 'October',
+               'November', 'December']
+
+
+def preset_filters(rollups, preset):
+    """The filter selections of ``preset``, with the app's defaults for missing keys."""
+    raw_data = rollups.monthly
+    unique_categories = sorted(raw_data['Grouping'].unique())
+    filters = {
+        'groups': sorted(raw_data['Group'].unique()),
+        'years': sorted(raw_data['year'].unique()),
+        'months': [month for month in MONTH_NAMES if month in set(raw_data['Month'].dropna().unique())],
+        'stores': sorted(raw_data['Store Name'].unique()),
+        'categories': [unique_categories[0]] if unique_categories else [],
+        'grain': 'Month',
+    }
+    unknown = set(preset) - set(filters)
+    if unknown:
+        raise ValueError(f"Unknown preset keys: {', '.join(sorted(unknown))}")
+    filters.update(preset)
+    if filters['grain'] not in GRAINS:
+        raise ValueError(f"Unknown grain {filters['grain']!r}; expected one of {', '.join(GRAINS)}")
+    return filters
+
+
+def display_format(column, dtype):
+    """Styler format for a column, matching the app's tables."""
+    if not pd.api.types.is_numeric_dtype(dtype) or pd.api.types.is_bool_dtype(dtype):
+        return None
+    if column in ('Year', 'year', 'Rank'):
+        return "{:.0f}"
+    if '%' in str(column) or str(column).startswith('Percent Change_'):
+        return "{:.2f}%"
+    return "{:,.0f}"
+
+
+def table_html(frame, max_rows=SNAPSHOT_TABLE_ROWS):
+    """Pre-rendered HTML of ``frame``'s first ``max_rows`` rows."""
+    shown = frame.head(max_rows)
+    formats = {col: fmt for col, fmt in ((col, display_format(col, dtype)) for col, dtype in shown.dtypes.items())
+               if fmt is not None}
+    # Text cells and labels come from the data, so they are escaped; numbers get their display format
+    styler = (shown.style.format(formats, na_rep="N/A", escape="html")
+              .format_index(escape="html", axis=0).format_index(escape="html", axis=1))
+    if not any(name is not None for name in shown.index.names):
+        styler = styler.hide(axis='index')
+    note = ""
+    if len(frame) > max_rows:
+        note = f'<p class="note">First {max_rows:,} of {len(frame):,} rows.</p>'
+    return f'<div class="table">{styler.to_html()}</div>{note}'
+
+
+class SnapshotPage:
+    """HTML body of one snapshot, built section by section."""
+
+    def __init__(self):
+        self.parts = []
+        self.n_figures = 0
+
+    def heading(self, text, level=2):
+        self.parts.append(f"<h{level}>{html.escape(text)}</h{level}>")
+
+    def text(self, text):
+        self.parts.append(f"<p>{html.escape(text)}</p>")
+
+    def metrics(self, items):
+        cells = "".join(
+            f'<div class="metric"><div class="label">{html.escape(label)}</div>'
+            f'<div class="value">{html.escape(value)}</div></div>'
+            for label, value in items
+        )
+        self.parts.append(f'<div class="metrics">{cells}</div>')
+
+    def figure(self, fig):
+        # The figure JSON is embedded and drawn by the inlined plotly.js; '</' is escaped
+        # so that no string in the data can close the script element
+        self.n_figures += 1
+        div_id = f"figure-{self.n_figures}"
+        spec = pio.to_json(fig, validate=False).replace("</", "<\\/")
+        self.parts.append(
+            f'<div id="{div_id}" class="figure"></div>'
+            f'<script>(function () {{ var spec = {spec}; '
+            f'Plotly.newPlot("{div_id}", spec.data, spec.layout, {{responsive: true}}); }})();</script>'
+        )
+
+    def table(self, frame, max_rows=SNAPSHOT_TABLE_ROWS):
+        self.parts.append(table_html(frame, max_rows))
+
+    def render(self, title, subtitle):
+        return f"""<!DOCTYPE html>
+<html lang="en">
+<head>
+<meta charset="utf-8">
+<title>{html.escape(title)}</title>
+<style>
+body {{ font-family: sans-serif; margin: 2rem; color: #262730; }}
+h2 {{ border-bottom: 1px solid #ddd; padding-bottom: .3rem; margin-top: 2.5rem; }}
+.subtitle, .note {{ color: #666; }}
+.metrics {{ display: flex; gap: 2.5rem; flex-wrap: wrap; margin: 1rem 0; }}
+.metric .label {{ font-size: .9rem; color: #666; }}
+.metric .value {{ font-size: 1.8rem; }}
+.table {{ overflow-x: auto; max-height: 36rem; }}
+table {{ border-collapse: collapse; font-size: .85rem; }}
+th, td {{ border: 1px solid #e6e6e6; padding: .25rem .5rem; text-align: right; white-space: nowrap; }}
+th {{ background: #f7f7f7; position: sticky; top: 0; }}
+</style>
+<script>{get_plotlyjs()}</script>
+</head>
+<body>
+<h1>{html.escape(title)}</h1>
+<p class="subtitle">{html.escape(subtitle)}</p>
+{"".join(self.parts)}
+</body>
+</html>
+"""
+
+
+def snapshot_page(rollups, filters):
+    """The snapshot of one filter selection, as a SnapshotPage."""
+    grain = filters['grain']
+    view = filter_rollups(rollups, filters['groups'], filters['years'], filters['months'], filters['stores'],
+                          filters['categories'], grain)
+    page = SnapshotPage()
+    if view.filtered_data.empty:
+        page.text("No data available after applying the selected filters.")
+        return page
+
+    filtered_data = view.filtered_data
+    aggregates = DASHBOARD_GRAPH.run({
+        'filtered_data': filtered_data,
+        'grain_data': view.grain_data,
+        'grain': grain,
+        'comparison_col': 'Division'
+    })
+
+    # 1. Group Sales Overview
+    page.heading("Group Sales Overview")
+    group_sales = aggregates['group_sales']
+    _, group_sales_table_with_total, group_sales_diff_with_total = group_sales_tables(group_sales, grain)
+    page.table(group_sales_overview(group_sales_table_with_total, group_sales_diff_with_total))
+    page.figure(group_sales_chart(group_sales, grain))
+
+    # 2. Store Comparison
+    page.heading("Store Comparison")
+    page.figure(store_comparison_chart(aggregates['store_comparison'], grain))
+    page.table(store_sales_table(aggregates['store_comparison'], grain))
+
+    # 3. Detailed View per Category
+    page.heading("Detailed View per Category")
+    detail = aggregates['detail_pivot']
+    page.table(detail_page(detail, np.arange(min(len(detail.rows), SNAPSHOT_TABLE_ROWS)), grain))
+    if len(detail.rows) > SNAPSHOT_TABLE_ROWS:
+        page.text(f"First {SNAPSHOT_TABLE_ROWS:,} of {len(detail.rows):,} rows.")
+
+    # 4-6. Grouping
+    kelompok_data = view.kelompok_data
+    page.heading(f"Grouping: {', '.join(filters['categories'])}")
+    if kelompok_data.empty:
+        page.text("No data available for the selected Grouping.")
+    else:
+        # The faceted charts get one figure per page of Grouping
+        for number in range(facet_pages(kelompok_data)):
+            page.figure(grouping_comparison_chart(top_stores(facet_page(kelompok_data, number)),
+                                                  filters['categories'], grain))
+        page.figure(grouping_share_chart(kelompok_data))
+        trend_data = grouping_trend(kelompok_data, grain)
+        forecast_months = months_in_selection(rollups, filters['years'], filters['months'])
+        forecast_gaps = missing_months(forecast_months)
+        for number in range(facet_pages(trend_data)):
+            trend_page = top_stores(facet_page(trend_data, number))
+            # As in the app, forecasts are drawn at the Month grain from consecutive selected months
+            forecast = None
+            if grain == 'Month' and not len(forecast_gaps):
+                forecast = BatchForecast(trend_page, months=forecast_months).rows()
+            page.figure(sales_trend_chart(trend_page, grain, forecast=forecast))
+        if grain == 'Month' and len(forecast_gaps):
+            page.text(str(MonthGapError(forecast_gaps)))
+
+    # 7. Top/Bottom Performers
+    ranker = GroupingRanker(filtered_data)
+    page.heading(f"Top {SNAPSHOT_RANK_K} Grouping by Sales")
+    page.table(ranker.rank('Sales', SNAPSHOT_RANK_K, largest=True))
+    page.heading(f"Bottom {SNAPSHOT_RANK_K} Grouping by Sales", level=3)
+    page.table(ranker.rank('Sales', SNAPSHOT_RANK_K, largest=False, positive_only=True))
+
+    # 8. Gross Margin Analysis
+    page.heading("Gross Margin Analysis")
+    total_gross_margin = filtered_data['Gross Margin'].sum()
+    total_penjualan = filtered_data['Penjualan'].sum()
+    avg_margin_percent = (total_gross_margin / total_penjualan) * 100 if total_penjualan != 0 else 0
+    growth_kpis = GrowthKPIs(filtered_data)
+    latest_month = growth_kpis.months[-1]
+    gm_growth = growth_kpis.at('Gross Margin', latest_month).iloc[0]
+    page.metrics(
+        [("Total Gross Margin", f"{total_gross_margin:,.0f}"), ("Average Margin %", f"{avg_margin_percent:.2f}%")]
+        + [(f"Gross Margin {kind} Growth, {latest_month.strftime('%b %Y')}",
+            "N/A" if np.isnan(gm_growth[f"{kind} %"]) else f"{gm_growth[f'{kind} %']:.2f}%")
+           for kind in GROWTH_KINDS]
+    )
+    page.figure(gm_growth_sparkline(growth_kpis.history('Gross Margin'), latest_month))
+    page.figure(gm_by_division_chart(aggregates['gm_by_division']))
+    page.figure(gm_by_store_chart(aggregates['gm_by_store']))
+    page.heading("Gross Margin by Store and Grouping", level=3)
+    page.table(detailed_gm_store(filtered_data))
+    page.heading("Gross Margin by Division, Store, Month and Year", level=3)
+    page.table(detailed_gm_division(filtered_data))
+
+    # 9. Stock Value Analysis
+    page.heading("Stock Value Analysis")
+    page.figure(stock_chart(aggregates['stock_data'], grain))
+    page.heading("Stock Value by Store", level=3)
+    page.table(aggregates['store_stock_table'])
+    page.heading("Sales and Stock Value by Division", level=3)
+    page.table(aggregates['sales_stock_comparison'])
+
+    # 10. Anomalies
+    page.heading("Anomalies")
+    anomalies = find_anomalies(view.grain_data, grain)
+    page.table(anomalies.head(SNAPSHOT_TABLE_ROWS))
+    if len(anomalies) > SNAPSHOT_TABLE_ROWS:
+        page.text(f"Most severe {SNAPSHOT_TABLE_ROWS:,} of {len(anomalies):,} anomalies.")
+    return page
+
+
+def _write_atomically(path, content):
+    # Readers of the snapshot directory never see a half-written page
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as out:
+        out.write(content)
+    os.replace(tmp_path, path)
+
+
+def write_snapshots(dataset_path, presets=DEFAULT_PRESETS, out_dir=None):
+    """Write a snapshot per preset and an index page; return the written paths."""
+    dataset_path = os.path.abspath(dataset_path)
+    stem = os.path.splitext(os.path.basename(dataset_path))[0]
+    out_dir = out_dir or os.path.join(os.path.dirname(dataset_path), f"{stem}_snapshots")
+    os.makedirs(out_dir, exist_ok=True)
+
+    with open(dataset_path, "rb") as dataset:
+        rollups = load_rollups(dataset, os.path.getsize(dataset_path), name=dataset_path)
+    generated = datetime.now().strftime('%Y-%m-%d %H:%M')
+
+    written = []
+    links = []
+    for name, preset in presets.items():
+        if not name or os.path.basename(name) != name or name.startswith('.'):
+            raise ValueError(f"Preset name {name!r} cannot be used as a file name")
+        filters = preset_filters(rollups, preset)
+        page = snapshot_page(rollups, filters)
+        summary = ", ".join(f"{key}: {value}" for key, value in preset.items()) or "all data"
+        path = os.path.join(out_dir, f"{name}.html")
+        _write_atomically(path, page.render(
+            f"Sales & Stock Dashboard: {name}",
+            f"{os.path.basename(dataset_path)}, {summary}, {filters['grain']} grain. Generated {generated}."
+        ))
+        written.append(path)
+        links.append(f'<li><a href="{html.escape(name)}.html">{html.escape(name)}</a> ({html.escape(summary)})</li>')
+
+    index_path = os.path.join(out_dir, "index.html")
+    _write_atomically(index_path, (
+        f'<!DOCTYPE html><html lang="en"><head><meta charset="utf-8"><title>{html.escape(stem)} snapshots</title>'
+        f'</head><body><h1>{html.escape(os.path.basename(dataset_path))}</h1>'
+        f'<p>Generated {generated}.</p><ul>{"".join(links)}</ul></body></html>'
+    ))
+    written.append(index_path)
+    return written
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Write static HTML snapshots of the dashboard.")
+    parser.add_argument("dataset", help="Sales data file (.xlsx, .csv or .parquet)")
+    parser.add_argument("--presets", help="JSON file of filter presets (default: all data at each grain)")
+    parser.add_argument("--out", help="Output directory (default: <dataset>_snapshots next to the dataset)")
+    args = parser.parse_args(argv)
+
+    presets = DEFAULT_PRESETS
+    if args.presets:
+        with open(args.presets, encoding="utf-8") as presets_file:
+            presets = json.load(presets_file)
+    try:
+        written = write_snapshots(args.dataset, presets, args.out)
+    except ValueError as e:
+        parser.error(str(e))
+    for path in written:
+        print(path)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
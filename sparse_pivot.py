@@ -0,0 +1,151 @@
+"""Sparse month pivot for wide, mostly empty tables.
+
+SparsePivot keeps only the observed (row, month) sums in CSR form: the
+entries of row ``i`` are ``indices[indptr[i]:indptr[i + 1]]`` (month
+positions, ascending) and the matching ``data``. Month-over-month change and
+percent change are worked out on the same sparse layout, and dense arrays
+are only built for the rows that are actually displayed.
+"""
+import numpy as np
+import pandas as pd
+
+
+def _gather(indptr, positions):
+    """Entry indices and owning output row for the CSR rows at ``positions``."""
+    starts = indptr[positions]
+    lengths = indptr[positions + 1] - starts
+    owner = np.repeat(np.arange(len(positions)), lengths)
+    offsets = np.arange(lengths.sum()) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+    return np.repeat(starts, lengths) + offsets, owner
+
+
+class SparseCells:
+    """Values on a sparse (row, column) pattern stored in CSR order."""
+
+    def __init__(self, n_rows, indptr, indices, data):
+        self.n_rows = n_rows
+        self.indptr = indptr
+        self.indices = indices
+        self.data = data
+
+    @property
+    def nbytes(self):
+        return self.indptr.nbytes + self.indices.nbytes + self.data.nbytes
+
+    def row_ids(self):
+        return np.repeat(np.arange(self.n_rows), np.diff(self.indptr))
+
+    def dense(self, positions, n_columns, fill):
+        """Dense ``len(positions) x n_columns`` block, ``fill`` where no entry."""
+        positions = np.asarray(positions, dtype=np.int64)
+        block = np.full((len(positions), n_columns), fill, dtype=np.float64)
+        entries, owner = _gather(self.indptr, positions)
+        block[owner, self.indices[entries]] = self.data[entries]
+        return block
+
+
+class SparsePivot:
+    """Sum of ``values`` per ``index`` row and ``columns`` value, observed cells only."""
+
+    def __init__(self, rows, columns, cells):
+        self.rows = rows
+        self.columns = columns
+        self.cells = cells
+        self._changes = None
+
+    @classmethod
+    def from_frame(cls, frame, index, columns, values):
+        """Equivalent of ``frame.pivot_table(values, index, columns, aggfunc='sum',
+        fill_value=0)`` without materializing the empty cells."""
+        sums = frame.groupby(index + [columns], sort=True, observed=True)[values].sum()
+        keys = sums.index
+
+        # Rows start wherever any index level changes between consecutive cells
+        new_row = np.zeros(len(keys), dtype=bool)
+        new_row[:1] = True
+        for level in range(len(index)):
+            codes = keys.codes[level]
+            new_row[1:] |= codes[1:] != codes[:-1]
+        row_ids = np.cumsum(new_row) - 1
+        rows = keys.droplevel(-1)[new_row].to_frame(index=False)
+
+        col_ids, labels = pd.factorize(keys.get_level_values(-1), sort=True)
+        indptr = np.searchsorted(row_ids, np.arange(len(rows) + 1)).astype(np.int64)
+        cells = SparseCells(len(rows), indptr, col_ids.astype(np.int32), sums.to_numpy(dtype=np.float64))
+        return cls(rows, pd.Index(labels), cells)
+
+    @property
+    def shape(self):
+        return len(self.rows), len(self.columns)
+
+    @property
+    def nbytes(self):
+        """Bytes held by the sparse arrays and the row keys."""
+        return self.cells.nbytes + int(self.rows.memory_usage(deep=True).sum())
+
+    def row_totals(self):
+        return np.bincount(self.cells.row_ids(), weights=self.cells.data, minlength=len(self.rows))
+
+    def take_rows(self, positions):
+        """New SparsePivot with the rows at ``positions``, in that order."""
+        positions = np.asarray(positions, dtype=np.int64)
+        entries, _ = _gather(self.cells.indptr, positions)
+        lengths = np.diff(self.cells.indptr)[positions]
+        indptr = np.concatenate([[0], np.cumsum(lengths)]).astype(np.int64)
+        cells = SparseCells(len(positions), indptr, self.cells.indices[entries], self.cells.data[entries])
+        return SparsePivot(self.rows.iloc[positions].reset_index(drop=True), self.columns, cells)
+
+    def _month_over_month(self):
+        # Current and previous value on every cell that is observed or follows
+        # an observed cell. All other cells have change 0 and percent change NaN.
+        if self._changes is None:
+            n = len(self.columns)
+            row_ids = self.cells.row_ids()
+            cols = self.cells.indices.astype(np.int64)
+            has_next = cols + 1 < n
+            keys = np.concatenate([row_ids * n + cols, (row_ids * n + cols + 1)[has_next]])
+            current = np.concatenate([self.cells.data, np.zeros(has_next.sum())])
+            previous = np.concatenate([np.zeros(len(cols)), self.cells.data[has_next]])
+
+            unique_keys, inverse = np.unique(keys, return_inverse=True)
+            current = np.bincount(inverse, weights=current, minlength=len(unique_keys))
+            previous = np.bincount(inverse, weights=previous, minlength=len(unique_keys))
+
+            # The first month has no predecessor; the dense fill marks it NaN
+            row_ids, cols = np.divmod(unique_keys, n)
+            keep = cols >= 1
+            row_ids, cols, current, previous = row_ids[keep], cols[keep], current[keep], previous[keep]
+            indptr = np.searchsorted(row_ids, np.arange(len(self.rows) + 1)).astype(np.int64)
+
+            with np.errstate(divide='ignore', invalid='ignore'):
+                pct = (current / previous - 1) * 100
+            self._changes = (
+                SparseCells(len(self.rows), indptr, cols.astype(np.int32), current - previous),
+                SparseCells(len(self.rows), indptr, cols.astype(np.int32), pct),
+            )
+        return self._changes
+
+    def changes(self):
+        """Month-over-month difference, as SparseCells (implicit value 0)."""
+        return self._month_over_month()[0]
+
+    def pct_changes(self):
+        """Month-over-month percent change, as SparseCells (implicit value NaN)."""
+        return self._month_over_month()[1]
+
+    def has_changes(self):
+        return len(self.columns) >= 2
+
+    def has_pct_changes(self):
+        return self.has_changes() and not np.isnan(self.pct_changes().data).all()
+
+    def dense_sales(self, positions):
+        return self.cells.dense(positions, len(self.columns), 0.0)
+
+    def dense_changes(self, positions):
+        block = self.changes().dense(positions, len(self.columns), 0.0)
+        block[:, 0] = np.nan
+        return block
+
+    def dense_pct_changes(self, positions):
+        return self.pct_changes().dense(positions, len(self.columns), np.nan)
@@ -0,0 +1,92 @@
+"""A small dependency graph of named tasks run on a shared thread pool.
+
+Each task declares the names of its inputs: either values handed to run()
+or the results of other tasks. A task is submitted as soon as all of its
+inputs are available, so independent tasks run concurrently. pandas and
+NumPy release the GIL inside most groupby and pivot kernels, which is where
+these tasks spend their time.
+"""
+import os
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+MAX_WORKERS = min(8, os.cpu_count() or 1)
+
+_executor = ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix="task-graph")
+
+TaskTiming = namedtuple("TaskTiming", ["name", "thread", "start", "end"])
+
+
+class TaskGraph:
+    """Declarative set of tasks keyed by name."""
+
+    def __init__(self):
+        self._tasks = {}
+
+    def add(self, name, func, *inputs):
+        """Register ``func(*inputs)`` under ``name``."""
+        if name in self._tasks:
+            raise ValueError(f"Task '{name}' is already defined")
+        self._tasks[name] = (func, inputs)
+        return self
+
+    def run(self, values, executor=None):
+        """Run every task and return a TaskRun.
+
+        ``values`` maps input names to the values that are not produced by a
+        task. Pass ``executor`` to override the shared pool, for example a
+        single-thread pool to run the graph serially.
+        """
+        executor = executor or _executor
+        available = dict(values)
+        missing = {
+            name for _, inputs in self._tasks.values() for name in inputs
+            if name not in available and name not in self._tasks
+        }
+        if missing:
+            raise KeyError(f"Unknown task inputs: {', '.join(sorted(missing))}")
+
+        pending = dict(self._tasks)
+        running = {}
+        timeline = []
+        origin = time.perf_counter()
+
+        def timed(name, func, args):
+            start = time.perf_counter() - origin
+            result = func(*args)
+            timeline.append(TaskTiming(name, threading.current_thread().name, start, time.perf_counter() - origin))
+            return result
+
+        while pending or running:
+            ready = [name for name, (_, inputs) in pending.items() if all(i in available for i in inputs)]
+            if not ready and not running:
+                raise ValueError(f"Tasks with circular inputs: {', '.join(sorted(pending))}")
+            for name in ready:
+                func, inputs = pending.pop(name)
+                running[executor.submit(timed, name, func, [available[i] for i in inputs])] = name
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                available[running.pop(future)] = future.result()
+
+        results = {name: available[name] for name in self._tasks}
+        return TaskRun(results, sorted(timeline, key=lambda t: t.start), time.perf_counter() - origin)
+
+
+class TaskRun:
+    """Results and per-task timings of one TaskGraph.run()."""
+
+    def __init__(self, results, timeline, wall_time):
+        self.results = results
+        self.timeline = timeline
+        self.wall_time = wall_time
+
+    def __getitem__(self, name):
+        return self.results[name]
+
+    @property
+    def busy_time(self):
+        """Sum of task durations; compare with wall_time for the speedup."""
+        return sum(t.end - t.start for t in self.timeline)
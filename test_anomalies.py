@@ -0,0 +1,61 @@
+import numpy as np
+import pandas as pd
+import pytest
+from synthetic import make_sales_data
+
+from anomalies import SERIES_KEYS, find_anomalies, robust_z, row_medians, series_matrices
+from filters import general_rows
+from rollups import Rollups
+
+
+@pytest.fixture(scope='module')
+def grain_data():
+    rollups = Rollups.from_rows(make_sales_data(40, 4, 12, density=0.7, seed=8).drop(columns='Rows'))
+    monthly = rollups.monthly
+    _, grain_data = general_rows(rollups, sorted(monthly['Group'].unique()), sorted(monthly['year'].unique()),
+                                 list(monthly['Month'].unique()), sorted(monthly['Store Name'].unique()), 'Month')
+    return grain_data
+
+
+def test_row_medians_ignore_nan():
+    values = np.array([[3.0, 1.0, np.nan, 2.0], [np.nan] * 4, [4.0, 1.0, 3.0, 2.0]])
+    np.testing.assert_array_equal(row_medians(values)[:, 0], [2.0, np.nan, 2.5])
+
+
+def test_robust_z_matches_pandas_per_series(grain_data):
+    keys, dates, sales, _ = series_matrices(grain_data)
+    z, _ = robust_z(np.diff(sales, axis=1))
+    rows = grain_data.set_index(SERIES_KEYS).sort_index()
+    for position, key in enumerate(keys.itertuples(index=False)):
+        series = rows.loc[tuple(key)].set_index('Date')['Penjualan'].reindex(dates, fill_value=0)
+        change = series.diff().iloc[1:]
+        deviation = (change - change.median()).abs()
+        mad = deviation.median() * 1.4826
+        scale = mad if mad > 0 else deviation.mean() * 1.2533
+        expected = (change - change.median()) / scale if scale > 0 else change * 0
+        np.testing.assert_allclose(z[position], expected.to_numpy())
+
+
+def test_series_matrices_hold_every_sale(grain_data):
+    keys, dates, sales, stock = series_matrices(grain_data)
+    assert len(keys) == len(grain_data[SERIES_KEYS].drop_duplicates())
+    assert sales.shape == stock.shape == (len(keys), len(dates))
+    assert sales.sum() == pytest.approx(grain_data['Penjualan'].sum())
+    assert stock.sum() == pytest.approx(grain_data['Stock Value'].sum())
+
+
+def test_a_planted_sales_spike_is_the_most_severe_change(grain_data):
+    keys, dates, sales, _ = series_matrices(grain_data)
+    # A series selling every month, whose sales jump to 40 times its best month in the middle
+    position = np.flatnonzero((sales > 0).all(axis=1))[0]
+    key = keys.iloc[position]
+    target = (grain_data[SERIES_KEYS] == key.to_numpy()).all(axis=1) & (grain_data['Date'] == dates[6])
+    spiked = grain_data.copy()
+    spiked.loc[target, 'Penjualan'] = sales[position].max() * 40
+
+    anomalies = find_anomalies(spiked, 'Month')
+    top = anomalies[anomalies['Check'] == 'Sales change'].iloc[0]
+    assert (top['Grouping'], top['Store Name']) == (key['Grouping'], key['Store Name'])
+    assert top['Period'] == dates[6].strftime('%b %Y')
+    assert anomalies['Severity'].is_monotonic_decreasing
+    assert (anomalies['Severity'] > 3.5).all()
@@ -0,0 +1,124 @@
+import io
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import data_loader
+from data_loader import AmbiguousNumbersError, load_sales_upload, parse_numeric
+
+MEASURES = ['Penjualan', 'HPP', 'Gross Margin', 'Stock Value']
+
+
+def sales_rows(measures):
+    n = len(measures['Penjualan'])
+    return pd.DataFrame({
+        'Grouping': ['GRC ITEM 1', 'BZR ITEM 2', 'FRS ITEM 3', 'GRC ITEM 4'][:n],
+        'Penjualan': measures['Penjualan'],
+        'HPP': measures['HPP'],
+        'Gross Margin': measures['Gross Margin'],
+        'Store Name': ['Store A'] * n,
+        'Month': ['January', 'February', 'March', 'April'][:n],
+        'year': [2024] * n,
+        'Stock Value': measures['Stock Value'],
+    })
+
+
+def load(rows, fmt, **options):
+    buf = io.BytesIO()
+    if fmt == 'csv':
+        rows.to_csv(buf, index=False, **options)
+    elif fmt == 'parquet':
+        rows.to_parquet(buf, index=False)
+    else:
+        rows.to_excel(buf, index=False)
+    data = buf.getvalue()
+    loaded = load_sales_upload(io.BytesIO(data), len(data), name=f"sales.{fmt}")
+    return loaded.sort_values(['Date', 'Grouping']).reset_index(drop=True)
+
+
+def test_parse_numeric_reads_text_with_thousands_dots_and_decimal_comma():
+    values = parse_numeric(pd.Series(['12.500', '1.234.567,5', '7,25', 3.5, 'n/a'], dtype=object))
+    np.testing.assert_array_equal(values, [12500, 1234567.5, 7.25, 3.5, np.nan])
+
+
+def test_parse_numeric_reads_text_with_decimal_dots():
+    values = parse_numeric(pd.Series(['12.50', '1,234,567.5', '12.500', 3.5, 'n/a'], dtype=object))
+    np.testing.assert_array_equal(values, [12.5, 1234567.5, 12.5, 3.5, np.nan])
+
+
+@pytest.mark.parametrize('measures', [
+    # One value with two dots or a decimal comma settles how the single groups are read
+    {'Penjualan': ['12.500', '10.000', '5.000', '1.234.567'], 'HPP': ['10.000', '8.000', '4.000', '1.000'],
+     'Gross Margin': ['2.500', '2.000', '1.000', '1.233.567'], 'Stock Value': ['1.000', '2.000', '3.000', '4,5']},
+    {'Penjualan': ['12.500', '10.000', '5.000', '1.234'], 'HPP': ['10.000', '8.000', '4.000', '1.000'],
+     'Gross Margin': ['2.500', '2.000', '1.000', '0.234'], 'Stock Value': ['1.000', '2.000', '3.000', '4.50']},
+])
+def test_csv_parquet_and_excel_text_numbers_load_the_same(measures):
+    rows = sales_rows(measures)
+    excel = load(rows, 'xlsx')
+    for fmt, options in (('csv', {'sep': ';'}), ('csv', {}), ('parquet', {})):
+        pd.testing.assert_frame_equal(load(rows, fmt, **options), excel, check_dtype=False)
+
+
+def test_standard_and_indonesian_csv_load_the_values_of_the_workbook():
+    measures = {
+        'Penjualan': [1_234_567.25, 12_500.0, 980.5, 7.75],
+        'HPP': [1_000_000.0, 10_000.5, 800.0, 5.0],
+        'Stock Value': [2_500_000.0, 12.5, 0.25, 100_000.0],
+    }
+    measures['Gross Margin'] = np.subtract(measures['Penjualan'], measures['HPP'])
+    rows = sales_rows(measures)
+    excel = load(rows, 'xlsx')
+    assert excel['Penjualan'].sum() == pytest.approx(sum(measures['Penjualan']))
+
+    standard = load(rows, 'csv')
+    indonesian = rows.copy()
+    for col in MEASURES:
+        indonesian[col] = indonesian[col].map(
+            lambda v: f"{v:,.2f}".replace(',', ' ').replace('.', ',').replace(' ', '.'))
+    for loaded in (standard, load(indonesian, 'csv', sep=';'), load(indonesian, 'parquet')):
+        pd.testing.assert_frame_equal(loaded, excel, check_dtype=False)
+
+
+@pytest.mark.parametrize('fmt', ['csv', 'parquet', 'xlsx'])
+@pytest.mark.parametrize('measures, message', [
+    # Only single groups: '12.500' is twelve and a half or twelve thousand five hundred
+    ({'Penjualan': ['12.500', '10.000', '5.000'], 'HPP': ['10.000', '8.000', '4.000'],
+      'Gross Margin': ['2.500', '2.000', '1.000'], 'Stock Value': ['1.000', '2.000', '3.000']},
+     "'12.500'.*no other number"),
+    ({'Penjualan': ['12,5', '10', '5'], 'HPP': ['10', '8', '4'],
+      'Gross Margin': ['2.50', '2', '1'], 'Stock Value': ['1', '2', '3']},
+     "'12,5'.*'2.50'"),
+])
+def test_numbers_that_do_not_tell_their_decimal_mark_are_rejected(fmt, measures, message):
+    with pytest.raises(AmbiguousNumbersError, match=message):
+        load(sales_rows(measures), fmt)
+
+
+def test_csv_blocks_read_text_numbers_the_same_way(monkeypatch):
+    n = 400
+    rows = sales_rows({col: ['12.500', '10.000', '5.000', '4,5'] for col in MEASURES}).sample(
+        n, replace=True, random_state=0).reset_index(drop=True)
+    # Every value with two dots or a comma comes last, in a block of its own
+    rows.loc[:n - 2, MEASURES] = '12.500'
+    rows.loc[n - 1, MEASURES] = '1.234.567'
+    buf = io.BytesIO()
+    rows.to_csv(buf, index=False, sep=';')
+    monkeypatch.setattr(data_loader, 'CSV_BLOCK_BYTES', 1024)
+
+    chunks = [chunk for chunk, _, _ in data_loader.iter_csv_chunks(io.BytesIO(buf.getvalue()))]
+    assert len(chunks) > 2
+    values = pd.concat(chunks, ignore_index=True)['Penjualan']
+    assert (values.iloc[:-1] == 12500).all() and values.iloc[-1] == 1234567
+
+
+def test_sheet_chunks_wait_for_the_decimal_mark(tmp_path):
+    rows = sales_rows({'Penjualan': ['12.500', '10.000', '5.000', '7,5'], 'HPP': ['1'] * 4,
+                       'Gross Margin': ['1'] * 4, 'Stock Value': ['1'] * 4})
+    path = tmp_path / 'sales.xlsx'
+    rows.to_excel(path, index=False)
+    chunks = list(data_loader.iter_sheet_chunks(str(path), chunk_rows=1))
+    assert [rows_read for _, rows_read, _ in chunks] == [1, 2, 3, 4]
+    values = pd.concat([chunk for chunk, _, _ in chunks])['Penjualan']
+    np.testing.assert_array_equal(values, [12500, 10000, 5000, 7.5])
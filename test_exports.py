@@ -0,0 +1,79 @@
+import gc
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+from openpyxl import load_workbook
+
+import exports
+from exports import iter_chunks, write_export, write_workbook, xlsx_number_format
+
+
+@pytest.fixture(autouse=True)
+def export_dir(monkeypatch, tmp_path):
+    monkeypatch.setattr(exports, 'EXPORT_DIR', str(tmp_path))
+    return tmp_path
+
+
+@pytest.fixture
+def table():
+    table = pd.DataFrame({
+        'Penjualan': np.arange(1, 121) * 1_000.0,
+        'Margin %': np.linspace(0, 30, 120),
+        'year': 2024,
+        'Note': ['ok', 3] * 60,
+    }, index=pd.Index([f"Store {i:03d}" for i in range(120)], name='Store Name'))
+    table.loc['Store 005', 'Penjualan'] = np.nan
+    return table
+
+
+def test_iter_chunks_covers_every_row_and_keeps_the_header_of_empty_frames(table):
+    chunks = list(iter_chunks(table, chunk_rows=50))
+    assert [len(chunk) for chunk in chunks] == [50, 50, 20]
+    assert len(list(iter_chunks(table.iloc[:0]))) == 1
+
+
+@pytest.mark.parametrize('fmt, read', [('CSV', pd.read_csv), ('Parquet', pd.read_parquet)])
+def test_csv_and_parquet_round_trip(monkeypatch, table, fmt, read):
+    monkeypatch.setattr(exports, 'EXPORT_CHUNK_ROWS', 50)
+    path = write_export(lambda: table, fmt)
+    assert path.endswith(exports.EXPORT_FORMATS[fmt][0])
+    result = read(path)
+    expected = table.reset_index().assign(Note=table['Note'].astype(str).to_numpy())
+    pd.testing.assert_frame_equal(result, expected, check_dtype=False)
+
+
+def test_excel_keeps_numbers_with_their_formats(table):
+    sheet = load_workbook(write_export(table, 'Excel')).active
+    rows = list(sheet.iter_rows(values_only=True))
+    assert rows[0] == ('Store Name', 'Penjualan', 'Margin %', 'year', 'Note')
+    assert rows[1] == ('Store 000', 1_000, 0, 2024, 'ok')
+    assert rows[6][1] is None
+    formats = [cell.number_format for cell in next(sheet.iter_rows(min_row=2, max_row=2))]
+    assert formats[1:4] == ['#,##0', '0.00"%"', '0']
+
+
+def test_xlsx_number_format():
+    assert xlsx_number_format('Penjualan', np.dtype(float)) == '#,##0'
+    assert xlsx_number_format('Percent Change_Jan 2024', np.dtype(float)) == '0.00"%"'
+    assert xlsx_number_format('Rank', np.dtype(int)) == '0'
+    assert xlsx_number_format('Store Name', np.dtype(object)) is None
+
+
+# The write-only sheet left unfinished complains when it is garbage collected
+@pytest.mark.filterwarnings('ignore::pytest.PytestUnraisableExceptionWarning')
+def test_too_many_rows_for_excel_leave_no_file(monkeypatch, export_dir, table):
+    monkeypatch.setattr(exports, 'XLSX_MAX_ROWS', 100)
+    with pytest.raises(ValueError, match='too many for Excel'):
+        write_export(table, 'Excel')
+    gc.collect()
+    assert os.listdir(export_dir) == []
+
+
+def test_workbook_has_a_sheet_per_table(tmp_path, table):
+    path = str(tmp_path / 'report.xlsx')
+    write_workbook([('Stores', table), ('Top', lambda: table.head(3))], path)
+    workbook = load_workbook(path)
+    assert workbook.sheetnames == ['Stores', 'Top']
+    assert workbook['Top'].max_row == 4
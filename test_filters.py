@@ -0,0 +1,61 @@
+import numpy as np
+import pandas as pd
+import pytest
+from synthetic import make_sales_data
+
+from filters import general_rows, grouping_rows
+from rollups import Rollups, coarsen, widen
+
+
+@pytest.fixture(scope='module')
+def rollups():
+    return Rollups.from_rows(make_sales_data(40, 5, 15, density=0.5, seed=4).drop(columns='Rows'))
+
+
+def test_between_slices_the_months_of_the_range(rollups):
+    monthly = widen(rollups.monthly)
+    months = rollups.periods['Month']
+    start, end = months[-3], months[-1]
+    masks = monthly[monthly['year'].isin(set(months[-3:].year))
+                    & monthly['Month'].isin(set(months[-3:].month_name())) & (monthly['Date'] >= start)]
+    assert widen(rollups.between('Month', start, end))['Date'].equals(masks['Date'])
+    assert len(rollups.between('Month')) == len(monthly)
+
+
+def test_splits_periods(rollups):
+    months = rollups.periods['Month']
+    assert not rollups.splits_periods('Quarter', months[0], months[5])
+    assert rollups.splits_periods('Quarter', months[1], months[5])
+    assert rollups.splits_periods('Year', months[0], months[5])
+    assert not rollups.splits_periods('Month', months[1], months[2])
+    np.testing.assert_array_equal(widen(rollups.between('Quarter', months[1], months[5]))['Date'].unique(),
+                                  rollups.periods['Quarter'][:2])
+
+
+@pytest.mark.parametrize('grain', ['Month', 'Quarter', 'Year'])
+@pytest.mark.parametrize('bounds', [(None, None), (0, 5), (1, 5), (4, None)])
+def test_date_range_selects_the_same_rows_as_filtering_the_dates(rollups, grain, bounds):
+    monthly = widen(rollups.monthly)
+    months = rollups.periods['Month']
+    date_range = tuple(None if bound is None else months[bound] for bound in bounds)
+    groups = sorted(monthly['Group'].unique())
+    years = sorted(monthly['year'].unique())
+    month_names = list(monthly['Month'].unique())
+    stores = sorted(monthly['Store Name'].unique())[:3]
+
+    in_range = monthly['Store Name'].isin(stores)
+    if date_range[0] is not None:
+        in_range &= monthly['Date'] >= date_range[0]
+    if date_range[1] is not None:
+        in_range &= monthly['Date'] <= date_range[1]
+    expected = widen(monthly[in_range])
+
+    filtered, grain_data = general_rows(rollups, groups, years, month_names, stores, grain, date_range)
+    pd.testing.assert_frame_equal(filtered, expected)
+    pd.testing.assert_frame_equal(grain_data.reset_index(drop=True),
+                                  coarsen(expected, grain).reset_index(drop=True),
+                                  check_dtype=False, check_categorical=False)
+
+    categories = sorted(monthly['Grouping'].unique())[:2]
+    kelompok = grouping_rows(rollups, categories, years, month_names, stores, grain, date_range)
+    assert kelompok['Penjualan'].sum() == expected.loc[expected['Grouping'].isin(categories), 'Penjualan'].sum()
@@ -0,0 +1,81 @@
+import numpy as np
+import pandas as pd
+import pytest
+from synthetic import make_sales_data
+
+from filters import general_rows, months_in_selection
+from forecasting import HORIZON, SEASON, SMOOTHING_ALPHA, BatchForecast, MonthGapError, missing_months
+from group_sums import pivot_sum
+from rollups import Rollups, widen
+
+
+@pytest.fixture(scope='module')
+def rollups():
+    return Rollups.from_rows(make_sales_data(60, 5, 30, density=0.5, seed=2).drop(columns='Rows'))
+
+
+def forecast_one(values, horizon=HORIZON):
+    # The three models on one series, written the usual per-series way
+    seasonal = ([values[len(values) - SEASON + k % SEASON] for k in range(horizon)] if len(values) >= SEASON
+                else [values[-1]] * horizon)
+    slope, intercept = np.polyfit(np.arange(len(values)), values, 1)
+    trend = [intercept + slope * (len(values) + k) for k in range(horizon)]
+    level = values[0]
+    for value in values[1:]:
+        level = level + SMOOTHING_ALPHA * (value - level)
+    return [seasonal, trend, [level] * horizon]
+
+
+@pytest.mark.parametrize('n_months', [6, 30])
+def test_batch_forecasts_match_a_per_series_loop(rollups, n_months):
+    monthly = widen(rollups.between('Month', None, rollups.periods['Month'][n_months - 1]))
+    forecast = BatchForecast(monthly)
+    history = pivot_sum(monthly, ['Grouping', 'Store Name'], 'Date', 'Penjualan').reindex(
+        columns=forecast.months, fill_value=0).to_numpy()
+
+    for values, expected, model in zip(history, forecast.forecasts, forecast.model):
+        errors = [np.abs(np.subtract(f, values[-HORIZON:])).sum() for f in forecast_one(values[:-HORIZON])]
+        if np.abs(values[-HORIZON:]).sum() > 0 and np.ptp(errors) > 1e-6:
+            assert model == int(np.argmin(errors))
+        np.testing.assert_allclose(expected, np.maximum(forecast_one(values)[model], 0), rtol=1e-6, atol=1e-3)
+
+
+def test_rows_join_the_last_actual_month(rollups):
+    forecast = BatchForecast(widen(rollups.monthly))
+    rows = forecast.rows()
+    assert len(rows) == len(forecast) * (HORIZON + 1)
+    first = rows.groupby(['Grouping', 'Store Name'], sort=True)['Date'].min()
+    assert (first == forecast.months[-1]).all()
+
+
+def test_missing_months():
+    months = pd.to_datetime(['2024-01-01', '2024-02-01', '2024-05-01'])
+    assert missing_months(months).equals(pd.to_datetime(['2024-03-01', '2024-04-01']))
+    assert missing_months(months[:2]).empty
+
+
+def test_months_left_out_by_the_filters_are_not_forecast_from_as_zeros(rollups):
+    monthly = widen(rollups.monthly)
+    years = sorted(monthly['year'].unique())
+    months = [month for month in monthly['Month'].unique() if month != 'March']
+    filtered, _ = general_rows(rollups, sorted(monthly['Group'].unique()), years, months,
+                               sorted(monthly['Store Name'].unique()), 'Month')
+
+    selection = months_in_selection(rollups, years, months)
+    assert (selection.month != 3).all()
+    with pytest.raises(MonthGapError, match='Mar 2021'):
+        BatchForecast(filtered, months=selection)
+
+
+def test_a_date_range_is_consecutive(rollups):
+    monthly = widen(rollups.monthly)
+    periods = rollups.periods['Month']
+    date_range = (periods[3], periods[20])
+    years, months = sorted(monthly['year'].unique()), list(monthly['Month'].unique())
+    filtered, _ = general_rows(rollups, sorted(monthly['Group'].unique()), years, months,
+                               sorted(monthly['Store Name'].unique()), 'Month', date_range)
+
+    selection = months_in_selection(rollups, years, months, date_range)
+    assert selection.equals(periods[3:21])
+    forecast = BatchForecast(filtered, months=selection)
+    np.testing.assert_array_equal(forecast.forecasts, BatchForecast(filtered).forecasts)
@@ -0,0 +1,54 @@
+import numpy as np
+import pandas as pd
+import pytest
+from synthetic import make_sales_data
+
+import group_sums
+from group_sums import group_sum, pivot_sum
+
+KEYS = ['Grouping', 'Store Name', 'Group', 'Division', 'Month']
+
+
+@pytest.fixture(scope='module', params=['object', 'categorical'])
+def data(request):
+    data = make_sales_data(100, 6, 8, density=0.3, seed=5)
+    return data.astype({col: 'category' for col in KEYS}) if request.param == 'categorical' else data
+
+
+@pytest.mark.parametrize('by, values', [
+    ('Store Name', 'Penjualan'),
+    (['Group', 'Date'], 'Penjualan'),
+    (['Store Name', 'Grouping'], ['Gross Margin', 'Penjualan']),
+    (['Division', 'Store Name', 'year', 'Month'], ['Gross Margin', 'Penjualan']),
+])
+def test_group_sum_matches_groupby(data, by, values):
+    expected = data.groupby(by, observed=True)[values].sum().reset_index()
+    result = group_sum(data, by, values)
+    for col in np.atleast_1d(by):
+        assert list(result[col]) == list(expected[col])
+    np.testing.assert_allclose(result[np.atleast_1d(values)].to_numpy(dtype=float),
+                               expected[np.atleast_1d(values)].to_numpy(dtype=float), rtol=1e-12)
+
+
+@pytest.mark.parametrize('index, values', [('Store Name', 'Stock Value'), ('Grouping', 'Penjualan'),
+                                           (['Group', 'Store Name'], 'Penjualan')])
+def test_pivot_sum_matches_pivot_table(data, index, values):
+    expected = data.pivot_table(values=values, index=index, columns='Date', aggfunc='sum', fill_value=0,
+                                observed=True)
+    result = pivot_sum(data, index, 'Date', values)
+    assert list(result.index) == list(expected.index)
+    assert list(result.columns) == list(expected.columns)
+    np.testing.assert_allclose(result.to_numpy(), expected.to_numpy(dtype=float), rtol=1e-12)
+
+
+def test_missing_keys_are_left_out_and_missing_values_count_as_zero():
+    frame = pd.DataFrame({'Store Name': ['A', None, 'B', 'A'], 'Penjualan': [1.0, 2.0, np.nan, 4.0]})
+    result = group_sum(frame, 'Store Name', 'Penjualan')
+    assert result['Store Name'].tolist() == ['A', 'B']
+    assert result['Penjualan'].tolist() == [5.0, 0.0]
+
+
+def test_large_key_spaces_are_compacted(monkeypatch, data):
+    expected = group_sum(data, ['Grouping', 'Store Name', 'Date'], 'Penjualan')
+    monkeypatch.setattr(group_sums, 'DENSE_CELLS', 16)
+    pd.testing.assert_frame_equal(group_sum(data, ['Grouping', 'Store Name', 'Date'], 'Penjualan'), expected)
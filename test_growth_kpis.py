@@ -0,0 +1,53 @@
+import numpy as np
+import pandas as pd
+import pytest
+from synthetic import make_sales_data
+
+from growth_kpis import GROWTH_KINDS, TOTAL, GrowthKPIs
+
+
+@pytest.fixture(scope='module')
+def data():
+    data = make_sales_data(30, 4, 30, density=0.5, seed=7)
+    # A month without any rows counts as 0
+    return data[data['Date'] != data['Date'].unique()[14]].reset_index(drop=True)
+
+
+def pandas_growth(monthly):
+    # The growth kinds of one monthly series starting in January, worked out with pandas
+    def rate(current, previous):
+        return ((current - previous) / previous * 100).where(previous > 0)
+
+    trailing = monthly.rolling(3).sum()
+    ytd = monthly.groupby(monthly.index.year).cumsum()
+    return {
+        'MoM': rate(monthly, monthly.shift(1)),
+        'YoY': rate(monthly, monthly.shift(12)),
+        'Trailing 3M': rate(trailing, trailing.shift(3)),
+        'YTD': rate(ytd, ytd.shift(12)),
+    }
+
+
+@pytest.mark.parametrize('dimension', [None, 'Store Name', 'Division'])
+def test_growth_matches_pandas(data, dimension):
+    kpis = GrowthKPIs(data)
+    labels = [TOTAL] if dimension is None else sorted(data[dimension].unique())
+    assert list(kpis.labels[dimension]) == labels
+    for row, label in enumerate(labels):
+        rows = data if dimension is None else data[data[dimension] == label]
+        monthly = rows.groupby('Date')['Penjualan'].sum().reindex(kpis.months, fill_value=0)
+        np.testing.assert_allclose(kpis.values[dimension, 'Penjualan'][row], monthly.to_numpy())
+        for kind, expected in pandas_growth(monthly).items():
+            np.testing.assert_allclose(kpis.growth('Penjualan', kind, dimension)[row], expected.to_numpy(),
+                                       err_msg=f"{label} {kind}")
+
+
+def test_at_and_history(data):
+    kpis = GrowthKPIs(data)
+    month = kpis.months[-1]
+    at = kpis.at('Gross Margin', month, 'Store Name')
+    assert list(at.columns) == ['Gross Margin'] + [f"{kind} %" for kind in GROWTH_KINDS]
+    assert at['Gross Margin'].sum() == pytest.approx(data.loc[data['Date'] == month, 'Gross Margin'].sum())
+    history = kpis.history('Penjualan')
+    assert history['Date'].equals(pd.Series(kpis.months, name='Date'))
+    assert history['Penjualan'].sum() == pytest.approx(data['Penjualan'].sum())
@@ -0,0 +1,97 @@
+import gc
+import io
+import threading
+
+import pytest
+from synthetic import make_sales_data
+
+import ingest_worker
+from ingest_worker import submit_ingest
+
+
+class Upload:
+    """The parts of a Streamlit UploadedFile the worker uses."""
+
+    def __init__(self, data, name):
+        self.data = data
+        self.name = name
+
+    def getvalue(self):
+        return self.data
+
+
+@pytest.fixture(autouse=True)
+def jobs(monkeypatch):
+    monkeypatch.setattr(ingest_worker, '_jobs', {})
+
+
+@pytest.fixture
+def upload():
+    buf = io.BytesIO()
+    make_sales_data(n_groupings=20, n_stores=3, n_months=4).to_csv(buf, index=False)
+    return Upload(buf.getvalue(), 'sales.csv')
+
+
+@pytest.fixture
+def blocked(monkeypatch):
+    # Loads wait after their first progress report until the event is set
+    started, release = threading.Event(), threading.Event()
+    load_rollups = ingest_worker.load_rollups
+
+    def blocked_load(fileobj, size, progress=None, name=None):
+        progress(0.5)
+        started.set()
+        release.wait(5)
+        progress(0.75)
+        return load_rollups(fileobj, size, progress=progress, name=name)
+
+    monkeypatch.setattr(ingest_worker, 'load_rollups', blocked_load)
+    return started, release
+
+
+def test_load_and_reuse_a_finished_job(upload):
+    lease = submit_ingest(upload)
+    lease.job.future.result(5)
+    assert lease.job.status == 'done' and lease.job.progress == 1.0
+    assert len(lease.job.result.monthly) > 0
+    assert submit_ingest(upload).job is lease.job
+
+
+def test_a_session_cancelling_a_shared_job_only_detaches_itself(upload, blocked):
+    started, release = blocked
+    first = submit_ingest(upload)
+    second = submit_ingest(upload)
+    assert second.job is first.job and first.job.sessions == 2
+    assert started.wait(5)
+
+    first.cancel()
+    assert first.cancelled and not second.cancelled
+    release.set()
+    second.job.future.result(5)
+    assert second.job.status == 'done'
+
+
+def test_the_last_session_cancelling_cancels_the_job(upload, blocked):
+    started, release = blocked
+    first = submit_ingest(upload)
+    second = submit_ingest(upload)
+    assert started.wait(5)
+    first.cancel()
+    second.cancel()
+    release.set()
+    first.job.future.result(5)
+    assert first.job.status == 'cancelled'
+    # Loading again starts over
+    assert submit_ingest(upload).job is not first.job
+
+
+def test_a_closed_session_releases_its_lease(upload, blocked):
+    started, release = blocked
+    lease = submit_ingest(upload)
+    job = lease.job
+    assert started.wait(5)
+    del lease
+    gc.collect()
+    release.set()
+    job.future.result(5)
+    assert job.sessions == 0 and job.status == 'cancelled'
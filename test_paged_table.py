@@ -0,0 +1,35 @@
+import pandas as pd
+from synthetic import make_sales_data
+
+from aggregations import detail_pivot
+from filters import general_rows
+from paged_table import PagedTable
+from rollups import Rollups
+
+
+def test_search_matches_object_string_and_categorical_columns():
+    frame = pd.DataFrame({
+        'plain': ['Alpha', 'Beta', 'Gamma'],
+        'string': pd.array(['x', 'alpha two', 'y'], dtype='string'),
+        'category': pd.Categorical(['c', 'c', 'ALPHA three']),
+        'number': [1, 2, 3],
+    })
+    table = PagedTable(frame)
+    assert table.search_columns == ['plain', 'string', 'category']
+    assert list(table.view('alpha')) == [0, 1, 2]
+    assert list(table.view('gamma')) == [2]
+
+
+def test_detail_search_finds_rows_of_the_compact_rollups():
+    rollups = Rollups.from_rows(make_sales_data(30, 4, 6).drop(columns='Rows'))
+    monthly = rollups.monthly
+    assert isinstance(monthly['Grouping'].dtype, pd.CategoricalDtype)
+    _, grain_data = general_rows(rollups, sorted(monthly['Group'].unique()), sorted(monthly['year'].unique()),
+                                 list(monthly['Month'].unique()), sorted(monthly['Store Name'].unique()), 'Month')
+    rows = detail_pivot(grain_data).rows
+    table = PagedTable(rows)
+
+    positions = table.view('ITEM 0000')
+    expected = rows['Grouping'].astype(str).str.contains('ITEM 0000')
+    assert len(positions) == expected.sum() > 0
+    assert len(table.view('store 001')) == (rows['Store Name'] == 'Store 001').sum() > 0
@@ -0,0 +1,58 @@
+import io
+
+import numpy as np
+import pandas as pd
+import pytest
+from synthetic import make_sales_data
+
+from data_loader import load_rollups
+from filters import general_rows
+from ranking import GroupingRanker
+
+
+@pytest.fixture(scope='module')
+def data():
+    return make_sales_data(n_groupings=300, n_stores=5, n_months=6, density=0.3)
+
+
+@pytest.mark.parametrize('k', [1, 10, 100, 1_000])
+def test_rankings_match_groupby_and_nlargest(data, k):
+    ranker = GroupingRanker(data)
+    totals = data.groupby('Grouping')['Penjualan'].sum().reset_index()
+
+    assert ranker.rank('Sales', k).index.tolist() == totals.nlargest(k, 'Penjualan').index.tolist()
+    assert (ranker.rank('Sales', k, largest=False, positive_only=True).index.tolist()
+            == totals[totals['Penjualan'] > 0].nsmallest(k, 'Penjualan').index.tolist())
+
+
+def test_scoped_measures_match_pandas(data):
+    ranker = GroupingRanker(data)
+    store = ranker.scope_values('Store')[1]
+    rows = data[data['Store Name'] == store].groupby('Grouping')
+    sales, cost = rows['Penjualan'].sum(), rows['HPP'].sum()
+    expected = ((sales - cost) / sales * 100).reindex(ranker.groupings)
+
+    np.testing.assert_allclose(ranker.measure('Margin %', 'Store', store), expected.to_numpy())
+    np.testing.assert_allclose(ranker.measure('Average Stock Value'),
+                               data.groupby('Grouping')['Stock Value'].mean().to_numpy())
+
+
+def test_average_stock_value_of_line_items_is_the_mean_month_end_level():
+    # ITEM A sells three times in January and once in February; its stock is 1,000 at the end of
+    # January and 3,000 at the end of February. ITEM B sells once a month with 1,500 in stock.
+    items = pd.DataFrame([
+        ('GRC ITEM A', '2024-01-05', 1_000), ('GRC ITEM A', '2024-01-20', 1_000),
+        ('GRC ITEM A', '2024-01-31', 1_000), ('GRC ITEM A', '2024-02-10', 3_000),
+        ('GRC ITEM B', '2024-01-10', 1_500), ('GRC ITEM B', '2024-02-10', 1_500),
+    ], columns=['Grouping', 'Date', 'Stock Value']).assign(Penjualan=100, HPP=80, **{'Store Name': 'Store A'})
+    buf = io.BytesIO()
+    items.to_csv(buf, index=False)
+    data = buf.getvalue()
+    rollups = load_rollups(io.BytesIO(data), len(data), name='items.csv')
+    monthly = rollups.monthly
+    filtered, _ = general_rows(rollups, ['GRC'], sorted(monthly['year'].unique()), list(monthly['Month'].unique()),
+                               ['Store A'], 'Month')
+
+    ranked = GroupingRanker(filtered).rank('Average Stock Value', 2)
+    assert ranked['Grouping'].tolist() == ['GRC ITEM A', 'GRC ITEM B']
+    assert ranked['Stock Value'].tolist() == [2_000, 1_500]
@@ -0,0 +1,125 @@
+import gc
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+import pytest
+from openpyxl import load_workbook
+
+import exports
+import report_worker
+from report_worker import submit_report
+
+
+@pytest.fixture(autouse=True)
+def export_dir(monkeypatch, tmp_path):
+    monkeypatch.setattr(exports, 'EXPORT_DIR', str(tmp_path))
+    monkeypatch.setattr(report_worker, '_jobs', {})
+    return tmp_path
+
+
+@pytest.fixture
+def table():
+    return pd.DataFrame({'Store Name': [f"Store {i}" for i in range(10)], 'Penjualan': np.arange(10) * 1_000.0})
+
+
+def blocked_report(table):
+    # A build that waits on its first sheet until the returned event is set
+    started, release = threading.Event(), threading.Event()
+
+    def chunks():
+        started.set()
+        release.wait(5)
+        yield table
+
+    lease = submit_report('blocking', lambda: [('Blocking', chunks()), ('After', table)])
+    assert started.wait(5)
+    return lease, release
+
+
+def test_build_writes_a_sheet_per_table(table):
+    lease = submit_report('view', lambda: [('Stores', table), ('Top', lambda: table.head(3))])
+    job = lease.job
+    job.future.result(5)
+    assert job.status == 'done' and job.progress == 1.0 and not job.active
+    workbook = load_workbook(job.path)
+    assert workbook.sheetnames == ['Stores', 'Top']
+    assert workbook['Top'].max_row == 4
+
+
+def test_sessions_asking_for_the_same_view_share_one_build(table):
+    calls = []
+
+    def sheets():
+        calls.append(1)
+        return [('Stores', table)]
+
+    first = submit_report('view', sheets)
+    second = submit_report('view', sheets)
+    first.job.future.result(5)
+    assert second.job is first.job and first.job.sessions == 2
+    assert calls == [1]
+    other = submit_report('other view', sheets)
+    other.job.future.result(5)
+    assert other.job is not first.job
+
+
+def test_the_file_is_kept_until_every_session_releases_it(table):
+    first = submit_report('view', lambda: [('Stores', table)])
+    second = submit_report('view', lambda: [('Stores', table)])
+    first.job.future.result(5)
+    first.release()
+    first.release()
+    assert os.path.exists(second.job.path) and second.job.sessions == 1
+    second.release()
+    assert not os.path.exists(second.job.path)
+    assert report_worker._jobs == {}
+
+
+def test_a_closed_session_releases_its_lease(table):
+    lease = submit_report('view', lambda: [('Stores', table)])
+    job = lease.job
+    job.future.result(5)
+    del lease
+    gc.collect()
+    assert job.sessions == 0 and not os.path.exists(job.path)
+
+
+def test_releasing_a_queued_build_keeps_it_from_starting(table):
+    blocking, release = blocked_report(table)
+    queued = submit_report('view', lambda: [('Stores', table)])
+    queued.release()
+    assert queued.job.status == 'cancelled' and not queued.job.joinable
+    resubmitted = submit_report('view', lambda: [('Stores', table)])
+    assert resubmitted.job is not queued.job
+    release.set()
+    resubmitted.job.future.result(5)
+    assert blocking.job.status == 'done' and resubmitted.job.status == 'done'
+
+
+# The write-only sheet left unfinished complains when it is garbage collected
+@pytest.mark.filterwarnings('ignore::pytest.PytestUnraisableExceptionWarning')
+def test_releasing_a_running_build_stops_it_and_leaves_no_file(export_dir, table):
+    lease, release = blocked_report(table)
+    assert lease.job.status == 'running'
+    lease.release()
+    release.set()
+    lease.job.future.result(5)
+    assert lease.job.status == 'cancelled' and lease.job.path is None
+    gc.collect()
+    assert os.listdir(export_dir) == []
+
+
+@pytest.mark.filterwarnings('ignore::pytest.PytestUnraisableExceptionWarning')
+def test_a_failed_build_is_retried(monkeypatch, table):
+    monkeypatch.setattr(exports, 'XLSX_MAX_ROWS', 5)
+    failed = submit_report('view', lambda: [('Stores', table)])
+    failed.job.future.result(5)
+    assert failed.job.status == 'failed' and 'too many for Excel' in str(failed.job.error)
+    assert not failed.job.joinable
+    monkeypatch.setattr(exports, 'XLSX_MAX_ROWS', 100)
+    retried = submit_report('view', lambda: [('Stores', table)])
+    retried.job.future.result(5)
+    assert retried.job is not failed.job and retried.job.status == 'done'
+    gc.collect()
@@ -0,0 +1,81 @@
+import threading
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from result_cache import ResultCache, nbytes, result_key
+
+
+def test_result_key_ignores_the_order_of_selection():
+    key = result_key('dataset', groups=['BZR', 'GRC'], years=[np.int16(2024), 2023], grain='Month')
+    assert key == result_key('dataset', grain='Month', years=[2023, 2024, 2024], groups=('GRC', 'BZR'))
+    assert key != result_key('dataset', groups=['BZR'], years=[2023, 2024], grain='Month')
+
+
+def test_nbytes_of_frames_and_containers():
+    frame = pd.DataFrame({'Store Name': ['Store A', 'Store B'] * 50, 'Penjualan': np.arange(100.0)})
+    assert nbytes(frame) == frame.memory_usage(deep=True).sum()
+    # An object held twice is counted once
+    assert nbytes(frame) < nbytes((frame, frame)) < 2 * nbytes(frame)
+    assert nbytes(np.zeros(1_000)) == 8_000
+
+
+def test_hits_misses_and_eviction_by_bytes():
+    cache = ResultCache(max_bytes=20_000)
+    calls = []
+
+    def compute(n):
+        calls.append(n)
+        return np.zeros(n)
+
+    cache.get_or_compute('a', lambda: compute(1_000))
+    cache.get_or_compute('a', lambda: compute(1_000))
+    cache.get_or_compute('b', lambda: compute(1_000))
+    # 'a' is the least recently used and makes room for 'c'
+    cache.get_or_compute('b', lambda: compute(1_000))
+    cache.get_or_compute('c', lambda: compute(1_000))
+    cache.get_or_compute('a', lambda: compute(1_000))
+
+    assert calls == [1_000] * 4
+    stats = cache.stats()
+    assert (stats['hits'], stats['misses'], stats['evictions']) == (2, 4, 2)
+    assert stats['bytes'] <= 20_000
+
+
+def test_results_larger_than_the_budget_are_returned_but_not_kept():
+    cache = ResultCache(max_bytes=1_000)
+    assert len(cache.get_or_compute('big', lambda: np.zeros(1_000))) == 1_000
+    assert cache.stats()['entries'] == 0
+
+
+def test_failures_are_not_cached():
+    cache = ResultCache()
+    with pytest.raises(ValueError):
+        cache.get_or_compute('key', lambda: (_ for _ in ()).throw(ValueError("no rows")))
+    assert cache.get_or_compute('key', lambda: 42) == 42
+
+
+def test_concurrent_requests_compute_once():
+    cache = ResultCache()
+    started, release = threading.Event(), threading.Event()
+    calls = []
+
+    def compute():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return 'result'
+
+    results = []
+    first = threading.Thread(target=lambda: results.append(cache.get_or_compute('key', compute)))
+    first.start()
+    started.wait(5)
+    second = threading.Thread(target=lambda: results.append(cache.get_or_compute('key', compute)))
+    second.start()
+    release.set()
+    first.join(5)
+    second.join(5)
+
+    assert results == ['result', 'result']
+    assert len(calls) == 1
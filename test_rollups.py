@@ -0,0 +1,146 @@
+import numpy as np
+import pandas as pd
+import pytest
+from synthetic import make_sales_data
+
+from aggregations import DASHBOARD_GRAPH, detailed_gm_division, detailed_gm_store
+from filters import filter_rollups
+from growth_kpis import GrowthKPIs
+from ranking import RANK_MEASURES, GroupingRanker
+from rollups import (FLOW_MEASURES, GRAINS, ROLLUP_KEYS, STOCK_MEASURE, MonthlyAccumulator, Rollups, coarsen,
+                     compact, monthly_rollup, period_labels, widen)
+
+
+@pytest.fixture(scope='module')
+def rows():
+    return make_sales_data(50, 4, 15, density=0.4, seed=1).drop(columns='Rows')
+
+
+def test_monthly_rollup_sums_rows_per_key_and_month(rows):
+    doubled = pd.concat([rows, rows.assign(Penjualan=1.0)], ignore_index=True).sort_values('Date', kind='stable')
+    monthly = monthly_rollup(doubled)
+    assert len(monthly) == len(rows)
+    assert (monthly['Rows'] == 2).all()
+    assert monthly['Penjualan'].sum() == rows['Penjualan'].sum() + len(rows)
+    assert monthly['Date'].is_monotonic_increasing
+
+
+@pytest.mark.parametrize('grain, freq', [('Quarter', 'Q'), ('Year', 'Y')])
+def test_coarser_grains_sum_flows_and_take_the_last_stock(rows, grain, freq):
+    monthly = monthly_rollup(rows)
+    period = monthly['Date'].dt.to_period(freq).dt.start_time
+    grouped = monthly.assign(Date=period).sort_values('Date', kind='stable').groupby(ROLLUP_KEYS + ['Date'])
+    expected = grouped[FLOW_MEASURES].sum()
+    expected[STOCK_MEASURE] = grouped[STOCK_MEASURE].last()
+
+    result = coarsen(monthly, grain).set_index(ROLLUP_KEYS + ['Date']).sort_index()
+    pd.testing.assert_frame_equal(result[FLOW_MEASURES + [STOCK_MEASURE]], expected)
+    assert (result['year'] == result.index.get_level_values('Date').year).all()
+
+
+def test_the_materialized_grains_are_clustered_by_period(rows):
+    rollups = Rollups.from_rows(rows)
+    for grain in GRAINS:
+        frame = widen(rollups.at(grain))
+        assert frame['Date'].is_monotonic_increasing
+        for i, date in enumerate(rollups.periods[grain]):
+            start, end = rollups.offsets[grain][i:i + 2]
+            assert (frame['Date'].iloc[start:end] == date).all()
+
+
+def test_period_labels():
+    dates = pd.to_datetime(['2024-01-01', '2024-04-01'])
+    assert period_labels(dates, 'Month') == ['Jan 2024', 'Apr 2024']
+    assert period_labels(dates, 'Quarter') == ['Q1 2024', 'Q2 2024']
+    assert period_labels(dates, 'Year') == ['2024', '2024']
+
+
+
+def test_accumulator_fed_in_chunks_matches_monthly_rollup(rows):
+    accumulator = MonthlyAccumulator()
+    shuffled = rows.sample(frac=1, random_state=0)
+    for start in range(0, len(shuffled), 500):
+        accumulator.add(shuffled.iloc[start:start + 500])
+    columns = ROLLUP_KEYS + ['Date']
+    result = accumulator.result().sort_values(columns, ignore_index=True)
+    expected = monthly_rollup(rows).sort_values(columns, ignore_index=True)
+
+    assert accumulator.rows == len(rows)
+    pd.testing.assert_frame_equal(result[expected.columns], expected, check_dtype=False)
+
+
+def test_accumulator_takes_the_stock_of_the_latest_day():
+    line_items = pd.DataFrame({
+        'Grouping': 'GRC ITEM 1', 'Store Name': 'Store A', 'Group': 'GRC', 'Division': 'GRC+FRS',
+        'Date': pd.to_datetime(['2024-01-31', '2024-01-05', '2024-01-31', '2024-02-03']),
+        'Penjualan': [100.0, 200.0, 300.0, 400.0], 'HPP': 0.0, 'Gross Margin': 0.0,
+        'Stock Value': [1_000.0, 5_000.0, 2_000.0, 7_000.0],
+    })
+    accumulator = MonthlyAccumulator()
+    accumulator.add(line_items.iloc[:2])
+    accumulator.add(line_items.iloc[2:])
+    monthly = accumulator.result()
+
+    assert monthly['Penjualan'].tolist() == [600, 400]
+    assert monthly['Rows'].tolist() == [3, 1]
+    assert monthly['Stock Value'].tolist() == [3_000, 7_000]
+
+
+def tab_results(rollups, grain, all_months):
+    monthly = rollups.monthly
+    months = list(monthly['Month'].unique())
+    view = filter_rollups(rollups, sorted(monthly['Group'].unique()), sorted(monthly['year'].unique()),
+                          months if all_months else months[1:], sorted(monthly['Store Name'].unique()),
+                          sorted(monthly['Grouping'].unique())[:3], grain)
+    results = dict(DASHBOARD_GRAPH.run({'filtered_data': view.filtered_data, 'grain_data': view.grain_data,
+                                        'grain': grain, 'comparison_col': 'Grouping'}).results)
+    results['detail_pivot'] = results['detail_pivot'].dense_sales(np.arange(results['detail_pivot'].shape[0]))
+    results['detailed_gm_store'] = detailed_gm_store(view.filtered_data)
+    results['detailed_gm_division'] = detailed_gm_division(view.filtered_data)
+    results['kelompok_data'] = view.kelompok_data
+    ranker = GroupingRanker(view.filtered_data)
+    for measure in RANK_MEASURES:
+        results[f"rank {measure}"] = ranker.rank(measure, 10)
+    growth = GrowthKPIs(view.filtered_data)
+    results['growth'] = growth.at('Penjualan', growth.months[-1], 'Store Name')
+    return results
+
+
+def test_compact_layout_narrows_only_what_it_holds_exactly(rows):
+    frame = monthly_rollup(rows.assign(HPP=rows['HPP'] + 0.1))
+    narrow = compact(frame)
+    assert narrow['Penjualan'].dtype == np.float32 and narrow['HPP'].dtype == np.float64
+    assert narrow['Grouping'].dtype == 'category' and narrow['year'].dtype == np.int16
+
+
+@pytest.mark.parametrize('grain', GRAINS)
+def test_compact_dtypes_and_widening_back(rows, grain):
+    wide = Rollups.from_rows(rows, compact_layout=False).at(grain)
+    frame = Rollups.from_rows(rows).at(grain)
+    dtypes = frame.dtypes.to_dict()
+    assert dtypes['Date'] == np.int16
+    assert dtypes['year'] == np.int16 and dtypes['Rows'] == np.int32
+    assert all(dtypes[col] == 'category' for col in ROLLUP_KEYS + (['Month'] if grain == 'Month' else []))
+    assert all(dtypes[col] in (np.float32, np.float64) for col in FLOW_MEASURES[:-1] + [STOCK_MEASURE])
+    assert frame.memory_usage(deep=True).sum() < wide.memory_usage(deep=True).sum() / 4
+
+    widened = widen(frame)
+    assert widened['Date'].dtype == 'datetime64[ns]' and widened['Rows'].dtype == np.int64
+    assert all(widened[col].dtype == np.float64 for col in FLOW_MEASURES[:-1] + [STOCK_MEASURE])
+    pd.testing.assert_frame_equal(widened, wide, check_dtype=False, check_categorical=False)
+
+
+@pytest.mark.parametrize('grain', GRAINS)
+@pytest.mark.parametrize('all_months', [True, False])
+def test_every_tab_gives_the_same_results_in_the_compact_layout(rows, grain, all_months):
+    # With a month left out, the coarser grains are re-derived from the filtered months
+    expected = tab_results(Rollups.from_rows(rows, compact_layout=False), grain, all_months)
+    results = tab_results(Rollups.from_rows(rows), grain, all_months)
+    for name, value in expected.items():
+        if isinstance(value, pd.DataFrame):
+            pd.testing.assert_frame_equal(results[name], value, check_exact=True, check_dtype=False,
+                                          check_categorical=False, check_index_type=False, check_column_type=False)
+        elif isinstance(value, np.ndarray):
+            np.testing.assert_array_equal(results[name], value)
+        else:
+            assert results[name] == value, name
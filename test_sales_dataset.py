@@ -0,0 +1,89 @@
+import pandas as pd
+import pytest
+from synthetic import make_sales_data
+
+from filters import general_rows
+from rollups import Rollups, widen
+from sales_dataset import dataset_months, dataset_values, read_monthly, row_filter, scan_plan, write_months
+
+
+@pytest.fixture(scope='module')
+def rollups():
+    return Rollups.from_rows(make_sales_data(40, 6, 15, density=0.5, seed=3).drop(columns='Rows'))
+
+
+@pytest.fixture(scope='module')
+def root(rollups, tmp_path_factory):
+    root = str(tmp_path_factory.mktemp('dataset'))
+    write_months(rollups.monthly, root)
+    return root
+
+
+def as_rows(frame):
+    frame = widen(frame).astype({col: str for col in ['Grouping', 'Store Name', 'Group', 'Division', 'Month']
+                                 if col in frame.columns})
+    columns = ['Date', 'Store Name', 'Grouping']
+    return frame.sort_values(columns).reset_index(drop=True)[sorted(frame.columns)]
+
+
+def test_read_monthly_returns_the_rows_written(rollups, root):
+    pd.testing.assert_frame_equal(as_rows(read_monthly(root)), as_rows(rollups.monthly), check_dtype=False)
+
+
+def test_filters_select_the_same_rows_as_pandas(rollups, root):
+    monthly = widen(rollups.monthly)
+    months = rollups.periods['Month']
+    stores = sorted(monthly['Store Name'].unique())[:2]
+    expected = monthly[monthly['Date'].between(months[2], months[10]) & monthly['year'].isin([2020])
+                       & monthly['Month'].isin(['March', 'May', 'June']) & monthly['Store Name'].isin(stores)]
+
+    read = read_monthly(root, months[2], months[10], years=[2020], months=['March', 'May', 'June'], stores=stores)
+    assert len(expected) > 0
+    pd.testing.assert_frame_equal(as_rows(read), as_rows(expected), check_dtype=False)
+
+
+def test_a_month_reads_one_partition(rollups, root):
+    month = rollups.periods['Month'][4]
+    plan = scan_plan(root, row_filter(month, month))
+    assert plan['partitions'] == 1
+    assert plan['bytes'] < scan_plan(root, row_filter())['bytes'] / 10
+
+
+def test_dataset_values_are_the_filter_options(rollups, root):
+    monthly = widen(rollups.monthly)
+    values = dataset_values(root)
+    for col in ['Group', 'Store Name', 'Grouping', 'year', 'Month']:
+        assert sorted(values[col].unique()) == sorted(monthly[col].unique())
+    assert dataset_months(root).equals(rollups.periods['Month'])
+
+
+@pytest.mark.parametrize('grain', ['Month', 'Quarter', 'Year'])
+def test_rollups_of_the_pushed_down_read_give_the_same_view(rollups, root, grain):
+    # What the app does in dataset mode: read the selected months and stores, then filter as usual
+    monthly = widen(rollups.monthly)
+    months = rollups.periods['Month']
+    date_range = (months[1], months[-2])
+    groups = sorted(monthly['Group'].unique())[:2]
+    years = sorted(monthly['year'].unique())
+    month_names = ['January', 'February', 'March', 'July', 'August', 'September']
+    stores = sorted(monthly['Store Name'].unique())[1:4]
+    pushed_down = Rollups(read_monthly(root, *date_range, years=years, months=month_names, stores=stores))
+
+    expected = general_rows(rollups, groups, years, month_names, stores, grain, date_range)
+    for result, reference in zip(general_rows(pushed_down, groups, years, month_names, stores, grain, date_range),
+                                 expected):
+        pd.testing.assert_frame_equal(as_rows(result), as_rows(reference), check_dtype=False)
+
+
+def test_writing_months_again_replaces_only_those_months(rollups, tmp_path):
+    monthly = widen(rollups.monthly)
+    months = rollups.periods['Month']
+    write_months(monthly, str(tmp_path))
+    latest = monthly[monthly['Date'] == months[-1]]
+    write_months(latest.assign(Penjualan=1.0), str(tmp_path))
+
+    read = read_monthly(str(tmp_path))
+    assert len(read) == len(monthly)
+    assert (read.loc[read['Date'] == months[-1], 'Penjualan'] == 1).all()
+    assert (read.loc[read['Date'] < months[-1], 'Penjualan'].sum()
+            == monthly.loc[monthly['Date'] < months[-1], 'Penjualan'].astype(float).sum())
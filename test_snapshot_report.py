@@ -0,0 +1,122 @@
+import json
+import re
+
+import numpy as np
+import pandas as pd
+import pytest
+from synthetic import make_sales_data
+
+import snapshot_report
+from rollups import Rollups, period_labels
+from snapshot_report import SNAPSHOT_RANK_K, SnapshotPage, preset_filters, snapshot_page, write_snapshots
+
+COLUMNS = ['Grouping', 'Penjualan', 'HPP', 'Gross Margin', 'Store Name', 'Month', 'year', 'Stock Value']
+
+
+@pytest.fixture(scope='module')
+def rows():
+    return make_sales_data(40, 5, 14, density=0.6, seed=9).drop(columns='Rows')
+
+
+@pytest.fixture(scope='module')
+def rollups(rows):
+    return Rollups.from_rows(rows)
+
+
+class RecordingPage(SnapshotPage):
+    """A SnapshotPage that also keeps the tables, texts and metrics it is given, by section."""
+
+    def __init__(self):
+        super().__init__()
+        self.section = None
+        self.tables = {}
+        self.texts = []
+        self.items = {}
+
+    def heading(self, text, level=2):
+        self.section = text
+        super().heading(text, level)
+
+    def text(self, text):
+        self.texts.append(text)
+        super().text(text)
+
+    def metrics(self, items):
+        self.items.update(items)
+        super().metrics(items)
+
+    def table(self, frame, max_rows=snapshot_report.SNAPSHOT_TABLE_ROWS):
+        self.tables.setdefault(self.section, frame)
+        super().table(frame, max_rows)
+
+
+@pytest.fixture
+def recorded(monkeypatch):
+    monkeypatch.setattr(snapshot_report, 'SnapshotPage', RecordingPage)
+
+
+def test_preset_filters_default_to_the_app_selection(rollups, rows):
+    filters = preset_filters(rollups, {'years': [2020], 'grain': 'Quarter'})
+    assert filters['years'] == [2020] and filters['grain'] == 'Quarter'
+    assert filters['stores'] == sorted(rows['Store Name'].unique())
+    assert filters['categories'] == [sorted(rows['Grouping'].unique())[0]]
+    with pytest.raises(ValueError, match='Unknown preset keys: region'):
+        preset_filters(rollups, {'region': 'West'})
+    with pytest.raises(ValueError, match='Unknown grain'):
+        preset_filters(rollups, {'grain': 'Week'})
+
+
+@pytest.mark.parametrize('preset, freq', [
+    ({}, 'M'),
+    ({'grain': 'Quarter', 'stores': ['Store 001', 'Store 003']}, 'Q'),
+    ({'grain': 'Year', 'groups': ['BZR']}, 'Y'),
+])
+def test_snapshot_tables_match_pandas(recorded, rollups, rows, preset, freq):
+    filters = preset_filters(rollups, preset)
+    page = snapshot_page(rollups, filters)
+    data = rows[rows['Group'].isin(filters['groups']) & rows['Store Name'].isin(filters['stores'])]
+
+    periods = data['Date'].dt.to_period(freq).dt.start_time
+    expected = data.pivot_table(values='Penjualan', index='Store Name', columns=periods, aggfunc='sum', fill_value=0)
+    stores = page.tables['Store Comparison']
+    stores = stores[stores['index_'] != 'Grand Total'].set_index('index_')
+    sales = stores[[f"Sales_{label}" for label in period_labels(expected.columns, filters['grain'])]]
+    assert list(sales.index) == list(expected.index)
+    np.testing.assert_allclose(sales.to_numpy(dtype=float), expected.to_numpy(dtype=float), rtol=1e-9)
+
+    top = data.groupby('Grouping')['Penjualan'].sum().sort_values(ascending=False, kind='stable').head(SNAPSHOT_RANK_K)
+    ranked = page.tables[f"Top {SNAPSHOT_RANK_K} Grouping by Sales"]
+    np.testing.assert_allclose(ranked['Penjualan'].to_numpy(), top.to_numpy(), rtol=1e-9)
+    assert list(ranked['Grouping']) == list(top.index)
+
+    assert page.items['Total Gross Margin'] == f"{data['Gross Margin'].sum():,.0f}"
+    margin = data['Gross Margin'].sum() / data['Penjualan'].sum() * 100
+    assert page.items['Average Margin %'] == f"{margin:.2f}%"
+
+
+def test_selections_with_month_gaps_are_not_forecast(recorded, rollups):
+    months = [month for month in preset_filters(rollups, {})['months'] if month != 'March']
+    page = snapshot_page(rollups, preset_filters(rollups, {'months': months}))
+    assert any('consecutive months' in text for text in page.texts)
+
+
+def test_write_snapshots_next_to_the_dataset(tmp_path, rows):
+    data = rows[COLUMNS].copy()
+    # Text in the data cannot end the script element that embeds a figure
+    data.loc[data['Grouping'] == data['Grouping'].iloc[0], 'Grouping'] = 'GRC </script><b>x'
+    path = tmp_path / 'sales.csv'
+    data.to_csv(path, index=False)
+
+    written = write_snapshots(str(path), {'default': {}, 'bzr': {'groups': ['BZR'], 'grain': 'Year'}})
+    out_dir = tmp_path / 'sales_snapshots'
+    assert written == [str(out_dir / name) for name in ('default.html', 'bzr.html', 'index.html')]
+    index = (out_dir / 'index.html').read_text()
+    assert 'href="default.html"' in index and 'href="bzr.html"' in index
+
+    page = (out_dir / 'default.html').read_text()
+    assert page.count('</script>') == page.count('<script>')
+    assert 'GRC &lt;/script&gt;&lt;b&gt;x' in page
+    specs = re.findall(r'var spec = (.*?); Plotly\.newPlot', page)
+    assert specs and all(json.loads(spec.replace('<\\/', '</'))['data'] for spec in specs)
+    with pytest.raises(ValueError, match='cannot be used as a file name'):
+        write_snapshots(str(path), {'../outside': {}})
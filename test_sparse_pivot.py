@@ -0,0 +1,59 @@
+import numpy as np
+import pandas as pd
+import pytest
+from synthetic import make_sales_data
+
+from sparse_pivot import SparsePivot
+
+INDEX = ['Grouping', 'Store Name', 'Group']
+
+
+@pytest.fixture(scope='module')
+def data():
+    return make_sales_data(80, 6, 7, density=0.2, seed=6)
+
+
+@pytest.fixture(scope='module')
+def dense(data):
+    return data.pivot_table(values='Penjualan', index=INDEX, columns='Date', aggfunc='sum', fill_value=0)
+
+
+@pytest.fixture(scope='module')
+def pivot(data):
+    return SparsePivot.from_frame(data, INDEX, 'Date', 'Penjualan')
+
+
+def test_cells_are_the_pivot_table(pivot, dense):
+    assert pivot.shape == dense.shape
+    assert pivot.rows.equals(dense.index.to_frame(index=False))
+    assert list(pivot.columns) == list(dense.columns)
+    assert pivot.cells.data.size < dense.size
+    rows = np.arange(pivot.shape[0])
+    np.testing.assert_array_equal(pivot.dense_sales(rows), dense.to_numpy())
+    np.testing.assert_array_equal(pivot.row_totals(), dense.sum(axis=1).to_numpy())
+
+
+def test_changes_match_diff_and_pct_change(pivot, dense):
+    rows = np.arange(pivot.shape[0])
+    np.testing.assert_allclose(pivot.dense_changes(rows), dense.diff(axis=1).to_numpy())
+    with np.errstate(divide='ignore', invalid='ignore'):
+        expected = (dense.to_numpy()[:, 1:] / dense.to_numpy()[:, :-1] - 1) * 100
+    np.testing.assert_allclose(pivot.dense_pct_changes(rows)[:, 1:], expected)
+    assert np.isnan(pivot.dense_pct_changes(rows)[:, 0]).all()
+    assert pivot.has_changes() and pivot.has_pct_changes()
+
+
+def test_take_rows_keeps_the_rows_in_the_order_given(pivot, dense):
+    positions = np.array([5, 0, 17, 3])
+    taken = pivot.take_rows(positions)
+    assert taken.rows.equals(pivot.rows.iloc[positions].reset_index(drop=True))
+    np.testing.assert_array_equal(taken.dense_sales(np.arange(len(positions))), dense.to_numpy()[positions])
+    np.testing.assert_allclose(taken.dense_changes(np.arange(len(positions))),
+                               dense.diff(axis=1).to_numpy()[positions])
+
+
+def test_one_month_has_no_changes():
+    frame = pd.DataFrame({'Grouping': ['A', 'B'], 'Date': pd.Timestamp('2024-01-01'), 'Penjualan': [1.0, 2.0]})
+    pivot = SparsePivot.from_frame(frame, ['Grouping'], 'Date', 'Penjualan')
+    assert not pivot.has_changes()
+    np.testing.assert_array_equal(pivot.dense_sales([1, 0]), [[2.0], [1.0]])